@@ -0,0 +1,265 @@
+# agent/long_memory/bench_retrieval.py
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import embeddings
+from .bm25 import BM25Index
+from .chunker import chunk_stream
+from .faiss_store import FaissStore
+from .hybrid import HybridRetriever
+
+# -----------------------------
+# Retrieval quality + latency benchmark
+# -----------------------------
+# Runs a labelled query set against every (embedding alias x index type x
+# retrieval mode) combination and reports hit@k, MRR, p50/p99 latency, QPS,
+# index build time and memory. Results are written as JSON so two commits can
+# be compared with --compare.
+#
+# Inputs (JSONL):
+#   corpus:  {"doc_id": "...", "text": "..."}
+#   queries: {"query": "...", "relevant": ["doc_id", ...]}
+# Without --corpus/--queries a small built-in set is used.
+#
+# Example:
+#   python -m agent.long_memory.bench_retrieval --aliases minilm bge --index flat hnsw \
+#       --modes dense hybrid rerank --out bench/retrieval.json
+#   python -m agent.long_memory.bench_retrieval --compare bench/retrieval.json
+#
+
+INDEX_TYPES = ("flat", "hnsw", "ivf")
+MODES = ("dense", "hybrid", "rerank")
+
+_BUILTIN_CORPUS = [
+    ("fruit_apple", "Apple is a red fruit. The apple cultivars vary widely by taste and color."),
+    ("fruit_banana", "Banana is a yellow fruit. Fruits like banana and mango are rich in potassium."),
+    ("car_wheels", "A car has four wheels. Tires are essential for cars to move."),
+    ("health_staff", "Doctors help people get healthy. Nurses work in hospitals and assist doctors caring for patients."),
+    ("db_errors", "Error E1234 means the database connection was refused. Check the port and credentials."),
+    ("password", "To reset your password open Settings, choose Security and click Reset password."),
+]
+
+_BUILTIN_QUERIES = [
+    ("which fruit is red", ["fruit_apple"]),
+    ("potassium rich food", ["fruit_banana"]),
+    ("how many wheels does a car have", ["car_wheels"]),
+    ("who works in a hospital", ["health_staff"]),
+    ("what does E1234 mean", ["db_errors"]),
+    ("I forgot my password", ["password"]),
+]
+
+
+def _read_jsonl(path: str) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def load_dataset(corpus: Optional[str], queries: Optional[str]) -> Tuple[List[Tuple[str, str]], List[Tuple[str, List[str]]]]:
+    docs = [(d["doc_id"], d["text"]) for d in _read_jsonl(corpus)] if corpus else list(_BUILTIN_CORPUS)
+    qs = [(q["query"], list(q["relevant"])) for q in _read_jsonl(queries)] if queries else list(_BUILTIN_QUERIES)
+    return docs, qs
+
+
+def _chunks(docs: List[Tuple[str, str]], max_tokens: int) -> Tuple[List[str], List[dict]]:
+    texts: List[str] = []
+    metas: List[dict] = []
+    for doc_id, text in docs:
+        for j, ch in enumerate(chunk_stream(text.encode("utf-8"), max_tokens=max_tokens, overlap_tokens=min(32, max_tokens // 4))):
+            texts.append(ch.text)
+            metas.append({"doc_id": doc_id, "chunk_id": j})
+    return texts, metas
+
+
+def _factory(index_type: str, n: int) -> str:
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "hnsw":
+        return "HNSW32"
+    if index_type == "ivf":
+        return f"IVF{max(1, min(4096, int(np.sqrt(n))))},Flat"
+    raise ValueError(f"unknown index type {index_type}")
+
+
+def _select_alias(alias: str):
+    os.environ["USE_MODEL"] = alias
+    embeddings._load_model.cache_clear()
+    embeddings._load_tokenizer.cache_clear()
+    if "agent.long_memory.onnx_backend" in sys.modules:
+        sys.modules["agent.long_memory.onnx_backend"].load_onnx_embedder.cache_clear()
+
+
+def _rank_metrics(doc_ids: List[str], relevant: Sequence[str], k: int) -> Tuple[int, float]:
+    seen: List[str] = []
+    for d in doc_ids:  # rank by document, not by chunk
+        if d not in seen:
+            seen.append(d)
+    seen = seen[:k]
+    for rank, d in enumerate(seen, start=1):
+        if d in relevant:
+            return 1, 1.0 / rank
+    return 0, 0.0
+
+
+def _pct(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * p))], 3) if values else 0.0
+
+
+def run(
+    aliases: Sequence[str],
+    index_types: Sequence[str],
+    modes: Sequence[str],
+    docs: List[Tuple[str, str]],
+    queries: List[Tuple[str, List[str]]],
+    k: int = 5,
+    candidates: int = 20,
+    rerank_budget_ms: float = 150.0,
+) -> List[dict]:
+    import faiss
+
+    rows: List[dict] = []
+    for alias in aliases:
+        _select_alias(alias)
+        texts, metas = _chunks(docs, max_tokens=min(embeddings.token_budget(), 256))
+        embeddings.embed_texts(["warm up"])  # model load is not part of the embed time
+        t0 = time.perf_counter()
+        vecs = embeddings.embed_texts(texts)
+        embed_s = time.perf_counter() - t0
+        bm25 = BM25Index()
+        bm25.add(texts)
+
+        for index_type in index_types:
+            store = FaissStore(dim=vecs.shape[1], factory=_factory(index_type, len(texts)))
+            t0 = time.perf_counter()
+            store.build(vecs, texts, metas)
+            build_s = time.perf_counter() - t0
+            if index_type == "ivf":
+                faiss.extract_index_ivf(store.index).nprobe = max(1, faiss.extract_index_ivf(store.index).nlist // 8)
+            index_bytes = int(faiss.serialize_index(store.index).nbytes)
+            retriever = HybridRetriever(store, bm25)
+
+            for mode in modes:
+                if mode == "rerank":
+                    from .rerank import get_reranker
+
+                    reranker = get_reranker()
+                    reranker.load()  # keep the one-off model load out of per-query latency
+                hits_at_k = 0
+                rr = 0.0
+                lat: List[float] = []
+                t_all = time.perf_counter()
+                for q, relevant in queries:
+                    tq = time.perf_counter()
+                    if mode == "hybrid":
+                        hits, _ = retriever.search(q, top_k=k * 3, candidates=candidates)
+                    else:
+                        hits = store.search(embeddings.embed_query(q), top_k=candidates if mode == "rerank" else k * 3)
+                        if mode == "rerank":
+                            hits, _ = reranker.rerank(q, hits, keep=k * 3, budget_ms=rerank_budget_ms)
+                    lat.append((time.perf_counter() - tq) * 1000)
+                    h, r = _rank_metrics([m.get("doc_id") for _, _, m, _ in hits], relevant, k)
+                    hits_at_k += h
+                    rr += r
+                total_s = time.perf_counter() - t_all
+                n = max(1, len(queries))
+                row = {
+                    "alias": alias,
+                    "index": index_type,
+                    "mode": mode,
+                    "chunks": len(texts),
+                    f"hit@{k}": round(hits_at_k / n, 4),
+                    "mrr": round(rr / n, 4),
+                    "p50_ms": _pct(lat, 0.50),
+                    "p99_ms": _pct(lat, 0.99),
+                    "mean_ms": round(statistics.fmean(lat), 3) if lat else 0.0,
+                    "qps": round(n / total_s, 1) if total_s > 0 else 0.0,
+                    "embed_corpus_s": round(embed_s, 3),
+                    "build_s": round(build_s, 4),
+                    "index_bytes": index_bytes,
+                }
+                rows.append(row)
+                print(
+                    f"{alias:<7} {index_type:<5} {mode:<7} hit@{k}={row[f'hit@{k}']:.3f} mrr={row['mrr']:.3f} "
+                    f"p50={row['p50_ms']:>8.2f}ms p99={row['p99_ms']:>8.2f}ms qps={row['qps']:>8.1f} "
+                    f"build={row['build_s']:.3f}s index={index_bytes / 1024:.0f}KiB"
+                )
+    return rows
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def _max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)
+
+
+def compare(old_path: str, rows: List[dict]):
+    """Print metric deltas vs. a previous results file (same alias/index/mode rows)."""
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = {(r["alias"], r["index"], r["mode"]): r for r in json.load(f)["results"]}
+    for r in rows:
+        prev = old.get((r["alias"], r["index"], r["mode"]))
+        if prev is None:
+            continue
+        deltas = []
+        for key in r:
+            if key.startswith("hit@") or key in ("mrr", "p50_ms", "p99_ms", "qps"):
+                if key in prev:
+                    deltas.append(f"{key} {r[key] - prev[key]:+.3f}")
+        print(f"{r['alias']:<7} {r['index']:<5} {r['mode']:<7} " + "  ".join(deltas))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Retrieval benchmark: hit@k, MRR, latency, QPS, build time, memory")
+    ap.add_argument("--corpus", help="JSONL of {doc_id, text}")
+    ap.add_argument("--queries", help="JSONL of {query, relevant: [doc_id]}")
+    ap.add_argument("--aliases", nargs="+", default=["minilm"], choices=sorted(embeddings._MODEL_ALIASES))
+    ap.add_argument("--index", nargs="+", default=["flat"], choices=INDEX_TYPES)
+    ap.add_argument("--modes", nargs="+", default=["dense", "hybrid"], choices=MODES)
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--candidates", type=int, default=20, help="candidates for hybrid fusion / re-ranking")
+    ap.add_argument("--rerank-budget-ms", type=float, default=150.0)
+    ap.add_argument("--out", help="write JSON results here")
+    ap.add_argument("--compare", help="previous results JSON to diff against")
+    args = ap.parse_args()
+
+    docs, queries = load_dataset(args.corpus, args.queries)
+    rows = run(args.aliases, args.index, args.modes, docs, queries, k=args.k,
+               candidates=args.candidates, rerank_budget_ms=args.rerank_budget_ms)
+    report = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "docs": len(docs),
+        "queries": len(queries),
+        "max_rss_mb": _max_rss_mb(),
+        "results": rows,
+    }
+    print(f"[bench] peak RSS {report['max_rss_mb']} MB")
+    if args.compare:
+        compare(args.compare, rows)
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[bench] wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# agent/long_memory/bm25.py
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+BM25_FILE = "bm25.json"
+
+# Words plus identifier-ish runs (E1234, ERR_CONN-42, v1.2.3) kept whole so exact
+# codes and names match; their parts are indexed too.
+_TOKEN = re.compile(r"[A-Za-z0-9]+(?:[_.\-][A-Za-z0-9]+)*")
+_PART = re.compile(r"[A-Za-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    out: List[str] = []
+    for m in _TOKEN.finditer(text.lower()):
+        tok = m.group(0)
+        out.append(tok)
+        if not tok.isalnum():
+            out.extend(_PART.findall(tok))
+    return out
+
+
+@dataclass
+class BM25Index:
+    """Okapi BM25 over the same row ids as the FAISS index it sits next to."""
+
+    k1: float = 1.5
+    b: float = 0.75
+    doc_len: List[int] = field(default_factory=list)
+    postings: Dict[str, Tuple[List[int], List[int]]] = field(default_factory=dict)
+    _arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = field(default_factory=dict, init=False, repr=False)
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.doc_len)
+
+    # -------- build/add/search --------
+    def add(self, texts: Iterable[str]):
+        """Append documents; row ids continue from the current count."""
+        for text in texts:
+            doc_id = len(self.doc_len)
+            counts = Counter(tokenize(text))
+            self.doc_len.append(sum(counts.values()))
+            for term, tf in counts.items():
+                ids, tfs = self.postings.setdefault(term, ([], []))
+                ids.append(doc_id)
+                tfs.append(tf)
+        self._arrays.clear()
+
+    def _posting(self, term: str):
+        arr = self._arrays.get(term)
+        if arr is None and term in self.postings:
+            ids, tfs = self.postings[term]
+            arr = (np.asarray(ids, dtype=np.int64), np.asarray(tfs, dtype=np.float32))
+            self._arrays[term] = arr
+        return arr
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[float, int]]:
+        """Returns [(bm25_score, row_id)] best first; rows without any term are skipped."""
+        n = self.n_docs
+        if n == 0:
+            return []
+        dl = np.asarray(self.doc_len, dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * dl / max(dl.mean(), 1e-9))
+        scores = np.zeros(n, dtype=np.float32)
+        for term in set(tokenize(query)):
+            post = self._posting(term)
+            if post is None:
+                continue
+            ids, tfs = post
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + norm[ids])
+        hit = np.flatnonzero(scores)
+        if hit.size == 0:
+            return []
+        k = min(top_k, hit.size)
+        top = hit[np.argpartition(-scores[hit], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), int(i)) for i in top]
+
+    # -------- persistence --------
+    def save(self, out_dir: str):
+        os.makedirs(out_dir, exist_ok=True)
+        with open(os.path.join(out_dir, BM25_FILE), "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "doc_len": self.doc_len, "postings": self.postings}, f)
+
+    @staticmethod
+    def load(in_dir: str) -> "BM25Index":
+        path = os.path.join(in_dir, BM25_FILE)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"BM25 index not found in {in_dir}")
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return BM25Index(
+            k1=data["k1"],
+            b=data["b"],
+            doc_len=list(data["doc_len"]),
+            postings={t: (p[0], p[1]) for t, p in data["postings"].items()},
+        )
@@ -1,33 +1,271 @@
 # agent/long_memory/chunker.py
 from __future__ import annotations
-from typing import List
 
+import mmap
+import os
+import re
+from typing import Callable, Iterator, List, NamedTuple, Tuple
 
-def chunk_text(text: str, max_chars: int = 256, overlap: int = 32) -> List[str]:
+# Sentence end (., !, ? followed by whitespace) or a blank line (paragraph break).
+# Both are pure ASCII, so splitting the raw UTF-8 bytes on them never cuts a character.
+_BOUNDARY = re.compile(rb"(?<=[.!?])[ \t]+|(?<=[.!?])\r?\n|\r?\n[ \t]*\r?\n\s*")
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_WORD = re.compile(rb"\S+")
+
+BLOCK_BYTES = 1 << 20  # bytes read from the source per step (bounds memory)
+
+
+class Chunk(NamedTuple):
+    """
+    A chunk plus its [start, end) byte span in the UTF-8 source. `resume` is
+    where to restart chunking after this chunk so the next one still opens
+    with its overlap (the start of the trailing sentences it would share).
     """
-    Split a long string into overlapping chunks.
-    Works for documents, transcripts, Markdown, etc.
 
-    Example:
-        chunks = chunk_text(long_doc, max_chars=300, overlap=50)
+    text: str
+    start: int
+    end: int
+    resume: int
 
-    Returns list[str] with no chunk larger than `max_chars`,
-    and each chunk overlaps the next by `overlap` characters.
+
+def approx_tokens(text: str) -> int:
+    """Cheap token estimate (words + punctuation); close to WordPiece for English."""
+    return len(_TOKEN.findall(text))
+
+
+def iter_chunks(text: str, max_chars: int = 256, overlap: int = 32) -> Iterator[str]:
+    """
+    Lazily yield overlapping fixed-size character windows of `text`.
+
+    Same windows as `chunk_text`, but produced one at a time so callers
+    never hold every chunk of a document.
     """
+    if overlap >= max_chars:
+        raise ValueError(f"overlap ({overlap}) must be smaller than max_chars ({max_chars})")
     text = text.strip()
     if len(text) <= max_chars:
-        return [text]
+        if text:
+            yield text
+        return
 
-    chunks = []
     start = 0
     end = max_chars
 
     while start < len(text):
         chunk = text[start:end].strip()
         if chunk:
-            chunks.append(chunk)
+            yield chunk
 
         start = end - overlap
         end = start + max_chars
 
-    return chunks
\ No newline at end of file
+
+def chunk_text(text: str, max_chars: int = 256, overlap: int = 32) -> List[str]:
+    """
+    Split a long string into overlapping chunks.
+    Works for documents, transcripts, Markdown, etc.
+
+    Example:
+        chunks = chunk_text(long_doc, max_chars=300, overlap=50)
+
+    Returns list[str] with no chunk larger than `max_chars`,
+    and each chunk overlaps the next by `overlap` characters.
+    Raises ValueError if `overlap >= max_chars` (it would never advance).
+    """
+    if overlap >= max_chars:
+        raise ValueError(f"overlap ({overlap}) must be smaller than max_chars ({max_chars})")
+    if len(text.strip()) <= max_chars:
+        return [text.strip()]
+    return list(iter_chunks(text, max_chars=max_chars, overlap=overlap))
+
+
+# -----------------------------
+# Streaming, boundary-aware chunking
+# -----------------------------
+
+def _char_safe_cut(buf: bytes, limit: int) -> int:
+    """Largest cut <= limit that lands on whitespace, else on a UTF-8 char boundary."""
+    ws = max(buf.rfind(b" ", 0, limit), buf.rfind(b"\n", 0, limit))
+    if ws > 0:
+        return ws + 1
+    cut = limit
+    while cut > 0 and (buf[cut] & 0xC0) == 0x80:
+        cut -= 1
+    return cut or limit
+
+
+def _iter_blocks(source) -> Iterator[bytes]:
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        for pos in range(0, len(source), BLOCK_BYTES):
+            yield bytes(source[pos:pos + BLOCK_BYTES])
+        return
+    while True:
+        block = source.read(BLOCK_BYTES)
+        if not block:
+            return
+        yield block.encode("utf-8") if isinstance(block, str) else block
+
+
+def iter_segments(source, base: int = 0, max_segment_bytes: int = 4096) -> Iterator[Tuple[bytes, int, int]]:
+    """
+    Yield (raw_bytes, start, end) sentence/paragraph segments from `source`.
+
+    `source` is bytes, an mmap/memoryview, or a binary/text stream. Only
+    one block plus the unfinished tail is held at a time. Segments longer
+    than `max_segment_bytes` (e.g. a minified line) are hard-split on
+    whitespace.
+    """
+    carry = b""
+    pos = base  # absolute offset of carry[0]
+
+    def emit(seg: bytes, start: int):
+        while len(seg) > max_segment_bytes:
+            cut = _char_safe_cut(seg, max_segment_bytes)
+            yield seg[:cut], start, start + cut
+            seg, start = seg[cut:], start + cut
+        if seg.strip():
+            yield seg, start, start + len(seg)
+
+    for block in _iter_blocks(source):
+        buf = carry + block
+        last = 0
+        for m in _BOUNDARY.finditer(buf):
+            yield from emit(buf[last:m.start()], pos + last)
+            last = m.end()
+        carry, pos = buf[last:], pos + last
+        if len(carry) > max_segment_bytes:
+            cut = _char_safe_cut(carry, max_segment_bytes)
+            yield from emit(carry[:cut], pos)
+            carry, pos = carry[cut:], pos + cut
+    if carry:
+        yield from emit(carry, pos)
+
+
+def _split_word(word: bytes, start: int, max_tokens: int,
+                count_tokens: Callable[[str], int]) -> Iterator[Tuple[str, int, int]]:
+    """One whitespace-free run, cut by characters if it alone is over the budget."""
+    text = word.decode("utf-8", errors="replace")
+    if count_tokens(text) <= max_tokens:
+        yield text, start, start + len(word)
+        return
+    offsets = [0]  # byte offset of every character boundary
+    for ch in text:
+        offsets.append(offsets[-1] + len(ch.encode("utf-8")))
+    n, i = len(text), 0
+    step = max(16, max_tokens * 4)
+    while i < n:
+        # Gallop, then binary-search the longest piece within budget: O(log n)
+        # tokenizer calls per piece instead of one per character (base64, minified JSON).
+        lo, hi = i + 1, min(n, i + step)  # text[i:lo] is accepted (at least one character)
+        while lo < hi and count_tokens(text[i:hi]) <= max_tokens:
+            lo, hi = hi, min(n, i + 2 * (hi - i))
+        while hi - lo > 1:  # text[i:lo] fits, text[i:hi] does not
+            mid = (lo + hi) // 2
+            if count_tokens(text[i:mid]) <= max_tokens:
+                lo = mid
+            else:
+                hi = mid
+        yield text[i:lo], start + offsets[i], start + offsets[lo]
+        i = lo
+
+
+def _split_segment(raw: bytes, start: int, max_tokens: int,
+                   count_tokens: Callable[[str], int]) -> Iterator[Tuple[str, int, int, int]]:
+    """Hard-split one over-budget segment on whitespace into pieces of at most `max_tokens`."""
+    words: List[Tuple[str, int, int]] = []
+    used = 0
+    for m in _WORD.finditer(raw):
+        for word, ws, we in _split_word(m.group(), start + m.start(), max_tokens, count_tokens):
+            n = count_tokens(word)
+            if words and used + n > max_tokens:
+                yield " ".join(w[0] for w in words), words[0][1], words[-1][2], used
+                words, used = [], 0
+            words.append((word, ws, we))
+            used += n
+    if words:
+        yield " ".join(w[0] for w in words), words[0][1], words[-1][2], used
+
+
+def _overlap(window: List[Tuple[str, int, int, int]], overlap_tokens: int, room: int) -> List[Tuple[str, int, int, int]]:
+    """Whole trailing segments (never the first) worth at most `overlap_tokens` and `room`."""
+    keep: List[Tuple[str, int, int, int]] = []
+    kept = 0
+    for seg in reversed(window[1:]):
+        if kept + seg[3] > min(overlap_tokens, room):
+            break
+        keep.insert(0, seg)
+        kept += seg[3]
+    return keep
+
+
+def chunk_stream(
+    source,
+    max_tokens: int = 200,
+    overlap_tokens: int = 32,
+    count_tokens: Callable[[str], int] = approx_tokens,
+    base: int = 0,
+) -> Iterator[Chunk]:
+    """
+    Pack sentence/paragraph segments into chunks of at most `max_tokens`.
+
+    Consecutive chunks share trailing whole sentences worth up to
+    `overlap_tokens`. Offsets are UTF-8 byte offsets into the source
+    (shifted by `base` when resuming mid-file), so metadata can point back
+    into the original file via `read_span`. Memory stays bounded by one
+    block plus one chunk, regardless of source size. A single sentence that
+    is longer than the budget is hard-split on whitespace by `count_tokens`,
+    so no chunk exceeds `max_tokens`.
+    """
+    if overlap_tokens >= max_tokens:
+        raise ValueError(f"overlap_tokens ({overlap_tokens}) must be smaller than max_tokens ({max_tokens})")
+
+    window: List[Tuple[str, int, int, int]] = []  # (text, start, end, tokens)
+    used = 0
+
+    def flush() -> Chunk:
+        start, end = window[0][1], window[-1][2]
+        text = " ".join(t for t, _, _, _ in window)
+        keep = _overlap(window, overlap_tokens, max_tokens)
+        return Chunk(text, start, end, keep[0][1] if keep else end)
+
+    def segments() -> Iterator[Tuple[str, int, int, int]]:
+        # The byte bound only caps memory per segment; the token budget is enforced below.
+        for raw, start, end in iter_segments(source, base=base, max_segment_bytes=max(1024, max_tokens * 16)):
+            text = " ".join(raw.decode("utf-8", errors="replace").split())
+            if not text:
+                continue
+            n = count_tokens(text)
+            if n <= max_tokens:
+                yield text, start, end, n
+            else:
+                yield from _split_segment(raw, start, max_tokens, count_tokens)
+
+    for text, start, end, n in segments():
+        if window and used + n > max_tokens:
+            yield flush()
+            # Keep whole trailing sentences as overlap, but always drop at least one.
+            window = _overlap(window, overlap_tokens, max_tokens - n)
+            used = sum(seg[3] for seg in window)
+        window.append((text, start, end, n))
+        used += n
+    if window:
+        yield flush()
+
+
+def chunk_file(path: str, start: int = 0, **kwargs) -> Iterator[Chunk]:
+    """Memory-map `path` and stream boundary-aware chunks from byte `start` on."""
+    if os.path.getsize(path) <= start:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)[start:]
+        try:
+            yield from chunk_stream(view, base=start, **kwargs)
+        finally:
+            view.release()
+
+
+def read_span(path: str, start: int, end: int) -> str:
+    """Resolve a chunk's (start, end) byte offsets back to source text."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(end - start).decode("utf-8", errors="replace")
@@ -0,0 +1,274 @@
+# agent/long_memory/dedup.py
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .chunker import approx_tokens
+
+# -----------------------------
+# Near-duplicate chunk elimination (MinHash + LSH)
+# -----------------------------
+# Each chunk becomes a set of hashed word 3-gram shingles and a MinHash
+# signature. Signatures are split into bands; chunks sharing any band bucket
+# are candidates, confirmed when the estimated Jaccard similarity reaches
+# `threshold`. Exact copies short-circuit on a text hash. The first chunk of a
+# cluster is kept (embedded + indexed); later copies are dropped and recorded
+# on the representative's meta as back-references:
+#   meta["dups"] = [{"doc_id": ..., "chunk_id": ...}, ...]
+#
+# Example:
+#   dd = NearDuplicateFilter(threshold=0.8)
+#   if dd.offer(text, meta) is None: keep(text, meta)   # else it was folded into a representative
+#   dd.report(dim=384)
+#
+# State can be checkpointed next to an index so a resumed ingest does not
+# re-read and re-hash every committed chunk. DEDUP_FILE is append-only: a
+# 16-byte header, then one fixed-size record per representative (exact key,
+# band hashes, signature) in store-row order. On load the signatures stay
+# memory-mapped and only two sorted uint64 tables (exact keys, band hashes)
+# are kept in RAM; representatives added afterwards live in small dicts.
+#   dd.save("storage/faiss_docs")                              # after each store.save
+#   dd.load("storage/faiss_docs", store.metas)                 # -> representatives restored
+#
+
+DEDUP_FILE = "dedup_state.bin"
+_MAGIC = b"MINHASH1"
+_HEADER = np.dtype([("magic", "S8"), ("num_perm", "<u2"), ("bands", "<u2"), ("shingle_words", "<u2"), ("pad", "<u2")])
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _h32(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+def shingles(text: str, n: int = 3) -> np.ndarray:
+    """Hashed word n-grams of normalized text (uint64, values < 2**32)."""
+    words = _WORD.findall(text.lower())
+    if len(words) <= n:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i:i + n]) for i in range(len(words) - n + 1)]
+    return np.unique(np.fromiter((_h32(g) for g in grams), dtype=np.uint64, count=len(grams)))
+
+
+@dataclass
+class MinHasher:
+    num_perm: int = 64
+    seed: int = 1
+
+    def __post_init__(self):
+        rng = np.random.default_rng(self.seed)
+        # (a * x + b) mod p with a, x < 2**32 fits in uint64 before the modulo.
+        self._a = rng.integers(1, 1 << 32, size=self.num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=self.num_perm, dtype=np.uint64)
+
+    def signature(self, hashed_shingles: np.ndarray) -> np.ndarray:
+        x = hashed_shingles.reshape(-1, 1)
+        perm = ((x * self._a + self._b) % _MERSENNE) & _MAX_HASH
+        return perm.min(axis=0).astype(np.uint32)
+
+
+def _norm_key(text: str) -> int:
+    digest = hashlib.blake2b(" ".join(_WORD.findall(text.lower())).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+_BAND_SEED = np.uint64(0x9E3779B97F4A7C15)
+_BAND_MUL = np.uint64(0x100000001B3)
+
+
+def _band_hashes(sigs: np.ndarray, bands: int) -> np.ndarray:
+    """(n, bands) uint64 bucket ids (FNV-style over each band's slots; the band number seeds the hash)."""
+    parts = sigs.reshape(sigs.shape[0], bands, -1).astype(np.uint64)
+    h = np.tile(np.arange(1, bands + 1, dtype=np.uint64) * _BAND_SEED, (sigs.shape[0], 1))
+    for r in range(parts.shape[2]):
+        h = (h ^ parts[:, :, r]) * _BAND_MUL  # uint64 arrays wrap on overflow
+    return h
+
+
+def _sorted_matches(keys: np.ndarray, reps: np.ndarray, h: int) -> List[int]:
+    lo, hi = np.searchsorted(keys, np.uint64(h), "left"), np.searchsorted(keys, np.uint64(h), "right")
+    return reps[lo:hi].tolist()
+
+
+@dataclass
+class NearDuplicateFilter:
+    """Streaming near-dup detector; keeps the first chunk of every cluster."""
+
+    threshold: float = 0.8
+    num_perm: int = 64
+    bands: int = 8
+    shingle_words: int = 3
+    kept: int = 0
+    dropped: int = 0
+    exact: int = 0
+    dropped_tokens: int = 0
+    dropped_chars: int = 0
+    _hasher: MinHasher = field(init=False, repr=False)
+    # Representatives restored by `load` (rows 0..len(_base)-1): memory-mapped records + sorted lookup tables.
+    _base: np.ndarray = field(init=False, repr=False)
+    _base_keys: np.ndarray = field(init=False, repr=False)
+    _base_key_reps: np.ndarray = field(init=False, repr=False)
+    _base_bands: np.ndarray = field(init=False, repr=False)
+    _base_band_reps: np.ndarray = field(init=False, repr=False)
+    # Representatives registered since (rows len(_base)...).
+    _exact: Dict[int, int] = field(default_factory=dict, init=False, repr=False)
+    _buckets: Dict[int, List[int]] = field(default_factory=dict, init=False, repr=False)
+    _sigs: List[np.ndarray] = field(default_factory=list, init=False, repr=False)
+    _metas: List[dict] = field(default_factory=list, init=False, repr=False)
+    _pending: List[Tuple[int, np.ndarray, np.ndarray]] = field(default_factory=list, init=False, repr=False)
+    _file_ok: bool = field(default=False, init=False, repr=False)
+
+    def __post_init__(self):
+        if self.num_perm % self.bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self._hasher = MinHasher(self.num_perm)
+        self._record = np.dtype([("key", "<u8"), ("bands", "<u8", (self.bands,)), ("sig", "<u4", (self.num_perm,))])
+        self._set_base(np.empty(0, self._record))
+
+    def _set_base(self, base: np.ndarray):
+        self._base = base
+        order = np.argsort(base["key"], kind="stable")
+        self._base_keys, self._base_key_reps = base["key"][order], order.astype(np.uint32)
+        flat = base["bands"].reshape(-1)
+        order = np.argsort(flat, kind="stable")
+        self._base_bands, self._base_band_reps = flat[order], (order // self.bands).astype(np.uint32)
+
+    def _sig(self, rep: int) -> np.ndarray:
+        n = len(self._base)
+        return self._base["sig"][rep] if rep < n else self._sigs[rep - n]
+
+    def _register(self, key: int, sig: np.ndarray, bands: np.ndarray, meta: dict):
+        rep = len(self._metas)
+        self._sigs.append(sig)
+        self._metas.append(meta)
+        self._exact[key] = rep
+        for h in bands.tolist():
+            self._buckets.setdefault(h, []).append(rep)
+        self._pending.append((key, bands, sig))
+
+    def _find(self, key: int, sig: np.ndarray, bands: np.ndarray) -> Tuple[Optional[int], bool]:
+        rep = self._exact.get(key)
+        if rep is None:
+            reps = _sorted_matches(self._base_keys, self._base_key_reps, key)
+            rep = reps[0] if reps else None
+        if rep is not None:
+            return rep, True
+        best, best_sim = None, self.threshold
+        seen = set()
+        for h in bands.tolist():
+            for cand in chain(self._buckets.get(h, ()), _sorted_matches(self._base_bands, self._base_band_reps, h)):
+                if cand in seen:
+                    continue
+                seen.add(cand)
+                sim = float(np.mean(self._sig(cand) == sig))
+                if sim >= best_sim:
+                    best, best_sim = cand, sim
+        return best, False
+
+    def _hash(self, text: str) -> Tuple[int, np.ndarray, np.ndarray]:
+        sig = self._hasher.signature(shingles(text, self.shingle_words))
+        return _norm_key(text), sig, _band_hashes(sig[None, :], self.bands)[0]
+
+    def seed(self, text: str, meta: dict):
+        """Register an already-indexed chunk (e.g. on resume) as a representative."""
+        self._register(*self._hash(text), meta)
+
+    def save(self, out_dir: str):
+        """Append representatives registered since the last save/load to out_dir/DEDUP_FILE."""
+        path = os.path.join(out_dir, DEDUP_FILE)
+        rec = np.empty(len(self._pending), self._record)
+        for i, (key, bands, sig) in enumerate(self._pending):
+            rec[i] = (key, bands, sig)
+        # A file `load` did not accept (other params / foreign rows) is started over.
+        with open(path, "ab" if self._file_ok else "wb") as f:
+            if not self._file_ok:
+                f.write(np.array([(_MAGIC, self.num_perm, self.bands, self.shingle_words, 0)], _HEADER).tobytes())
+            f.write(rec.tobytes())
+        self._file_ok = True
+        self._pending.clear()
+
+    def load(self, out_dir: str, metas: Sequence[dict]) -> int:
+        """
+        Restore representatives saved for store rows 0..len(metas)-1; returns how many.
+        Rows past the committed store are cut off; rows missing from the file
+        (saved without dedup) are left for the caller to `seed`.
+        """
+        if self._metas:
+            raise ValueError("load() must be called before any chunk is offered")
+        path = os.path.join(out_dir, DEDUP_FILE)
+        if not os.path.exists(path):
+            return 0
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            head = np.frombuffer(f.read(_HEADER.itemsize), _HEADER)
+        if len(head) != 1 or (head["magic"][0], int(head["num_perm"][0]), int(head["bands"][0]),
+                              int(head["shingle_words"][0])) != (_MAGIC, self.num_perm, self.bands, self.shingle_words):
+            print(f"[dedup] {path} was written with other MinHash settings; rebuilding it")
+            return 0
+        n = min((size - _HEADER.itemsize) // self._record.itemsize, len(metas))
+        os.truncate(path, _HEADER.itemsize + n * self._record.itemsize)  # also drops a torn trailing record
+        self._file_ok = True
+        if n:
+            self._set_base(np.memmap(path, dtype=self._record, mode="r", offset=_HEADER.itemsize, shape=(n,)))
+        self._metas = list(metas[:n])
+        return n
+
+    def offer(self, text: str, meta: dict) -> Optional[dict]:
+        """
+        None if `text` is new (caller keeps it; `meta` becomes a representative).
+        Otherwise the representative's meta, which now lists `meta` in "dups".
+        """
+        key, sig, bands = self._hash(text)
+        rep, exact = self._find(key, sig, bands)
+        if rep is None:
+            self._register(key, sig, bands, meta)
+            self.kept += 1
+            return None
+        rep_meta = self._metas[rep]
+        ref = {k: meta[k] for k in ("doc_id", "chunk_id") if k in meta}
+        dups = rep_meta.setdefault("dups", [])
+        if ref not in dups:  # a resumed ingest may offer the same chunk again
+            dups.append(ref)
+        self.dropped += 1
+        self.exact += exact
+        self.dropped_tokens += approx_tokens(text)
+        self.dropped_chars += len(text)
+        return rep_meta
+
+    def report(self, dim: Optional[int] = None) -> dict:
+        """What dedup saved: chunks/tokens not embedded and vector/text bytes not indexed."""
+        seen = self.kept + self.dropped
+        out = {
+            "chunks_seen": seen,
+            "duplicates_dropped": self.dropped,
+            "exact_duplicates": self.exact,
+            "dup_rate": round(self.dropped / seen, 4) if seen else 0.0,
+            "tokens_not_embedded": self.dropped_tokens,
+            "text_bytes_saved": self.dropped_chars,
+        }
+        if dim:
+            out["vector_bytes_saved"] = self.dropped * dim * 4
+        return out
+
+
+def dedup_chunks(texts: List[str], metas: List[dict], threshold: float = 0.8) -> Tuple[List[str], List[dict], dict]:
+    """Batch form: (kept_texts, kept_metas, report)."""
+    dd = NearDuplicateFilter(threshold=threshold)
+    kept_t: List[str] = []
+    kept_m: List[dict] = []
+    for text, meta in zip(texts, metas):
+        if dd.offer(text, meta) is None:
+            kept_t.append(text)
+            kept_m.append(meta)
+    return kept_t, kept_m, dd.report()
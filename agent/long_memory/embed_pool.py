@@ -0,0 +1,152 @@
+# agent/long_memory/embed_pool.py
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import os
+import time
+from multiprocessing import shared_memory
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from . import embeddings
+
+# -----------------------------
+# Multi-process embedding pool
+# -----------------------------
+# Each worker process loads the selected model once (USE_MODEL is inherited or
+# passed explicitly) and encodes a slice of the batch straight into a shared
+# memory block, so vectors never travel back through pickling.
+#
+# Example:
+#   with EmbeddingPool(workers=4) as pool:
+#       vecs = pool.embed(texts)          # normalized float32 (n, d)
+#
+#   python -m agent.long_memory.embed_pool bench --workers 1 2 4 --batch 32 128 512
+#
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # Workers only attach; the parent owns (and unlinks) the block.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _init_worker(alias: Optional[str], threads: int):
+    if alias:
+        os.environ["USE_MODEL"] = alias
+    try:
+        import torch
+
+        torch.set_num_threads(threads)  # avoid N workers x all cores oversubscription
+    except ImportError:
+        pass
+    embeddings.embed_texts(["warm up"])  # loads whichever backend is selected
+
+
+def _worker_dim() -> int:
+    return int(embeddings.embed_texts(["dim probe"]).shape[1])
+
+
+def _encode_into(shm_name: str, shape: tuple, row: int, texts: List[str]) -> int:
+    shm = _attach(shm_name)
+    try:
+        out = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+        out[row:row + len(texts)] = embeddings.embed_texts(texts)
+        del out
+    finally:
+        shm.close()
+    return len(texts)
+
+
+class EmbeddingPool:
+    """Fan embedding batches out to `workers` CPU processes, each holding a model."""
+
+    def __init__(self, workers: int = 2, alias: Optional[str] = None, min_slice: int = 32):
+        self.workers = max(1, workers)
+        self.min_slice = min_slice
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        # spawn: torch/tokenizers are not fork-safe once initialized
+        ctx = mp.get_context("spawn")
+        self._pool = ctx.Pool(self.workers, initializer=_init_worker, initargs=(alias, threads))
+        self.dim = self._pool.apply(_worker_dim)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed `texts` across the pool -> normalized float32 (n, d)."""
+        texts = list(texts)
+        n = len(texts)
+        if n == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+
+        shape = (n, self.dim)
+        shm = shared_memory.SharedMemory(create=True, size=n * self.dim * 4)
+        try:
+            step = max(self.min_slice, -(-n // self.workers))
+            jobs = [
+                self._pool.apply_async(_encode_into, (shm.name, shape, i, texts[i:i + step]))
+                for i in range(0, n, step)
+            ]
+            for j in jobs:
+                j.get()
+            # One copy out of the shared block so it can be unlinked right away.
+            return np.ndarray(shape, dtype=np.float32, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self) -> "EmbeddingPool":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# -----------------------------
+# Benchmark
+# -----------------------------
+
+def _bench_texts(n: int) -> List[str]:
+    words = "apple banana car doctor hospital nurse fruit wheel red yellow index vector query".split()
+    return [" ".join(words[(i + k) % len(words)] for k in range(8 + i % 24)) for i in range(n)]
+
+
+def bench(workers: Sequence[int], batches: Sequence[int], n: int = 2048) -> List[dict]:
+    """texts/sec for each (workers, batch size); workers=0 means in-process `embed_texts`."""
+    texts = _bench_texts(n)
+    rows: List[dict] = []
+    for w in workers:
+        pool = EmbeddingPool(workers=w) if w > 0 else None
+        embed = pool.embed if pool else embeddings.embed_texts
+        embed(texts[:8])  # warm up
+        for b in batches:
+            t0 = time.perf_counter()
+            for i in range(0, n, b):
+                embed(texts[i:i + b])
+            dt = time.perf_counter() - t0
+            rows.append({"workers": w, "batch": b, "texts_per_sec": round(n / dt, 1)})
+            print(f"workers={w:<3} batch={b:<5} {n / dt:10.1f} texts/sec")
+        if pool:
+            pool.close()
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Embedding pool benchmark")
+    ap.add_argument("mode", choices=["bench"])
+    ap.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4], help="0 = in-process baseline")
+    ap.add_argument("--batch", type=int, nargs="+", default=[32, 128, 512])
+    ap.add_argument("--n", type=int, default=2048, help="texts per run")
+    args = ap.parse_args()
+    print(f"[bench] model: {embeddings.resolved_model_name()}  cpus: {os.cpu_count()}")
+    bench(args.workers, args.batch, n=args.n)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,9 @@
 from __future__ import annotations
 
 import os
-from functools import lru_cache
-from typing import Iterable, List
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Iterable, List, Optional
 
 import numpy as np
 
@@ -14,31 +15,137 @@ import numpy as np
 #   minilm  -> sentence-transformers/all-MiniLM-L6-v2 (384 dims)
 #   bge     -> BAAI/bge-small-en-v1.5                    (512 dims)
 #   e5      -> intfloat/e5-small-v2                      (384 dims)
+#   nomic   -> nomic-embed-text served by a local Ollama  (768 dims)
+#
+# Ollama aliases call OLLAMA_HOST (default http://127.0.0.1:11434) /api/embed
+# in batches of OLLAMA_EMBED_BATCH over one pooled HTTP session, with at most
+# OLLAMA_EMBED_CONCURRENCY requests in flight.
+#
+# EMBED_BACKEND env values:
+#   torch   -> SentenceTransformer (default)
+#   onnx    -> int8-quantized ONNX Runtime on CPU (see onnx_backend.py;
+#              export once with `python -m agent.long_memory.onnx_backend export`)
+#
+# Indexes are stamped with `model_stamp()` (alias, model name and
+# EMBED_MODEL_VERSION, bumped by hand when weights change under the same name).
+# Every embedding function takes an optional `alias` so queries against an
+# index can be embedded with the model it was built with, whatever USE_MODEL
+# currently says (see reembed.py for migrating an index to a new model).
 #
 # Example:
 #   USE_MODEL=bge python -m agent.long_memory.faiss_play build
+#   USE_MODEL=bge EMBED_BACKEND=onnx python -m agent.long_memory.faiss_play query "car wheels"
 #
 
 _MODEL_ALIASES = {
     "minilm": "sentence-transformers/all-MiniLM-L6-v2",
     "bge": "BAAI/bge-small-en-v1.5",
     "e5": "intfloat/e5-small-v2",
+    "nomic": "nomic-embed-text:latest",
+}
+
+# Aliases served by Ollama instead of a local SentenceTransformer.
+_OLLAMA_MODELS = {"nomic"}
+
+# HF tokenizer for aliases whose model name is not an HF repo (token counting only).
+_TOKENIZERS = {
+    "nomic": "nomic-ai/nomic-embed-text-v1.5",
+}
+
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434").rstrip("/")
+OLLAMA_EMBED_BATCH = int(os.getenv("OLLAMA_EMBED_BATCH", "64"))
+OLLAMA_EMBED_CONCURRENCY = int(os.getenv("OLLAMA_EMBED_CONCURRENCY", "4"))
+EMBED_MODEL_VERSION = os.getenv("EMBED_MODEL_VERSION", "1")
+
+# Max sequence length (tokens) each model was trained with; chunk budgets use these.
+_MAX_SEQ_TOKENS = {
+    "minilm": 256,
+    "bge": 512,
+    "e5": 512,
+    "nomic": 2048,  # Ollama's default num_ctx
+}
+
+# Output dimension of Ollama-served models, so empty input can return (0, dim)
+# without a request; other Ollama models are probed once.
+_OLLAMA_DIMS = {
+    "nomic": 768,
 }
 
+# Sentence-transformers pooling per model (the ONNX backend reproduces it).
+_POOLING = {
+    "minilm": "mean",
+    "bge": "cls",
+    "e5": "mean",
+}
+
+_BACKENDS = ("torch", "onnx")
+
 
 def _selected_alias() -> str:
     raw = (os.getenv("USE_MODEL") or "minilm").strip().lower()
     return raw if raw in _MODEL_ALIASES else "minilm"
 
 
-def resolved_model_name() -> str:
-    return _MODEL_ALIASES[_selected_alias()]
+def _alias(alias: Optional[str] = None) -> str:
+    return alias if alias in _MODEL_ALIASES else _selected_alias()
 
 
-@lru_cache(maxsize=1)
-def _load_model():
-    name = resolved_model_name()
-    print(f"[embeddings] loading: {name} ({_selected_alias()})")
+def resolved_model_name(alias: Optional[str] = None) -> str:
+    return _MODEL_ALIASES[_alias(alias)]
+
+
+def model_stamp(alias: Optional[str] = None) -> dict:
+    """Identity of the vectors a model produces; saved with every index built from them."""
+    a = _alias(alias)
+    return {"alias": a, "name": _MODEL_ALIASES[a], "version": EMBED_MODEL_VERSION}
+
+
+def stamp_alias(stamp: Optional[dict]) -> Optional[str]:
+    """Alias to embed queries with for an index stamped `stamp` (None: unstamped, use USE_MODEL)."""
+    if not stamp:
+        return None
+    alias = stamp.get("alias")
+    return alias if alias in _MODEL_ALIASES else None
+
+
+def selected_backend() -> str:
+    raw = (os.getenv("EMBED_BACKEND") or "torch").strip().lower()
+    return raw if raw in _BACKENDS else "torch"
+
+
+def token_budget(alias: Optional[str] = None) -> int:
+    """
+    Content tokens that fit the model's input: its max sequence length minus the
+    special tokens the encoder adds ([CLS]/[SEP]), which `count_tokens` leaves out.
+    Longer inputs are truncated by the encoder.
+    """
+    alias = _alias(alias)
+    try:
+        special = _load_tokenizer(alias).num_special_tokens_to_add()
+    except (ImportError, OSError):  # no transformers / tokenizer files: assume [CLS] + [SEP]
+        special = 2
+    return _MAX_SEQ_TOKENS[alias] - special
+
+
+@lru_cache(maxsize=4)
+def _load_tokenizer(alias: Optional[str] = None):
+    # Tokenizer only: much lighter than loading the full model.
+    from transformers import AutoTokenizer
+
+    alias = _alias(alias)
+    return AutoTokenizer.from_pretrained(_TOKENIZERS.get(alias, _MODEL_ALIASES[alias]))
+
+
+def count_tokens(text: str) -> int:
+    """Exact token count for the selected model, excluding [CLS]/[SEP]."""
+    return len(_load_tokenizer().encode(text, add_special_tokens=False))
+
+
+@lru_cache(maxsize=2)  # the served model plus one being migrated to
+def _load_model(alias: Optional[str] = None):
+    alias = _alias(alias)
+    name = resolved_model_name(alias)
+    print(f"[embeddings] loading: {name} ({alias})")
     from sentence_transformers import SentenceTransformer
 
     # For BGE/e5, pooling/normalization handled the same way as MiniLM here.
@@ -46,20 +153,93 @@ def _load_model():
     return model
 
 
-def _to_array(vectors: List[List[float]]) -> np.ndarray:
-    arr = np.asarray(vectors, dtype="float32")
+def _normalize_inplace(arr: np.ndarray) -> np.ndarray:
+    """L2-normalize rows of a float32 (n, d) array without copying it."""
+    arr = np.asarray(arr, dtype="float32")  # no-op for encoder output
     # Normalize for cosine (so dot == cosine)
-    norms = np.linalg.norm(arr, axis=1, keepdims=True) + 1e-12
-    return arr / norms
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    norms += 1e-12
+    arr /= norms
+    return arr
 
 
-def embed_texts(texts: Iterable[str]) -> np.ndarray:
-    """Batch embed a list of strings -> normalized float32 (n, d)."""
-    model = _load_model()
+# -----------------------------
+# Ollama backend
+# -----------------------------
+
+@lru_cache(maxsize=1)
+def _ollama_session():
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=OLLAMA_EMBED_CONCURRENCY)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@lru_cache(maxsize=1)
+def _ollama_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=OLLAMA_EMBED_CONCURRENCY, thread_name_prefix="ollama-embed")
+
+
+def _ollama_embed_batch(texts: List[str], model: Optional[str] = None) -> np.ndarray:
+    r = _ollama_session().post(
+        f"{OLLAMA_HOST}/api/embed",
+        json={"model": model or resolved_model_name(), "input": texts},
+        timeout=120,
+    )
+    try:
+        r.raise_for_status()
+    except Exception as e:
+        raise RuntimeError(f"Ollama embed HTTP error: {r.text[:200]}") from e
+    data = r.json()
+    if "error" in data:
+        raise RuntimeError(f"Ollama error: {data['error']}")
+    vecs = data.get("embeddings")
+    if not isinstance(vecs, list) or len(vecs) != len(texts):
+        raise RuntimeError(f"Ollama returned {len(vecs or [])} embeddings for {len(texts)} inputs")
+    return np.asarray(vecs, dtype="float32")
+
+
+@lru_cache(maxsize=None)
+def _ollama_dim(alias: str) -> int:
+    if alias in _OLLAMA_DIMS:
+        return _OLLAMA_DIMS[alias]
+    return _ollama_embed_batch(["dimension probe"], _MODEL_ALIASES[alias]).shape[1]
+
+
+def _ollama_encode(texts: List[str], model: Optional[str] = None) -> np.ndarray:
+    batches = [texts[i:i + OLLAMA_EMBED_BATCH] for i in range(0, len(texts), OLLAMA_EMBED_BATCH)]
+    if len(batches) == 1:
+        return _ollama_embed_batch(batches[0], model)
+    # map() preserves order; the executor bounds requests in flight.
+    return np.concatenate(list(_ollama_executor().map(partial(_ollama_embed_batch, model=model), batches)), axis=0)
+
+
+def embed_texts(texts: Iterable[str], alias: Optional[str] = None) -> np.ndarray:
+    """Batch embed a list of strings -> normalized float32 (n, d). `alias` overrides USE_MODEL."""
+    alias = _alias(alias)
+    if alias in _OLLAMA_MODELS:
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, _ollama_dim(alias)), dtype="float32")
+        return _normalize_inplace(_ollama_encode(texts, _MODEL_ALIASES[alias]))
+    if selected_backend() == "onnx":
+        from .onnx_backend import load_onnx_embedder
+
+        return _normalize_inplace(load_onnx_embedder(alias).encode(list(texts)))
+    model = _load_model(alias)
     vectors = model.encode(list(texts), batch_size=64, convert_to_numpy=True, show_progress_bar=False)
-    return _to_array(vectors.tolist())
+    return _normalize_inplace(vectors)
+
+
+def embed_queries(texts: Iterable[str], alias: Optional[str] = None) -> np.ndarray:
+    """Embed many queries in one encoder call -> normalized (n, d); pairs with FaissStore.search_batch."""
+    return embed_texts(texts, alias)
 
 
-def embed_query(text: str) -> np.ndarray:
+def embed_query(text: str, alias: Optional[str] = None) -> np.ndarray:
     """Embed a single query string -> normalized (1, d)."""
-    return embed_texts([text])
+    return embed_queries([text], alias)
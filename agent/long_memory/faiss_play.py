@@ -6,8 +6,11 @@ import os
 from typing import List, Tuple
 
 from .chunker import chunk_text
-from .embeddings import embed_query, embed_texts, resolved_model_name
+from .dedup import dedup_chunks
+from .embeddings import embed_query, embed_texts, model_stamp, resolved_model_name, stamp_alias
 from .faiss_store import FaissStore
+from .hybrid import HybridRetriever, build_bm25
+from .rerank import get_reranker
 
 INDEX_DIR = "storage/faiss_demo"
 
@@ -39,27 +42,53 @@ def _docs_to_chunks(docs: List[str]) -> Tuple[List[str], List[dict]]:
 def build_index():
     docs = _sample_corpus()
     chunks, metas = _docs_to_chunks(docs)
+    chunks, metas, report = dedup_chunks(chunks, metas)
+    if report["duplicates_dropped"]:
+        print(f"[build] dropped {report['duplicates_dropped']} near-duplicate chunks "
+              f"(~{report['tokens_not_embedded']} tokens not embedded)")
     vecs = embed_texts(chunks)
-    store = FaissStore(dim=vecs.shape[1])
+    store = FaissStore(dim=vecs.shape[1], model=model_stamp())
     store.build(vecs, chunks, metas)
     store.save(INDEX_DIR)
-    print(f"[build] Saved FAISS index → {INDEX_DIR}")
+    build_bm25(store).save(INDEX_DIR)
+    print(f"[build] Saved FAISS index + BM25 sidecar → {INDEX_DIR}")
 
 
-def query_once(q: str, top_k: int = 3):
+def query_once(q: str, top_k: int = 3, rerank: bool = False, candidates: int = 20, budget_ms: float = 150.0):
     store = FaissStore.load(INDEX_DIR)
-    qv = embed_query(q)
-    hits = store.search(qv, top_k=top_k)
-    print(f"loading embedding model: {resolved_model_name()} …")
+    alias = stamp_alias(store.model)  # the index's model, not necessarily USE_MODEL
+    qv = embed_query(q, alias)
+    hits = store.search(qv, top_k=candidates if rerank else top_k)
+    print(f"loading embedding model: {resolved_model_name(alias)} …")
+    if rerank:
+        reranker = get_reranker()
+        reranker.load()  # one-shot CLI: wait for the model rather than skip re-ranking
+        hits, stats = reranker.rerank(q, hits, keep=top_k, budget_ms=budget_ms)
+        print("[rerank] " + "  ".join(f"{k}={v}" for k, v in stats.items()))
     for sc, text, meta, ix in hits:
         print(f"{sc:0.3f}  {meta.get('doc_id', '?'):>5}  {text}")
 
 
+def query_hybrid(q: str, top_k: int = 3, dense_weight: float = 1.0, lexical_weight: float = 1.0):
+    retriever = HybridRetriever.load(INDEX_DIR)
+    hits, timings = retriever.search(q, top_k=top_k, dense_weight=dense_weight, lexical_weight=lexical_weight)
+    model = resolved_model_name(stamp_alias(retriever.store.model))
+    print(f"[hybrid] {model}  " + "  ".join(f"{k}={v}" for k, v in timings.items()))
+    for sc, text, meta, ix in hits:
+        print(f"{sc:0.4f}  {meta.get('doc_id', '?'):>5}  {text}")
+
+
 def main():
     ap = argparse.ArgumentParser(description="FAISS demo: build / query")
     ap.add_argument("mode", choices=["build", "query"], help="build or query")
     ap.add_argument("query", nargs="?", default="", help="query text when mode=query")
     ap.add_argument("--topk", type=int, default=5)
+    ap.add_argument("--hybrid", action="store_true", help="BM25 + vector search fused by RRF")
+    ap.add_argument("--dense-weight", type=float, default=1.0)
+    ap.add_argument("--lexical-weight", type=float, default=1.0)
+    ap.add_argument("--rerank", action="store_true", help="re-rank dense candidates with a cross-encoder")
+    ap.add_argument("--candidates", type=int, default=20, help="dense candidates passed to the re-ranker")
+    ap.add_argument("--rerank-budget-ms", type=float, default=150.0)
     args = ap.parse_args()
 
     os.makedirs(os.path.dirname(INDEX_DIR), exist_ok=True)
@@ -69,7 +98,12 @@ def main():
     else:
         if not args.query:
             raise SystemExit("Provide a query string, e.g.  python -m agent.long_memory.faiss_play query 'red fruit'")
-        query_once(args.query, top_k=args.topk)
+        if args.hybrid:
+            query_hybrid(args.query, top_k=args.topk, dense_weight=args.dense_weight,
+                         lexical_weight=args.lexical_weight)
+        else:
+            query_once(args.query, top_k=args.topk, rerank=args.rerank, candidates=args.candidates,
+                       budget_ms=args.rerank_budget_ms)
 
 
 if __name__ == "__main__":
@@ -4,67 +4,161 @@ from __future__ import annotations
 import json
 import os
 from dataclasses import dataclass, field
-from typing import List, Tuple
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
-import faiss
 import numpy as np
 
+from .filters import Filter, MetadataIndex, build_metadata_index, search_params
+
+if TYPE_CHECKING:
+    import faiss
+
+# faiss is imported where it is used: importing this module (e.g. for
+# INDEX_FILE or the FaissStore type) should not load the native library.
+
 INDEX_FILE = "index.faiss"
 META_FILE = "meta.json"
 
 
 @dataclass
 class FaissStore:
-    """Cosine similarity via inner-product FAISS (requires normalized vectors)."""
+    """
+    Cosine similarity via inner-product FAISS (requires normalized vectors).
+
+    `factory` is a FAISS index_factory string ("Flat", "HNSW32", "IVF64,Flat", ...);
+    trainable indexes are trained on the vectors passed to `build`.
+    `model` is the embedding stamp (`embeddings.model_stamp()`) the vectors came
+    from; None for stores saved before stamping existed.
+    `mmap_mode` says how `load` mapped the index: "ifc" (flat codes mapped,
+    newer FAISS), "mmap" (only IVF lists are mapped) or None (read into RAM).
+    """
 
     dim: int
+    factory: str = "Flat"
+    model: Optional[dict] = None
     index: faiss.Index = field(init=False)
     texts: List[str] = field(default_factory=list)
     metas: List[dict] = field(default_factory=list)
+    mmap_mode: Optional[str] = field(default=None, init=False, repr=False)
+    _meta_index: Optional[MetadataIndex] = field(default=None, init=False, repr=False)
 
     def __post_init__(self):
+        import faiss
+
         # Inner product == cosine if inputs are L2-normalized
-        self.index = faiss.IndexFlatIP(self.dim)
+        if self.factory == "Flat":
+            self.index = faiss.IndexFlatIP(self.dim)
+        else:
+            self.index = faiss.index_factory(self.dim, self.factory, faiss.METRIC_INNER_PRODUCT)
 
     # -------- build/add/search --------
     def build(self, vectors: np.ndarray, texts: List[str], metas: List[dict]):
         assert vectors.ndim == 2 and vectors.shape[0] == len(texts) == len(metas)
         assert vectors.dtype == np.float32
+        if not self.index.is_trained:
+            self.index.train(vectors)
         self.index.add(vectors)
         self.texts = list(texts)
         self.metas = list(metas)
+        self._meta_index = None
 
     def add(self, vectors: np.ndarray, texts: List[str], metas: List[dict]):
         assert vectors.ndim == 2 and vectors.shape[0] == len(texts) == len(metas)
         self.index.add(vectors.astype("float32"))
         self.texts.extend(texts)
         self.metas.extend(metas)
+        if self._meta_index is not None:
+            self._meta_index.add(metas)
+
+    def reconstruct(self, start: int = 0) -> np.ndarray:
+        """Stored vectors from row `start` on (IVF indexes get a direct map to reconstruct)."""
+        n = self.index.ntotal - start
+        if n <= 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        import faiss
+
+        try:
+            faiss.extract_index_ivf(self.index).make_direct_map()
+        except (RuntimeError, TypeError):
+            pass
+        return self.index.reconstruct_n(start, n)
+
+    def truncate(self, n: int):
+        """Drop every entry at position >= n (used to roll back a partial ingest)."""
+        if n >= self.index.ntotal:
+            return
+        import faiss
+
+        self.index.remove_ids(faiss.IDSelectorRange(n, self.index.ntotal))
+        del self.texts[n:]
+        del self.metas[n:]
+        self._meta_index = None
 
-    def search(self, query_vec: np.ndarray, top_k: int = 5) -> List[Tuple[float, str, dict, int]]:
+    def search(self, query_vec: np.ndarray, top_k: int = 5, where: Optional[Filter] = None
+               ) -> List[Tuple[float, str, dict, int]]:
         """
         Returns list of (score, text, meta, doc_id)
         Scores are cosine similarities in [0, 1+epsilon].
+        `where` restricts results to rows whose meta matches (see filters.py).
         """
         if query_vec.ndim == 1:
             query_vec = query_vec.reshape(1, -1)
-        assert query_vec.shape[1] == self.dim
-
-        scores, ids = self.index.search(query_vec.astype("float32"), top_k)
-        out: List[Tuple[float, str, dict, int]] = []
-        for sc, ix in zip(scores[0], ids[0]):
-            if ix == -1:
-                continue
-            out.append((float(sc), self.texts[ix], self.metas[ix], int(ix)))
+        return self.search_batch(query_vec[:1], top_k=top_k, where=where)[0]
+
+    def metadata_index(self) -> MetadataIndex:
+        """Inverted meta postings, built on first filtered search and kept current by `add`."""
+        if self._meta_index is None:
+            self._meta_index = build_metadata_index(self.metas)
+        return self._meta_index
+
+    def search_batch(self, query_matrix: np.ndarray, top_k: int = 5, where: Optional[Filter] = None,
+                     mask: Optional[np.ndarray] = None) -> List[List[Tuple[float, str, dict, int]]]:
+        """
+        Search many queries with one FAISS call (lets FAISS batch the BLAS work).
+        `query_matrix` is (n, dim); returns one hit list per row, same shape as `search`.
+        With `where`, non-matching rows are skipped inside FAISS via an ID selector;
+        `mask` (bool per row) restricts the search the same way, ANDed with `where`.
+        """
+        assert query_matrix.ndim == 2
+        if query_matrix.shape[1] != self.dim:
+            built = (self.model or {}).get("name", "an unrecorded model")
+            raise ValueError(
+                f"query vectors have dim {query_matrix.shape[1]} but this index has dim {self.dim} "
+                f"(built with {built}); embed queries with the index's model or re-embed it"
+            )
+        q = np.ascontiguousarray(query_matrix, dtype=np.float32)
+        if where or mask is not None:
+            allowed = self.metadata_index().bitmap(where) if where else np.ones(self.index.ntotal, dtype=bool)
+            if mask is not None:
+                allowed &= mask
+            params, _keepalive, matched = search_params(self.index, allowed)
+            if matched == 0:
+                return [[] for _ in range(q.shape[0])]
+            scores, ids = self.index.search(q, top_k, params=params)
+        else:
+            scores, ids = self.index.search(q, top_k)
+        out: List[List[Tuple[float, str, dict, int]]] = []
+        for row_scores, row_ids in zip(scores, ids):
+            hits: List[Tuple[float, str, dict, int]] = []
+            for sc, ix in zip(row_scores, row_ids):
+                if ix == -1:
+                    continue
+                hits.append((float(sc), self.texts[ix], self.metas[ix], int(ix)))
+            out.append(hits)
         return out
 
     # -------- persistence --------
     def save(self, out_dir: str):
+        import faiss
+
         os.makedirs(out_dir, exist_ok=True)
         faiss.write_index(self.index, os.path.join(out_dir, INDEX_FILE))
         with open(os.path.join(out_dir, META_FILE), "w", encoding="utf-8") as f:
             json.dump(
                 {
                     "dim": self.dim,
+                    "factory": self.factory,
+                    "model": self.model,
                     "texts": self.texts,
                     "metas": self.metas,
                 },
@@ -74,18 +168,40 @@ class FaissStore:
             )
 
     @staticmethod
-    def load(in_dir: str) -> "FaissStore":
+    def load(in_dir: str, mmap: bool = False) -> "FaissStore":
+        """
+        Load a saved store. With `mmap=True` the vectors are memory-mapped
+        read-only (pages come from the OS cache on demand); don't `add` to it.
+        """
         index_path = os.path.join(in_dir, INDEX_FILE)
         meta_path = os.path.join(in_dir, META_FILE)
         if not (os.path.exists(index_path) and os.path.exists(meta_path)):
             raise FileNotFoundError(f"FAISS store not found in {in_dir}")
 
-        index = faiss.read_index(index_path)
+        import faiss
+
+        mmap_mode = None
+        if mmap:
+            # MMAP_IFC also maps flat codes (newer FAISS); plain MMAP covers IVF lists.
+            ifc = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+            try:
+                if ifc is None:
+                    raise RuntimeError("IO_FLAG_MMAP_IFC unavailable")
+                index = faiss.read_index(index_path, ifc | faiss.IO_FLAG_READ_ONLY)
+                mmap_mode = "ifc"
+            except RuntimeError:
+                index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+                mmap_mode = "mmap"
+        else:
+            index = faiss.read_index(index_path)
         with open(meta_path, "r", encoding="utf-8") as f:
             meta = json.load(f)
 
         store = FaissStore(dim=int(meta["dim"]))
+        store.factory = meta.get("factory", "Flat")
+        store.model = meta.get("model")
         store.index = index
+        store.mmap_mode = mmap_mode
         store.texts = list(meta["texts"])
         store.metas = list(meta["metas"])
         return store
@@ -0,0 +1,128 @@
+# agent/long_memory/filters.py
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, List
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import faiss
+
+# -----------------------------
+# Metadata filters pushed into FAISS
+# -----------------------------
+# Each scalar meta field gets an inverted index value -> row ids. A filter is
+# evaluated to one bitmap over all rows and handed to FAISS as an
+# IDSelectorBitmap, so the index skips non-matching rows during the search
+# itself instead of us over-fetching top-k and discarding in Python.
+#
+# Filter syntax (all clauses at one level are ANDed):
+#   {"doc_id": "doc_3"}                       equality
+#   {"doc_id": ["doc_1", "doc_2"]}            any of
+#   {"chunk_id": {"$ne": 0}}                  not equal / {"$in": [...]} / {"$nin": [...]}
+#   {"$or": [{"doc_id": "a"}, {"source": "b"}]}
+#   {"$and": [...]}, {"$not": {...}}
+#
+
+Filter = Dict[str, Any]
+_SCALARS = (str, int, float, bool)
+
+
+class MetadataIndex:
+    """Inverted postings per meta field, kept in step with the store's row ids."""
+
+    def __init__(self):
+        self.n = 0
+        self._postings: Dict[str, Dict[Any, List[int]]] = {}
+        self._arrays: Dict[tuple, np.ndarray] = {}
+
+    def add(self, metas: List[dict]):
+        for meta in metas:
+            row = self.n
+            for key, value in meta.items():
+                if isinstance(value, _SCALARS):
+                    self._postings.setdefault(key, {}).setdefault(value, []).append(row)
+            self.n += 1
+        self._arrays.clear()
+
+    def _ids(self, key: str, value: Any) -> np.ndarray:
+        cache_key = (key, value)
+        arr = self._arrays.get(cache_key)
+        if arr is None:
+            arr = np.asarray(self._postings.get(key, {}).get(value, ()), dtype=np.int64)
+            self._arrays[cache_key] = arr
+        return arr
+
+    def _match(self, key: str, values) -> np.ndarray:
+        bm = np.zeros(self.n, dtype=bool)
+        for v in values:
+            bm[self._ids(key, v)] = True
+        return bm
+
+    def bitmap(self, where: Filter) -> np.ndarray:
+        """Evaluate a filter to a bool mask over rows."""
+        bm = np.ones(self.n, dtype=bool)
+        for key, cond in where.items():
+            if key == "$and":
+                for sub in cond:
+                    bm &= self.bitmap(sub)
+            elif key == "$or":
+                acc = np.zeros(self.n, dtype=bool)
+                for sub in cond:
+                    acc |= self.bitmap(sub)
+                bm &= acc
+            elif key == "$not":
+                bm &= ~self.bitmap(cond)
+            elif isinstance(cond, dict):
+                for op, arg in cond.items():
+                    if op == "$eq":
+                        bm &= self._match(key, [arg])
+                    elif op == "$ne":
+                        bm &= ~self._match(key, [arg])
+                    elif op == "$in":
+                        bm &= self._match(key, arg)
+                    elif op == "$nin":
+                        bm &= ~self._match(key, arg)
+                    else:
+                        raise ValueError(f"Unsupported filter operator {op!r}")
+            elif isinstance(cond, (list, tuple, set)):
+                bm &= self._match(key, cond)
+            else:
+                bm &= self._match(key, [cond])
+        return bm
+
+
+class _Selector:
+    """Keeps the packed bitmap alive for as long as FAISS holds a pointer to it."""
+
+    def __init__(self, mask: np.ndarray):
+        import faiss
+
+        self.bits = np.packbits(mask, bitorder="little")
+        self.sel = faiss.IDSelectorBitmap(mask.size, faiss.swig_ptr(self.bits))
+        self.count = int(mask.sum())
+
+
+def search_params(index: faiss.Index, mask: np.ndarray) -> tuple:
+    """(SearchParameters, keepalive, matching_rows) for `index` restricted to `mask`."""
+    import faiss
+
+    selector = _Selector(mask)
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except (RuntimeError, TypeError):
+        ivf = None
+    if ivf is not None:
+        params = faiss.SearchParametersIVF(sel=selector.sel, nprobe=ivf.nprobe)
+    elif hasattr(index, "hnsw"):
+        params = faiss.SearchParametersHNSW(sel=selector.sel, efSearch=index.hnsw.efSearch)
+    else:
+        params = faiss.SearchParameters(sel=selector.sel)
+    return params, selector, selector.count
+
+
+def build_metadata_index(metas: List[dict]) -> MetadataIndex:
+    mi = MetadataIndex()
+    mi.add(metas)
+    return mi
+
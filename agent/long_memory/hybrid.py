@@ -0,0 +1,110 @@
+# agent/long_memory/hybrid.py
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from .bm25 import BM25_FILE, BM25Index
+from .chunker import read_span
+from .embeddings import embed_query, stamp_alias
+from .faiss_store import FaissStore
+
+# -----------------------------
+# Hybrid retrieval (BM25 + dense) with reciprocal-rank fusion
+# -----------------------------
+# RRF score of a chunk = sum over retrievers of  weight / (k_rrf + rank),
+# rank starting at 1. It only needs ranks, so BM25 and cosine scores never
+# have to be put on the same scale.
+#
+# Example:
+#   r = HybridRetriever.load("storage/faiss_demo")
+#   hits, timings = r.search("error E1234", top_k=5, dense_weight=0.5, lexical_weight=1.0)
+#
+
+Hit = Tuple[float, str, dict, int]
+
+
+def chunk_text_of(store: FaissStore, ix: int) -> str:
+    """Stored text, or the source span for stores ingested with --offsets-only."""
+    text = store.texts[ix]
+    meta = store.metas[ix]
+    if not text and "source" in meta:
+        return read_span(meta["source"], meta["start"], meta["end"])
+    return text
+
+
+def build_bm25(store: FaissStore) -> BM25Index:
+    bm25 = BM25Index()
+    bm25.add(chunk_text_of(store, i) for i in range(len(store.texts)))
+    return bm25
+
+
+def rrf_fuse(rankings: List[Tuple[List[int], float]], k_rrf: int = 60) -> List[Tuple[float, int]]:
+    """Fuse ranked id lists, each with a weight -> [(rrf_score, id)] best first."""
+    fused: Dict[int, float] = {}
+    for ids, weight in rankings:
+        if weight <= 0:
+            continue
+        for rank, ix in enumerate(ids, start=1):
+            fused[ix] = fused.get(ix, 0.0) + weight / (k_rrf + rank)
+    return sorted(((s, ix) for ix, s in fused.items()), reverse=True)
+
+
+@dataclass
+class HybridRetriever:
+    store: FaissStore
+    bm25: BM25Index
+
+    @staticmethod
+    def load(in_dir: str) -> "HybridRetriever":
+        """Load the FAISS store and its BM25 sidecar (rebuilt + saved if missing or stale)."""
+        store = FaissStore.load(in_dir)
+        bm25 = BM25Index.load(in_dir) if os.path.exists(os.path.join(in_dir, BM25_FILE)) else None
+        if bm25 is None or bm25.n_docs != len(store.texts):
+            print(f"[hybrid] building BM25 sidecar for {in_dir}")
+            bm25 = build_bm25(store)
+            bm25.save(in_dir)
+        return HybridRetriever(store, bm25)
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        dense_weight: float = 1.0,
+        lexical_weight: float = 1.0,
+        candidates: int = 50,
+        k_rrf: int = 60,
+    ) -> Tuple[List[Hit], Dict[str, float]]:
+        """
+        Run both retrievers over `candidates` each and fuse by weighted RRF.
+
+        Returns (hits, timings) where hits are (rrf_score, text, meta, id) and
+        timings has per-stage milliseconds: embed, dense, lexical, fuse.
+        A zero weight skips that retriever entirely.
+        """
+        timings = {"embed_ms": 0.0, "dense_ms": 0.0, "lexical_ms": 0.0, "fuse_ms": 0.0}
+        rankings: List[Tuple[List[int], float]] = []
+
+        if dense_weight > 0:
+            t0 = time.perf_counter()
+            qv = embed_query(query, stamp_alias(self.store.model))
+            t1 = time.perf_counter()
+            dense = self.store.search(qv, top_k=candidates)
+            t2 = time.perf_counter()
+            timings["embed_ms"] = (t1 - t0) * 1000
+            timings["dense_ms"] = (t2 - t1) * 1000
+            rankings.append(([ix for _, _, _, ix in dense], dense_weight))
+
+        if lexical_weight > 0:
+            t0 = time.perf_counter()
+            lexical = self.bm25.search(query, top_k=candidates)
+            timings["lexical_ms"] = (time.perf_counter() - t0) * 1000
+            rankings.append(([ix for _, ix in lexical], lexical_weight))
+
+        t0 = time.perf_counter()
+        fused = rrf_fuse(rankings, k_rrf=k_rrf)[:top_k]
+        hits = [(sc, chunk_text_of(self.store, ix), self.store.metas[ix], ix) for sc, ix in fused]
+        timings["fuse_ms"] = (time.perf_counter() - t0) * 1000
+        return hits, {k: round(v, 3) for k, v in timings.items()}
@@ -0,0 +1,248 @@
+# agent/long_memory/ingest.py
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Iterator, List, Optional, Tuple
+
+from .chunker import chunk_file
+from .dedup import DEDUP_FILE, NearDuplicateFilter
+from .embeddings import count_tokens, embed_texts, model_stamp, resolved_model_name, token_budget
+from .faiss_store import FaissStore, INDEX_FILE
+from .hybrid import build_bm25, chunk_text_of
+
+# -----------------------------
+# Streaming directory ingestion
+# -----------------------------
+# Walks a folder in a stable (sorted) order, streams every file (memory-mapped)
+# through the sentence-aware chunker under the embedding model's token budget,
+# embeds fixed-size batches and appends them to a FaissStore. Each chunk's meta
+# records its byte span in the source file.
+# Progress is checkpointed next to the index so an interrupted run resumes
+# from the last committed batch instead of starting over.
+# Near-duplicate chunks (MinHash, see dedup.py) are folded into the first copy
+# before embedding; the kept chunk lists the dropped ones in meta["dups"].
+# The dedup band table is checkpointed with the index (dedup.DEDUP_FILE), so a
+# resume restores it instead of re-hashing every committed chunk.
+#
+# Example:
+#   python -m agent.long_memory.ingest docs/ --out storage/faiss_docs
+#   python -m agent.long_memory.ingest docs/ --out storage/faiss_docs --batch 128 --ext .md .txt
+#   python -m agent.long_memory.ingest big/ --offsets-only   # keep only spans; resolve with read_span
+#
+
+CHECKPOINT_FILE = "ingest_state.json"
+DEFAULT_EXTS = (".md", ".txt", ".rst")
+
+
+@dataclass
+class Checkpoint:
+    """Cursor of the last batch that made it to disk."""
+
+    model: str
+    file: str = ""        # relative path of the file the cursor points into
+    chunk: int = 0        # next chunk index to process inside `file`
+    offset: int = 0       # byte offset in `file` to resume chunking from (start of the next chunk's overlap)
+    ntotal: int = 0       # vectors committed to the store at this cursor
+
+    def save(self, out_dir: str):
+        tmp = os.path.join(out_dir, CHECKPOINT_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f, indent=2)
+        os.replace(tmp, os.path.join(out_dir, CHECKPOINT_FILE))
+
+    @staticmethod
+    def load(out_dir: str) -> Optional["Checkpoint"]:
+        path = os.path.join(out_dir, CHECKPOINT_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return Checkpoint(**json.load(f))
+
+
+def list_files(root: str, exts=DEFAULT_EXTS) -> List[str]:
+    """Relative paths under `root`, sorted so the resume cursor can compare them."""
+    out: List[str] = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if exts and not name.lower().endswith(tuple(exts)):
+                continue
+            out.append(os.path.relpath(os.path.join(dirpath, name), root))
+    return sorted(out)
+
+
+def iter_file_chunks(root: str, rel: str, start_chunk: int = 0, offset: int = 0,
+                     max_tokens: Optional[int] = None, overlap_tokens: int = 32) -> Iterator[Tuple[str, dict]]:
+    """Yield (chunk, meta) for one file, starting at byte `offset` / chunk number `start_chunk`."""
+    path = os.path.join(root, rel)
+    budget = max_tokens or token_budget()
+    for j, ch in enumerate(
+        chunk_file(path, start=offset, max_tokens=budget, overlap_tokens=overlap_tokens, count_tokens=count_tokens),
+        start_chunk,
+    ):
+        yield ch.text, {"doc_id": rel, "chunk_id": j, "source": os.path.abspath(path),
+                        "start": ch.start, "end": ch.end, "resume": ch.resume}
+
+
+def _open_store(out_dir: str, resume: bool) -> Tuple[Optional[FaissStore], Checkpoint]:
+    model = resolved_model_name()
+    ckpt = Checkpoint.load(out_dir) if resume else None
+    if ckpt is None:
+        return None, Checkpoint(model=model)
+    if ckpt.model != model:
+        raise SystemExit(
+            f"[ingest] checkpoint in {out_dir} was built with {ckpt.model}, current model is {model}. "
+            "Use --restart or a different --out."
+        )
+    if not os.path.exists(os.path.join(out_dir, INDEX_FILE)):
+        return None, Checkpoint(model=model)
+    store = FaissStore.load(out_dir)
+    # A crash between store.save and checkpoint.save leaves extra vectors; roll them back.
+    store.truncate(ckpt.ntotal)
+    return store, ckpt
+
+
+def ingest_dir(root: str, out_dir: str, batch_size: int = 64, checkpoint_every: int = 10,
+               exts=DEFAULT_EXTS, resume: bool = True, max_tokens: Optional[int] = None,
+               overlap_tokens: int = 32, store_text: bool = True,
+               dedup_threshold: Optional[float] = 0.8) -> dict:
+    """
+    Stream `root` into a FaissStore at `out_dir`.
+
+    Only one batch of chunk texts/vectors is held outside the store at a time.
+    With `store_text=False` the store keeps empty texts and callers resolve
+    chunks from meta["source"]/["start"]/["end"] via `chunker.read_span`.
+    `dedup_threshold=None` disables near-duplicate elimination.
+    Returns a small stats dict (chunks, files, seconds, chunks_per_sec, dedup).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    store, ckpt = _open_store(out_dir, resume)
+    if ckpt.ntotal:
+        print(f"[ingest] resuming at {ckpt.file or '<start>'}#{ckpt.chunk} ({ckpt.ntotal} chunks committed)")
+    dedup = NearDuplicateFilter(threshold=dedup_threshold) if dedup_threshold else None
+    if dedup is not None:
+        committed = store.metas if store is not None else []
+        # Rows committed by a run without dedup are not in the saved table; hash those once.
+        for i in range(dedup.load(out_dir, committed), len(committed)):
+            dedup.seed(chunk_text_of(store, i), committed[i])
+    elif store is None and os.path.exists(os.path.join(out_dir, DEDUP_FILE)):
+        os.remove(os.path.join(out_dir, DEDUP_FILE))  # describes an index this run is replacing
+
+    texts: List[str] = []
+    metas: List[dict] = []
+    batches_since_save = 0
+    added = 0
+    files = 0
+    embed_s = 0.0
+    t0 = time.perf_counter()
+
+    def flush(cursor_file: str, cursor_chunk: int, cursor_offset: int):
+        nonlocal store, texts, metas, batches_since_save, added, embed_s
+        if texts:
+            te = time.perf_counter()
+            vecs = embed_texts(texts)
+            embed_s += time.perf_counter() - te
+            if store is None:
+                store = FaissStore(dim=vecs.shape[1], model=model_stamp())
+            store.add(vecs, texts if store_text else [""] * len(texts), metas)
+            added += len(texts)
+            texts, metas = [], []
+            batches_since_save += 1
+        ckpt.file, ckpt.chunk, ckpt.offset = cursor_file, cursor_chunk, cursor_offset
+        if store is not None and batches_since_save >= checkpoint_every:
+            commit()
+
+    def commit():
+        nonlocal batches_since_save
+        store.save(out_dir)
+        if dedup is not None:
+            dedup.save(out_dir)  # rows past ckpt.ntotal (crash before the checkpoint) are cut on load
+        ckpt.ntotal = store.index.ntotal
+        ckpt.save(out_dir)
+        batches_since_save = 0
+
+    for rel in list_files(root, exts):
+        if ckpt.file and rel < ckpt.file:
+            continue
+        resuming = rel == ckpt.file
+        j = ckpt.chunk if resuming else 0
+        off = ckpt.offset if resuming else 0
+        end = off
+        for ch, meta in iter_file_chunks(root, rel, j, off, max_tokens=max_tokens, overlap_tokens=overlap_tokens):
+            # Resume mid-file where the next chunk's overlap begins, not at this chunk's end.
+            j, off, end = meta["chunk_id"] + 1, meta.pop("resume"), meta["end"]
+            if dedup is not None and dedup.offer(ch, meta) is not None:
+                continue  # recorded on its representative's meta; nothing to embed
+            texts.append(ch)
+            metas.append(meta)
+            if len(texts) >= batch_size:
+                flush(rel, j, off)
+        files += 1
+        flush(rel, j, end)  # past the file's last chunk: nothing of it is left to redo
+
+    # Final commit; the cursor now sits past the last chunk so a rerun is a no-op.
+    if store is not None:
+        commit()
+        build_bm25(store).save(out_dir)  # lexical sidecar for hybrid search
+
+    elapsed = time.perf_counter() - t0
+    stats = {
+        "chunks": added,
+        "total_chunks": store.index.ntotal if store is not None else 0,
+        "files": files,
+        "seconds": round(elapsed, 3),
+        "embed_seconds": round(embed_s, 3),
+        "chunks_per_sec": round(added / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    print(
+        f"[ingest] +{stats['chunks']} chunks ({stats['total_chunks']} total) from {stats['files']} files "
+        f"in {stats['seconds']}s → {stats['chunks_per_sec']} chunks/sec "
+        f"(embedding {stats['embed_seconds']}s)"
+    )
+    if dedup is not None:
+        stats["dedup"] = dedup.report(dim=store.dim if store is not None else None)
+        d = stats["dedup"]
+        print(
+            f"[ingest] dedup: dropped {d['duplicates_dropped']}/{d['chunks_seen']} chunks "
+            f"({d['exact_duplicates']} exact) → ~{d['tokens_not_embedded']} tokens not embedded, "
+            f"{(d.get('vector_bytes_saved', 0) + d['text_bytes_saved']) / 1024:.1f} KiB index saved"
+        )
+    return stats
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Stream a directory of documents into a FAISS index")
+    ap.add_argument("root", help="directory to ingest")
+    ap.add_argument("--out", default="storage/faiss_docs", help="index directory")
+    ap.add_argument("--batch", type=int, default=64, help="chunks per embedding batch")
+    ap.add_argument("--checkpoint-every", type=int, default=10, help="batches between checkpoints")
+    ap.add_argument("--ext", nargs="*", default=list(DEFAULT_EXTS), help="file extensions to include")
+    ap.add_argument("--max-tokens", type=int, default=None, help="chunk token budget (default: model limit)")
+    ap.add_argument("--overlap-tokens", type=int, default=32)
+    ap.add_argument("--offsets-only", action="store_true", help="store byte spans instead of chunk text")
+    ap.add_argument("--restart", action="store_true", help="ignore any existing checkpoint")
+    ap.add_argument("--dedup-threshold", type=float, default=0.8, help="MinHash Jaccard for near-duplicates")
+    ap.add_argument("--no-dedup", action="store_true", help="embed every chunk, duplicates included")
+    args = ap.parse_args()
+
+    if not os.path.isdir(args.root):
+        raise SystemExit(f"Not a directory: {args.root}")
+    ingest_dir(
+        args.root,
+        args.out,
+        batch_size=args.batch,
+        checkpoint_every=args.checkpoint_every,
+        exts=args.ext,
+        resume=not args.restart,
+        max_tokens=args.max_tokens,
+        overlap_tokens=args.overlap_tokens,
+        store_text=not args.offsets_only,
+        dedup_threshold=None if args.no_dedup else args.dedup_threshold,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# agent/long_memory/namespaces.py
+from __future__ import annotations
+
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from .faiss_store import FaissStore
+from .snapshot_store import SnapshotStore, current_dir, read_current
+
+# -----------------------------
+# Namespaced (per-tenant / per-session) indexes
+# -----------------------------
+# One FaissStore directory per namespace under `root`. Stores are opened on
+# first use (memory-mapped where FAISS supports it), kept in an LRU bounded by
+# approximate resident bytes, and closed when idle. Concurrent first loads of
+# the same namespace wait for one loader instead of each reading the files.
+# `put` publishes a new version beside the old one (snapshot_store layout), so
+# stores still mapping the old files keep working.
+#
+# Example:
+#   ns = NamespaceManager("storage/tenants", max_bytes=512 * 1024**2)
+#   hits = ns.get("acme").search(qv, top_k=5)
+#   ns.metrics()
+#
+
+NAMESPACE_ROOT = "storage/tenants"
+
+
+def _safe_name(namespace: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", namespace)[:128] or "_"
+
+
+def vectors_mapped(store: FaissStore) -> bool:
+    """True if the store's vectors are paged in from its files rather than held in RAM."""
+    ivf = "IVF" in store.factory
+    # MMAP_IFC maps flat codes (Flat, HNSW storage); plain MMAP only maps IVF lists.
+    return (store.mmap_mode == "ifc" and not ivf) or (store.mmap_mode == "mmap" and ivf)
+
+
+def store_bytes(store: FaissStore) -> int:
+    """Approximate RSS of an open store (vectors unless mmapped, plus texts/metas)."""
+    vectors = 0 if vectors_mapped(store) else store.index.ntotal * store.dim * 4
+    texts = sum(sys.getsizeof(t) for t in store.texts)
+    metas = 200 * len(store.metas)  # small dicts; a flat estimate is close enough
+    return vectors + texts + metas
+
+
+@dataclass
+class _Entry:
+    store: FaissStore
+    nbytes: int
+    last_used: float
+
+
+class NamespaceManager:
+    def __init__(
+        self,
+        root: str = NAMESPACE_ROOT,
+        max_bytes: int = 512 * 1024 * 1024,
+        idle_seconds: Optional[float] = 900.0,
+        mmap: bool = True,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.mmap = mmap
+        self._open: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._loading: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._resident = 0
+        self._stats = {"hits": 0, "loads": 0, "evictions": 0, "idle_evictions": 0}
+        self._load_ms: List[float] = []
+        self._janitor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def path(self, namespace: str) -> str:
+        return os.path.join(self.root, _safe_name(namespace))
+
+    # -------- lookup --------
+    def get(self, namespace: str) -> FaissStore:
+        """Open store for `namespace`, loading it on first use. Raises FileNotFoundError."""
+        entry = self._touch(namespace)
+        if entry is not None:
+            return entry.store
+
+        with self._lock:
+            loader = self._loading.setdefault(namespace, threading.Lock())
+        try:
+            with loader:  # one loader per namespace; the rest wait, then hit the cache
+                entry = self._touch(namespace)
+                if entry is not None:
+                    return entry.store
+                t0 = time.perf_counter()
+                store = FaissStore.load(current_dir(self.path(namespace)), mmap=self.mmap)
+                ms = (time.perf_counter() - t0) * 1000
+                self._insert(namespace, store, ms)
+        finally:  # also when the load raises, or every missing namespace leaks a lock
+            with self._lock:
+                if self._loading.get(namespace) is loader:
+                    del self._loading[namespace]
+        return store
+
+    def _touch(self, namespace: str) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._open.get(namespace)
+            if entry is not None:
+                entry.last_used = time.monotonic()
+                self._open.move_to_end(namespace)
+                self._stats["hits"] += 1
+            return entry
+
+    def _insert(self, namespace: str, store: FaissStore, load_ms: float):
+        nbytes = store_bytes(store)
+        with self._lock:
+            self._open[namespace] = _Entry(store, nbytes, time.monotonic())
+            self._resident += nbytes
+            self._stats["loads"] += 1
+            self._load_ms.append(load_ms)
+            del self._load_ms[:-1000]  # keep a recent window for percentiles
+            # Evict least recently used, but never the namespace just loaded.
+            while self._resident > self.max_bytes and len(self._open) > 1:
+                name, old = self._open.popitem(last=False)
+                self._resident -= old.nbytes
+                self._stats["evictions"] += 1
+
+    def put(self, namespace: str, store: FaissStore):
+        """Publish `store` as the next version of `namespace` and drop any stale open copy."""
+        root = self.path(namespace)
+        with self._write_lock:  # never save over files an open (mmapped) store reads
+            SnapshotStore(root, store, read_current(root)).publish(store)
+        self.evict(namespace)
+
+    def evict(self, namespace: str) -> bool:
+        with self._lock:
+            entry = self._open.pop(namespace, None)
+            if entry is None:
+                return False
+            self._resident -= entry.nbytes
+            self._stats["evictions"] += 1
+            return True
+
+    def evict_idle(self, idle_seconds: Optional[float] = None) -> int:
+        """Close namespaces unused for `idle_seconds`; returns how many were evicted."""
+        limit = self.idle_seconds if idle_seconds is None else idle_seconds
+        if limit is None:
+            return 0
+        cutoff = time.monotonic() - limit
+        n = 0
+        with self._lock:
+            for name in [k for k, e in self._open.items() if e.last_used < cutoff]:
+                self._resident -= self._open.pop(name).nbytes
+                n += 1
+            self._stats["idle_evictions"] += n
+        return n
+
+    # -------- background idle sweep --------
+    def start_janitor(self, interval: float = 60.0):
+        if self._janitor is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.evict_idle()
+
+        self._janitor = threading.Thread(target=loop, name="namespace-janitor", daemon=True)
+        self._janitor.start()
+
+    def stop_janitor(self):
+        self._stop.set()
+        if self._janitor is not None:
+            self._janitor.join()
+            self._janitor = None
+        self._stop.clear()
+
+    # -------- metrics --------
+    def metrics(self) -> dict:
+        with self._lock:
+            lat = sorted(self._load_ms)
+            per_ns = {k: e.nbytes for k, e in self._open.items()}
+            stats = dict(self._stats)
+            resident = self._resident
+
+        def pct(p: float) -> float:
+            return round(lat[min(len(lat) - 1, int(len(lat) * p))], 3) if lat else 0.0
+
+        return {
+            "open": len(per_ns),
+            "resident_bytes": resident,
+            "max_bytes": self.max_bytes,
+            "load_ms_p50": pct(0.50),
+            "load_ms_p99": pct(0.99),
+            **stats,
+            "namespaces": per_ns,
+        }
@@ -0,0 +1,222 @@
+# agent/long_memory/onnx_backend.py
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+
+from .embeddings import _MAX_SEQ_TOKENS, _MODEL_ALIASES, _POOLING, _normalize_inplace, _selected_alias
+
+# -----------------------------
+# Quantized ONNX Runtime backend
+# -----------------------------
+# `export` converts a sentence-transformers model to ONNX once (needs torch +
+# transformers), then applies dynamic int8 weight quantization. At runtime
+# only onnxruntime + tokenizers are imported, which is what makes cold start
+# and RSS small on CPU-only hosts.
+#
+# Example:
+#   USE_MODEL=bge python -m agent.long_memory.onnx_backend export
+#   USE_MODEL=bge python -m agent.long_memory.onnx_backend parity     # vs. torch, fails below tolerance
+#   USE_MODEL=bge python -m agent.long_memory.onnx_backend bench
+#   USE_MODEL=bge EMBED_BACKEND=onnx python -m agent.long_memory.faiss_play query "car wheels"
+#
+
+ONNX_DIR = "storage/onnx"
+MODEL_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+# Min cosine(torch, onnx) per vector for an index built with one backend to be
+# queried with the other. int8 weights typically land at 0.99+.
+PARITY_TOLERANCE = 0.98
+
+
+def model_dir(alias: str | None = None) -> str:
+    return os.path.join(ONNX_DIR, alias or _selected_alias())
+
+
+def export(alias: str | None = None) -> str:
+    """Export + int8-quantize the alias's transformer; returns the output dir."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    alias = alias or _selected_alias()
+    if alias not in _POOLING:
+        raise SystemExit(f"[onnx] {alias} is not a local sentence-transformers model; nothing to export")
+    name = _MODEL_ALIASES[alias]
+    out_dir = model_dir(alias)
+    os.makedirs(out_dir, exist_ok=True)
+
+    tok = AutoTokenizer.from_pretrained(name)
+    model = AutoModel.from_pretrained(name).eval()
+    sample = tok(["export sample"], return_tensors="pt")
+    inputs = tuple(sample[k] for k in ("input_ids", "attention_mask", "token_type_ids") if k in sample)
+    input_names = [k for k in ("input_ids", "attention_mask", "token_type_ids") if k in sample]
+    fp32_path = os.path.join(out_dir, "model.fp32.onnx")
+
+    print(f"[onnx] exporting {name} → {fp32_path}")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            inputs,
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={k: {0: "batch", 1: "seq"} for k in input_names + ["last_hidden_state"]},
+            opset_version=17,
+        )
+    quantize_dynamic(fp32_path, os.path.join(out_dir, MODEL_FILE), weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+    tok.backend_tokenizer.save(os.path.join(out_dir, TOKENIZER_FILE))
+    print(f"[onnx] saved int8 model → {os.path.join(out_dir, MODEL_FILE)}")
+    return out_dir
+
+
+class OnnxEmbedder:
+    """Tokenize with `tokenizers`, run the int8 graph, pool like sentence-transformers."""
+
+    def __init__(self, alias: str | None = None, threads: int = 0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.alias = alias or _selected_alias()
+        path = model_dir(self.alias)
+        if not os.path.exists(os.path.join(path, MODEL_FILE)):
+            raise FileNotFoundError(
+                f"No ONNX model in {path}. Run: USE_MODEL={self.alias} python -m agent.long_memory.onnx_backend export"
+            )
+        self.pooling = _POOLING[self.alias]
+        self.tokenizer = Tokenizer.from_file(os.path.join(path, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(_MAX_SEQ_TOKENS[self.alias])
+        self.tokenizer.enable_padding()
+
+        opts = ort.SessionOptions()
+        if threads:
+            opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            os.path.join(path, MODEL_FILE), sess_options=opts, providers=["CPUExecutionProvider"]
+        )
+        self._inputs = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """Un-normalized float32 (n, d) sentence vectors."""
+        out: List[np.ndarray] = []
+        for i in range(0, len(texts), batch_size):
+            enc = self.tokenizer.encode_batch(texts[i:i + batch_size])
+            ids = np.asarray([e.ids for e in enc], dtype=np.int64)
+            mask = np.asarray([e.attention_mask for e in enc], dtype=np.int64)
+            feed = {"input_ids": ids, "attention_mask": mask}
+            if "token_type_ids" in self._inputs:
+                feed["token_type_ids"] = np.zeros_like(ids)
+            hidden = self.session.run(None, feed)[0]  # (b, seq, d)
+            if self.pooling == "cls":
+                pooled = hidden[:, 0]
+            else:
+                m = mask[..., None].astype(np.float32)
+                pooled = (hidden * m).sum(axis=1) / np.clip(m.sum(axis=1), 1e-9, None)
+            out.append(pooled.astype(np.float32, copy=False))
+        return np.concatenate(out, axis=0)
+
+
+@lru_cache(maxsize=2)
+def load_onnx_embedder(alias: str | None = None) -> OnnxEmbedder:
+    alias = alias or _selected_alias()
+    print(f"[embeddings] loading ONNX int8: {_MODEL_ALIASES[alias]} ({alias})")
+    return OnnxEmbedder(alias)
+
+
+# -----------------------------
+# Parity + benchmark
+# -----------------------------
+
+_PROBES = [
+    "Apple is a red fruit.",
+    "A car has four wheels.",
+    "Nurses work in hospitals and assist doctors caring for patients.",
+    "error code E1234 when connecting to the database",
+    "How do I reset my password?",
+    "The apple cultivars vary widely by taste and color, and some are better for baking than eating raw.",
+]
+
+
+def parity(tolerance: float = PARITY_TOLERANCE) -> float:
+    """Min cosine between torch and ONNX vectors on the probe set."""
+    from .embeddings import _load_model
+
+    ref = _normalize_inplace(_load_model(_selected_alias()).encode(_PROBES, convert_to_numpy=True, show_progress_bar=False))
+    got = _normalize_inplace(OnnxEmbedder().encode(_PROBES))
+    cos = (ref * got).sum(axis=1)
+    worst = float(cos.min())
+    print(f"[parity] {_selected_alias()}: min cos={worst:.4f} mean cos={float(cos.mean()):.4f} (tolerance {tolerance})")
+    return worst
+
+
+_BENCH_CHILD = r"""
+import json, os, resource, statistics, sys, time
+t0 = time.perf_counter()
+from agent.long_memory.embeddings import embed_query
+embed_query("warm up")
+cold = time.perf_counter() - t0
+lat = []
+for i in range(int(sys.argv[1])):
+    t = time.perf_counter()
+    embed_query(f"what is the capital of country number {i}?")
+    lat.append((time.perf_counter() - t) * 1000)
+lat.sort()
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+print(json.dumps({
+    "cold_start_s": round(cold, 3),
+    "max_rss_mb": round(rss_mb, 1),
+    "query_p50_ms": round(statistics.median(lat), 2),
+    "query_p99_ms": round(lat[min(len(lat) - 1, int(len(lat) * 0.99))], 2),
+}))
+"""
+
+
+def bench(queries: int = 200) -> dict:
+    """Cold start, peak RSS and query latency for each backend, each in a fresh process."""
+    results = {}
+    for backend in ("torch", "onnx"):
+        env = dict(os.environ, EMBED_BACKEND=backend)
+        proc = subprocess.run(
+            [sys.executable, "-c", _BENCH_CHILD, str(queries)],
+            env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            print(f"[bench] {backend} failed:\n{proc.stderr[-800:]}")
+            continue
+        results[backend] = json.loads(proc.stdout.strip().splitlines()[-1])
+        r = results[backend]
+        print(
+            f"{backend:<6} cold={r['cold_start_s']:>7.3f}s  rss={r['max_rss_mb']:>7.1f}MB  "
+            f"p50={r['query_p50_ms']:>6.2f}ms  p99={r['query_p99_ms']:>6.2f}ms"
+        )
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Quantized ONNX embedding backend: export / parity / bench")
+    ap.add_argument("mode", choices=["export", "parity", "bench"])
+    ap.add_argument("--queries", type=int, default=200, help="query embeddings timed in bench")
+    ap.add_argument("--tolerance", type=float, default=PARITY_TOLERANCE)
+    args = ap.parse_args()
+
+    if args.mode == "export":
+        export()
+    elif args.mode == "parity":
+        if parity(args.tolerance) < args.tolerance:
+            raise SystemExit(1)
+    else:
+        bench(args.queries)
+
+
+if __name__ == "__main__":
+    main()
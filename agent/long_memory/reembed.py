@@ -0,0 +1,249 @@
+# agent/long_memory/reembed.py
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from .embeddings import _MODEL_ALIASES, embed_texts, model_stamp
+from .faiss_store import FaissStore
+from .hybrid import chunk_text_of
+from .snapshot_store import SnapshotStore
+
+# -----------------------------
+# Background re-embedding on model change
+# -----------------------------
+# Every index records the embedding model it was built with (FaissStore.model).
+# When the model changes, this job re-embeds the live snapshot's chunks with the
+# new model at a capped rate (chunks/sec) while queries keep being served from
+# the old snapshot (embedded with the old model via the stamp). Progress is
+# checkpointed under <root>/reembed/ so a restart resumes. When it has caught
+# up, rows written meanwhile are folded in with writes held off and the new
+# index is published as the next snapshot version: one atomic cutover.
+#
+# The checkpoint records the snapshot version it was taken from and a hash of
+# the embedded rows' texts. Resume and cutover re-check that hash whenever the
+# version moved, so a snapshot that was rebuilt, compacted or had rows deleted
+# (not just appended to) restarts the job instead of pairing old vectors with
+# different rows.
+#
+# Example:
+#   python -m agent.long_memory.reembed status storage/kb
+#   python -m agent.long_memory.reembed run storage/kb --to bge --rate 200
+#
+#   job = ReembedJob(SnapshotStore.open("storage/kb"), alias="bge", rate=100)
+#   job.start()          # background thread; job.progress() for status
+#
+
+WORK_DIR = "reembed"
+PROGRESS_FILE = "progress.json"
+VECTORS_FILE = "vectors.npy"
+MAX_RESTARTS = 3  # source rewritten under the job this many times -> give up until the next run
+
+
+class SourceChanged(RuntimeError):
+    """Rows already re-embedded no longer match the snapshot's rows."""
+
+
+def _hash_rows(texts: List[str], h=None):
+    """Extend (or start) a sha256 over row texts; length-prefixed so row boundaries count."""
+    h = h if h is not None else hashlib.sha256()
+    for text in texts:
+        data = text.encode("utf-8")
+        h.update(len(data).to_bytes(8, "little"))
+        h.update(data)
+    return h
+
+
+def _row_texts(store: FaissStore, start: int, end: int) -> List[str]:
+    return [chunk_text_of(store, i) for i in range(start, end)]
+
+
+def needs_reembed(store: FaissStore, alias: Optional[str] = None) -> bool:
+    """True if `store` was not built with `alias` (default: USE_MODEL) at the current version."""
+    return store.model != model_stamp(alias)
+
+
+class ReembedJob:
+    def __init__(self, snap: SnapshotStore, alias: Optional[str] = None, rate: float = 200.0,
+                 batch_size: int = 64, checkpoint_every: int = 20):
+        self.snap = snap
+        self.target = model_stamp(alias)
+        self.rate = rate
+        self.batch_size = batch_size
+        self.checkpoint_every = checkpoint_every
+        self.work_dir = os.path.join(snap.root, WORK_DIR)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._done = 0
+        self._total = 0
+        self._status = "idle"
+        self._hash = hashlib.sha256()  # over the rows embedded so far, in order
+        self.result: Optional[dict] = None
+
+    # -------- progress on disk --------
+    def _load_progress(self, source: FaissStore, version: Optional[str]) -> List[np.ndarray]:
+        self._hash = hashlib.sha256()
+        try:
+            with open(os.path.join(self.work_dir, PROGRESS_FILE), "r", encoding="utf-8") as f:
+                progress = json.load(f)
+            vecs = np.load(os.path.join(self.work_dir, VECTORS_FILE))
+        except (FileNotFoundError, ValueError):
+            return []
+        if progress.get("target") != self.target or progress.get("source") != source.model:
+            return []
+        if len(vecs) != progress.get("rows") or len(vecs) > source.index.ntotal:
+            return []
+        # A prefix embedded earlier is only valid if those rows are still the same rows,
+        # which a newer version (rebuild, compaction, deletes) does not guarantee.
+        h = _hash_rows(_row_texts(source, 0, len(vecs)))
+        if h.hexdigest() != progress.get("row_hash"):
+            print(f"[reembed] rows changed since the checkpoint ({progress.get('version')} -> {version}); starting over")
+            return []
+        self._hash = h
+        return [vecs] if len(vecs) else []
+
+    def _save_progress(self, source: FaissStore, version: Optional[str], parts: List[np.ndarray]):
+        os.makedirs(self.work_dir, exist_ok=True)
+        vecs = np.concatenate(parts) if parts else np.zeros((0, 0), dtype=np.float32)
+        tmp = os.path.join(self.work_dir, VECTORS_FILE + ".tmp.npy")
+        np.save(tmp, vecs)
+        os.replace(tmp, os.path.join(self.work_dir, VECTORS_FILE))
+        tmp = os.path.join(self.work_dir, PROGRESS_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"target": self.target, "source": source.model, "version": version,
+                       "rows": len(vecs), "row_hash": self._hash.hexdigest()}, f)
+        os.replace(tmp, os.path.join(self.work_dir, PROGRESS_FILE))
+
+    # -------- work --------
+    def _embed_rows(self, store: FaissStore, start: int, end: int) -> np.ndarray:
+        return embed_texts(_row_texts(store, start, end), self.target["alias"])
+
+    def progress(self) -> dict:
+        return {"status": self._status, "done": self._done, "total": self._total,
+                "target": self.target["name"], "rate": self.rate}
+
+    def run(self) -> dict:
+        """Re-embed, then cut over. Blocks; use `start()` to run in the background."""
+        t0 = time.perf_counter()
+        for _ in range(MAX_RESTARTS + 1):
+            try:
+                return self._run_once(t0)
+            except SourceChanged as e:
+                print(f"[reembed] {e}; restarting from row 0")
+                shutil.rmtree(self.work_dir, ignore_errors=True)
+        self._status = "aborted"
+        self.result = {"status": "aborted", "reason": f"source rows changed {MAX_RESTARTS + 1} times", **self.progress()}
+        return self.result
+
+    def _run_once(self, t0: float) -> dict:
+        version, source = self.snap.version, self.snap.snapshot()
+        if not needs_reembed(source, self.target["alias"]):
+            self._status = "current"
+            self.result = {"status": "current", "version": self.snap.version}
+            return self.result
+
+        parts = self._load_progress(source, version)
+        self._done = resumed = sum(len(p) for p in parts)
+        self._total = source.index.ntotal
+        self._status = "running"
+        if resumed:
+            print(f"[reembed] resuming at row {resumed}/{self._total}")
+        started = time.monotonic()
+        batches = 0
+        while self._done < self._total:
+            if self._stop.is_set():
+                self._save_progress(source, version, parts)
+                self._status = "stopped"
+                self.result = {"status": "stopped", **self.progress()}
+                return self.result
+            end = min(self._done + self.batch_size, self._total)
+            texts = _row_texts(source, self._done, end)
+            parts.append(embed_texts(texts, self.target["alias"]))
+            _hash_rows(texts, self._hash)
+            self._done = end
+            batches += 1
+            if batches % self.checkpoint_every == 0:
+                self._save_progress(source, version, parts)
+            if self.rate > 0:  # throttle: never run ahead of `rate` chunks/sec
+                ahead = (self._done - resumed) / self.rate - (time.monotonic() - started)
+                if ahead > 0:
+                    self._stop.wait(ahead)
+
+        def cutover(current: FaissStore) -> FaissStore:
+            if current.index.ntotal < self._done:
+                raise SourceChanged(f"snapshot shrank to {current.index.ntotal} rows (embedded {self._done})")
+            if self.snap.version != version:  # only appends are safe to fold in; verify the prefix
+                if _hash_rows(_row_texts(current, 0, self._done)).hexdigest() != self._hash.hexdigest():
+                    raise SourceChanged(f"rows changed between {version} and {self.snap.version}")
+            vecs = list(parts)
+            if current.index.ntotal > self._done:  # rows published while we were embedding
+                vecs.append(self._embed_rows(current, self._done, current.index.ntotal))
+            vecs = np.concatenate(vecs) if vecs else np.zeros((0, 0), dtype=np.float32)
+            new = FaissStore(dim=vecs.shape[1], factory=current.factory, model=self.target)
+            new.build(np.ascontiguousarray(vecs, dtype=np.float32), list(current.texts), [dict(m) for m in current.metas])
+            return new
+
+        version = self.snap.swap(cutover)
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+        self._done = self._total = self.snap.snapshot().index.ntotal
+        self._status = "done"
+        self.result = {
+            "status": "done",
+            "version": version,
+            "rows": self._total,
+            "resumed_from": resumed,
+            "seconds": round(time.perf_counter() - t0, 2),
+            "model": self.target["name"],
+        }
+        print(f"[reembed] cut over to {version}: {self._total} rows with {self.target['name']} "
+              f"in {self.result['seconds']}s")
+        return self.result
+
+    def start(self) -> threading.Thread:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="reembed", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self, wait: bool = True):
+        """Checkpoint and stop; `run` resumes from here next time."""
+        self._stop.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Re-embed a snapshot store with a new embedding model")
+    ap.add_argument("mode", choices=["status", "run"])
+    ap.add_argument("root", help="store directory (snapshot root or plain FaissStore dir)")
+    ap.add_argument("--to", choices=sorted(_MODEL_ALIASES), help="target model alias (default: USE_MODEL)")
+    ap.add_argument("--rate", type=float, default=200.0, help="max chunks/sec (0 = unthrottled)")
+    ap.add_argument("--batch", type=int, default=64)
+    args = ap.parse_args()
+
+    snap = SnapshotStore.open(args.root)
+    store = snap.snapshot()
+    if args.mode == "status":
+        target = model_stamp(args.to)
+        print(f"[reembed] {args.root} @ {snap.version or 'unversioned'}: {store.index.ntotal} rows, "
+              f"dim {store.dim}, model {store.model or 'unstamped'}")
+        print(f"[reembed] target {target} → {'re-embed needed' if needs_reembed(store, args.to) else 'current'}")
+        return
+    job = ReembedJob(snap, alias=args.to, rate=args.rate, batch_size=args.batch)
+    try:
+        job.run()
+    except KeyboardInterrupt:
+        print(f"[reembed] interrupted; rerun to resume from the last checkpoint (every {job.checkpoint_every} batches)")
+
+
+if __name__ == "__main__":
+    main()
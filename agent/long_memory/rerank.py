@@ -0,0 +1,160 @@
+# agent/long_memory/rerank.py
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+# -----------------------------
+# Budgeted cross-encoder re-ranking
+# -----------------------------
+# Dense top-N candidates are re-scored by a small cross-encoder that reads
+# (query, chunk) together. Pairs are scored in rank order, in batches, until
+# the per-query latency budget would be exceeded; anything left unscored keeps
+# its dense order behind the scored ones. Scores are cached per (query, chunk).
+# Loading the model takes seconds, far over any per-query budget, so a query
+# that finds it unloaded starts the load in the background and keeps the dense
+# order; call `load()` up front (warm-up, benchmarks) to avoid that.
+#
+# Example:
+#   hits = store.search(embed_query(q), top_k=20)
+#   top, stats = get_reranker().rerank(q, hits, keep=3, budget_ms=150)
+#
+
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+Hit = Tuple[float, str, dict, int]
+
+
+@lru_cache(maxsize=1)
+def _load_cross_encoder():
+    print(f"[rerank] loading: {RERANK_MODEL}")
+    from sentence_transformers import CrossEncoder
+
+    return CrossEncoder(RERANK_MODEL)
+
+
+_load_lock = threading.Lock()
+_load_thread: threading.Thread | None = None
+_load_error: str | None = None
+
+
+def _model_state() -> str:
+    if _load_cross_encoder.cache_info().currsize:
+        return "ready"
+    return "unavailable" if _load_error else "loading"
+
+
+def _load_in_background():
+    """Start loading the cross-encoder once; a failure is reported and not retried."""
+    global _load_thread
+
+    def run():
+        global _load_error
+        try:
+            _load_cross_encoder()
+        except Exception as e:  # e.g. sentence_transformers not installed
+            _load_error = f"{type(e).__name__}: {e}"
+            print(f"[rerank] model load failed, keeping dense order: {_load_error}")
+
+    with _load_lock:
+        if _load_thread is None:
+            _load_thread = threading.Thread(target=run, name="rerank-load", daemon=True)
+            _load_thread.start()
+
+
+@dataclass
+class CrossEncoderReranker:
+    batch_size: int = 16
+    cache_size: int = 4096
+    _cache: "OrderedDict[Tuple[str, str], float]" = field(default_factory=OrderedDict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _batch_ms: float = field(default=0.0, init=False, repr=False)  # moving average per batch
+
+    @staticmethod
+    def _key(query: str, text: str) -> Tuple[str, str]:
+        return query, hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _cached(self, key) -> float | None:
+        with self._lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _store(self, key, score: float):
+        with self._lock:
+            self._cache[key] = score
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def load(self):
+        """Load the cross-encoder now (blocking), so later `rerank` calls stay in budget."""
+        _load_cross_encoder()
+
+    def rerank(self, query: str, hits: List[Hit], keep: int = 3, budget_ms: float = 150.0) -> Tuple[List[Hit], Dict]:
+        """
+        Re-order dense `hits` by cross-encoder score and return the best `keep`.
+
+        Returns (hits, stats). Re-ranked hits carry the cross-encoder score in
+        slot 0; stats has scored/cached/unscored counts, elapsed ms, whether
+        the budget cut scoring short and the model state (ready/loading/unavailable).
+        """
+        t0 = time.perf_counter()
+        scores: Dict[int, float] = {}
+        todo: List[int] = []
+        for i, (_, text, _, _) in enumerate(hits):
+            cached = self._cached(self._key(query, text))
+            if cached is None:
+                todo.append(i)
+            else:
+                scores[i] = cached
+        n_cached = len(scores)
+
+        budget_hit = False
+        state = _model_state()
+        if todo and state != "ready":
+            _load_in_background()  # the load alone would blow the budget; use the model once it's in
+            todo = []
+        model = _load_cross_encoder() if todo else None
+        for b in range(0, len(todo), self.batch_size):
+            # Checked before every batch, the first included.
+            elapsed = (time.perf_counter() - t0) * 1000
+            if elapsed + self._batch_ms > budget_ms:
+                budget_hit = True
+                break
+            batch = todo[b:b + self.batch_size]
+            tb = time.perf_counter()
+            out = model.predict([(query, hits[i][1]) for i in batch], batch_size=self.batch_size, show_progress_bar=False)
+            ms = (time.perf_counter() - tb) * 1000
+            self._batch_ms = ms if not self._batch_ms else 0.8 * self._batch_ms + 0.2 * ms
+            for i, sc in zip(batch, out):
+                scores[i] = float(sc)
+                self._store(self._key(query, hits[i][1]), float(sc))
+
+        scored = sorted(scores, key=lambda i: scores[i], reverse=True)
+        unscored = [i for i in range(len(hits)) if i not in scores]  # dense order
+        ranked = [(scores[i], *hits[i][1:]) for i in scored] + [hits[i] for i in unscored]
+        stats = {
+            "candidates": len(hits),
+            "scored": len(scores) - n_cached,
+            "cached": n_cached,
+            "unscored": len(unscored),
+            "ms": round((time.perf_counter() - t0) * 1000, 3),
+            "budget_hit": budget_hit,
+            "model": state,
+        }
+        return ranked[:keep], stats
+
+
+_default = CrossEncoderReranker()
+
+
+def get_reranker() -> CrossEncoderReranker:
+    return _default
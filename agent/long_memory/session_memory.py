@@ -0,0 +1,247 @@
+# agent/long_memory/session_memory.py
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .embeddings import embed_query, embed_texts, model_stamp, stamp_alias
+from .faiss_store import FaissStore
+from .warmup import wait_warm
+
+# -----------------------------
+# Semantic conversation memory
+# -----------------------------
+# Every persisted message is embedded off the request path (one background
+# thread) into a small per-session FaissStore. At prompt time the controller
+# combines a short recent window with the top-k older messages most similar
+# to the new user prompt, instead of a fixed last-N slice.
+#
+# Example:
+#   python -m agent.long_memory.session_memory bench --turns 200
+#
+
+SESSION_DIR = "storage/session_memory"
+MAX_OPEN_SESSIONS = 64
+RECALL_WARM_WAIT_S = 0.2  # recall is on the request path: skip it rather than wait out a cold start
+
+Message = Tuple[int, str, str]  # (msg_id, role, content)
+
+
+def _safe_name(session_id: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", session_id)[:128] or "_"
+
+
+class SessionMemory:
+    """Per-session vector indexes of past messages, updated asynchronously."""
+
+    def __init__(self, root: str = SESSION_DIR, persist: bool = True):
+        self.root = root
+        self.persist = persist
+        self._stores: "OrderedDict[str, FaissStore]" = OrderedDict()
+        self._locks: Dict[str, threading.Lock] = {}
+        # Bumped by `drop`; queued writes submitted under an older generation are discarded.
+        self._generations: Dict[str, int] = {}
+        self._guard = threading.Lock()
+        # One worker keeps writes per session ordered and off the request thread.
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-embed")
+
+    def _path(self, session_id: str) -> str:
+        return os.path.join(self.root, _safe_name(session_id))
+
+    def _lock(self, session_id: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(session_id, threading.Lock())
+
+    def _store(self, session_id: str) -> Optional[FaissStore]:
+        with self._guard:
+            store = self._stores.get(session_id)
+            if store is not None:
+                self._stores.move_to_end(session_id)
+                return store
+        path = self._path(session_id)
+        if not (self.persist and os.path.isdir(path)):
+            return None
+        store = FaissStore.load(path)
+        self._remember(session_id, store)
+        return store
+
+    def _generation(self, session_id: str) -> int:
+        with self._guard:
+            return self._generations.get(session_id, 0)
+
+    def _remember(self, session_id: str, store: FaissStore):
+        with self._guard:
+            self._stores[session_id] = store
+            self._stores.move_to_end(session_id)
+            while len(self._stores) > MAX_OPEN_SESSIONS:
+                self._stores.popitem(last=False)  # persisted; reloaded on demand
+
+    # -------- write path --------
+    def index_messages(self, session_id: str, messages: Iterable[Message], generation: Optional[int] = None):
+        """
+        Embed and append messages now (runs on the writer thread via `index_async`).
+        `generation` is the session's generation when the write was queued; if the
+        session was dropped since, the write is discarded.
+        """
+        messages = [m for m in messages if m[2] and m[2].strip()]
+        if not messages or (generation is not None and generation != self._generation(session_id)):
+            return
+        wait_warm()
+        texts = [f"{role}: {content}" for _, role, content in messages]
+        metas = [{"msg_id": int(mid), "role": role} for mid, role, _ in messages]
+        existing = self._store(session_id)
+        # Keep appending with the model the session index was started with.
+        alias = stamp_alias(existing.model) if existing is not None else None
+        vecs = embed_texts(texts, alias)
+        with self._lock(session_id):
+            if generation is not None and generation != self._generation(session_id):
+                return  # dropped while we were embedding
+            store = self._store(session_id)
+            if store is None:
+                store = FaissStore(dim=vecs.shape[1], model=model_stamp(alias))
+                self._remember(session_id, store)
+            store.add(vecs, texts, metas)
+            if self.persist:
+                store.save(self._path(session_id))
+
+    def index_async(self, session_id: str, messages: Iterable[Message]) -> Future:
+        return self._writer.submit(self.index_messages, session_id, list(messages), self._generation(session_id))
+
+    def flush(self):
+        """Block until every queued message is indexed (tests/benchmarks)."""
+        self._writer.submit(lambda: None).result()
+
+    def drop(self, session_id: str):
+        """Delete the session's index; writes already queued for it are discarded."""
+        with self._lock(session_id):
+            with self._guard:
+                self._generations[session_id] = self._generations.get(session_id, 0) + 1
+                self._stores.pop(session_id, None)
+            shutil.rmtree(self._path(session_id), ignore_errors=True)
+
+    # -------- read path --------
+    def recall(self, session_id: str, query: str, k: int = 4, exclude_ids: Iterable[int] = ()) -> List[Message]:
+        """Top-k past messages most similar to `query`, returned in chronological order."""
+        store = self._store(session_id)
+        if store is None or store.index.ntotal == 0 or k <= 0:
+            return []
+        skip = set(exclude_ids)
+        if not wait_warm(RECALL_WARM_WAIT_S):
+            return []  # model still loading; the caller keeps its recent window
+        qv = embed_query(query, stamp_alias(store.model))
+        with self._lock(session_id):
+            # Over-fetch so excluded (already-in-window) messages don't starve the result.
+            hits = store.search(qv, top_k=min(store.index.ntotal, k + len(skip)))
+        out: List[Message] = []
+        for _, text, meta, _ in hits:
+            if meta["msg_id"] in skip:
+                continue
+            role = meta["role"]
+            out.append((meta["msg_id"], role, text[len(role) + 2:]))
+            if len(out) >= k:
+                break
+        return sorted(out)
+
+    def build_context(
+        self, session_id: str, query: str, recent: List[Message], k: int = 4
+    ) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+        """(relevant_older, recent_window) as (role, content) pairs for the prompt."""
+        older = self.recall(session_id, query, k=k, exclude_ids=[m[0] for m in recent])
+        if recent:
+            older = [m for m in older if m[0] < recent[0][0]]
+        return [(r, c) for _, r, c in older], [(r, c) for _, r, c in recent]
+
+
+_default: Optional[SessionMemory] = None
+_default_lock = threading.Lock()
+
+
+def get_session_memory() -> SessionMemory:
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = SessionMemory()
+        return _default
+
+
+# -----------------------------
+# Long-session benchmark
+# -----------------------------
+
+_FACTS = [
+    ("My favourite colour is teal.", "What is my favourite colour?", "teal"),
+    ("I live in Lisbon.", "Which city do I live in?", "lisbon"),
+    ("My dog is called Biscuit.", "What is my dog's name?", "biscuit"),
+    ("I work as a marine biologist.", "What is my job?", "marine biologist"),
+    ("My sister's birthday is on March 3rd.", "When is my sister's birthday?", "march 3rd"),
+    ("I am allergic to peanuts.", "What food allergy do I have?", "peanuts"),
+]
+
+_CHATTER = [
+    "Add {a} and {b}.", "Final Answer: {c}", "Convert hello to uppercase.", "Final Answer: HELLO",
+    "Multiply {a} by {b}.", "Final Answer: {d}", "Thanks!", "Final Answer: You're welcome.",
+]
+
+
+def bench(turns: int = 200, window: int = 20, recent: int = 4, k: int = 4) -> dict:
+    """Prompt size and fact recall: last-`window` vs. `recent` + top-`k` semantic."""
+    mem = SessionMemory(persist=False)
+    sid = "bench"
+    log: List[Message] = []
+    mid = 0
+    fact_every = max(1, turns // (len(_FACTS) + 1))
+    facts = iter(_FACTS)
+    for t in range(turns):
+        mid += 1
+        if t % fact_every == 0 and t < fact_every * len(_FACTS):
+            text = next(facts)[0]
+        else:
+            a, b = t % 17 + 1, t % 5 + 2
+            text = _CHATTER[t % len(_CHATTER)].format(a=a, b=b, c=a + b, d=a * b)
+        log.append((mid, "user" if t % 2 == 0 else "assistant", text))
+    mem.index_messages(sid, log)
+
+    def size(pairs):
+        return sum(len(c) + 12 for _, c in pairs)
+
+    base_chars = sem_chars = base_hits = sem_hits = 0
+    for _, question, answer in _FACTS:
+        base = [(r, c) for _, r, c in log[-window:]]
+        older, rec = mem.build_context(sid, question, log[-recent:], k=k)
+        sem = older + rec
+        base_chars += size(base)
+        sem_chars += size(sem)
+        base_hits += any(answer in c.lower() for _, c in base)
+        sem_hits += any(answer in c.lower() for _, c in sem)
+
+    n = len(_FACTS)
+    result = {
+        "turns": turns,
+        "baseline": {"window": window, "avg_prompt_chars": base_chars // n, "fact_recall": round(base_hits / n, 2)},
+        "semantic": {"recent": recent, "k": k, "avg_prompt_chars": sem_chars // n, "fact_recall": round(sem_hits / n, 2)},
+    }
+    for name in ("baseline", "semantic"):
+        r = result[name]
+        print(f"{name:<9} avg memory block {r['avg_prompt_chars']:>6} chars   fact recall {r['fact_recall']:.2f}")
+    return result
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Semantic session memory benchmark")
+    ap.add_argument("mode", choices=["bench"])
+    ap.add_argument("--turns", type=int, default=200)
+    ap.add_argument("--window", type=int, default=20, help="baseline last-N window")
+    ap.add_argument("--recent", type=int, default=4)
+    ap.add_argument("--k", type=int, default=4)
+    args = ap.parse_args()
+    bench(args.turns, window=args.window, recent=args.recent, k=args.k)
+
+
+if __name__ == "__main__":
+    main()
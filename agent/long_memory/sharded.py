@@ -0,0 +1,343 @@
+# agent/long_memory/sharded.py
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import os
+import shutil
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .faiss_store import FaissStore
+from .filters import Filter
+
+# -----------------------------
+# Sharded store with scatter-gather search
+# -----------------------------
+# Chunks are partitioned across N ordinary FaissStores (one directory each).
+# A query fans out to every shard in parallel and the per-shard top-k lists,
+# already sorted by score, are merged with a heap. Hits carry a global row id
+# (stable across rebalancing) in slot 3 instead of the shard-local position.
+#
+# Search runs either on a thread pool (FAISS releases the GIL while searching)
+# or on one worker process per shard; workers memory-map their shard from the
+# last `save`, so process mode serves the saved state.
+#
+# Layout:
+#   <root>/shards.json
+#   <root>/shard-000/  index.faiss + meta.json + ids.npy
+#
+# Example:
+#   shards = ShardedStore.create(dim=384, n_shards=4)
+#   shards.add(vecs, texts, metas); shards.save("storage/sharded")
+#   hits = ShardedStore.load("storage/sharded", executor="process").search(qv, top_k=5)
+#   python -m agent.long_memory.sharded bench --rows 200000 --shards 1 2 4 8
+#
+
+MANIFEST_FILE = "shards.json"
+IDS_FILE = "ids.npy"
+EXECUTORS = ("thread", "process")
+
+Hit = Tuple[float, str, dict, int]
+
+
+def _shard_dir(root: str, i: int) -> str:
+    return os.path.join(root, f"shard-{i:03d}")
+
+
+def _merge(per_shard: Sequence[List[Hit]], top_k: int) -> List[Hit]:
+    # Each shard list is sorted best-first, so a k-way heap merge stops after k pops.
+    return list(islice(heapq.merge(*per_shard, key=lambda h: -h[0]), top_k))
+
+
+# -------- process workers (one per shard) --------
+_worker_shard: Optional[Tuple[FaissStore, np.ndarray]] = None
+
+
+def _init_worker(path: str, omp_threads: int):
+    global _worker_shard
+    if omp_threads > 0:
+        import faiss
+
+        faiss.omp_set_num_threads(omp_threads)
+    store = FaissStore.load(path, mmap=True)
+    _worker_shard = (store, np.load(os.path.join(path, IDS_FILE)))
+
+
+def _worker_search(queries: np.ndarray, top_k: int, where: Optional[Filter]) -> List[List[Hit]]:
+    store, gids = _worker_shard
+    return [[(s, t, m, int(gids[ix])) for s, t, m, ix in hits] for hits in store.search_batch(queries, top_k, where=where)]
+
+
+class ShardedStore:
+    def __init__(self, dim: int, factory: str = "Flat", shards: Optional[List[FaissStore]] = None,
+                 gids: Optional[List[np.ndarray]] = None, next_gid: int = 0,
+                 executor: str = "thread", omp_threads: int = 0):
+        if executor not in EXECUTORS:
+            raise ValueError(f"executor must be one of {EXECUTORS}")
+        self.dim = dim
+        self.factory = factory
+        self.shards: List[FaissStore] = shards or []
+        self.gids: List[np.ndarray] = gids or [np.zeros(0, dtype=np.int64) for _ in self.shards]
+        self.next_gid = next_gid
+        self.executor = executor
+        self.omp_threads = omp_threads
+        self.root: Optional[str] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._workers: List[Executor] = []
+
+    @classmethod
+    def create(cls, dim: int, n_shards: int, factory: str = "Flat", **kw) -> "ShardedStore":
+        return cls(dim, factory, [FaissStore(dim=dim, factory=factory) for _ in range(max(1, n_shards))], **kw)
+
+    @property
+    def ntotal(self) -> int:
+        return sum(s.index.ntotal for s in self.shards)
+
+    def sizes(self) -> List[int]:
+        return [s.index.ntotal for s in self.shards]
+
+    # -------- write path --------
+    def _append(self, i: int, vectors: np.ndarray, texts: List[str], metas: List[dict], gids: np.ndarray):
+        shard = self.shards[i]
+        if not shard.index.is_trained:
+            shard.build(vectors, list(texts), list(metas))
+        else:
+            shard.add(vectors, list(texts), list(metas))
+        self.gids[i] = np.concatenate([self.gids[i], gids.astype(np.int64)])
+
+    def add(self, vectors: np.ndarray, texts: List[str], metas: List[dict]) -> np.ndarray:
+        """Spread rows over the shards so sizes stay balanced; returns the new global ids."""
+        assert vectors.ndim == 2 and vectors.shape[0] == len(texts) == len(metas)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        m = vectors.shape[0]
+        new_gids = np.arange(self.next_gid, self.next_gid + m, dtype=np.int64)
+        self.next_gid += m
+
+        sizes = self.sizes()
+        target = -(-(sum(sizes) + m) // len(self.shards))  # ceil
+        pos = 0
+        for i in sorted(range(len(sizes)), key=sizes.__getitem__):
+            take = min(m - pos, max(0, target - sizes[i]))
+            if take:
+                sl = slice(pos, pos + take)
+                self._append(i, vectors[sl], texts[sl], metas[sl], new_gids[sl])
+                pos += take
+        return new_gids
+
+    def add_shard(self) -> Dict[str, int]:
+        """
+        Add an empty shard and rebalance by moving the tail of every larger
+        shard into it. Only ~1/N of the rows move; global ids are preserved.
+        """
+        self.shards.append(FaissStore(dim=self.dim, factory=self.factory))
+        self.gids.append(np.zeros(0, dtype=np.int64))
+        return self.rebalance()
+
+    def rebalance(self) -> Dict[str, int]:
+        t0 = time.perf_counter()
+        sizes = self.sizes()
+        n = len(sizes)
+        total = sum(sizes)
+        targets = [total // n + (1 if i < total % n else 0) for i in range(n)]
+        spill_v: List[np.ndarray] = []
+        spill_t: List[str] = []
+        spill_m: List[dict] = []
+        spill_g: List[np.ndarray] = []
+        for i, (size, target) in enumerate(zip(sizes, targets)):
+            if size <= target:
+                continue
+            shard = self.shards[i]
+            spill_v.append(shard.reconstruct(target))
+            spill_t.extend(shard.texts[target:])
+            spill_m.extend(shard.metas[target:])
+            spill_g.append(self.gids[i][target:])
+            self.gids[i] = self.gids[i][:target]
+            try:
+                shard.truncate(target)
+            except RuntimeError:  # e.g. HNSW cannot remove ids: rebuild the kept head
+                head = FaissStore(dim=self.dim, factory=self.factory)
+                head.build(shard.reconstruct()[:target], shard.texts[:target], shard.metas[:target])
+                self.shards[i] = head
+        moved = sum(len(g) for g in spill_g)
+        if moved:
+            vecs = np.concatenate(spill_v)
+            gids = np.concatenate(spill_g)
+            pos = 0
+            for i, (size, target) in enumerate(zip(self.sizes(), targets)):
+                take = min(moved - pos, max(0, target - size))
+                if take:
+                    sl = slice(pos, pos + take)
+                    self._append(i, vecs[sl], spill_t[sl], spill_m[sl], gids[sl])
+                    pos += take
+        self._close_workers()
+        return {"moved": moved, "shards": n, "ms": round((time.perf_counter() - t0) * 1000, 1)}
+
+    # -------- persistence --------
+    def save(self, root: str):
+        os.makedirs(root, exist_ok=True)
+        for i, (shard, gids) in enumerate(zip(self.shards, self.gids)):
+            path = _shard_dir(root, i)
+            shard.save(path)
+            np.save(os.path.join(path, IDS_FILE), gids)
+        for stale in range(len(self.shards), 1 << 10):  # shards removed since the last save
+            if not os.path.isdir(_shard_dir(root, stale)):
+                break
+            shutil.rmtree(_shard_dir(root, stale))
+        with open(os.path.join(root, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "factory": self.factory, "shards": len(self.shards),
+                       "next_gid": self.next_gid}, f, indent=2)
+        self.root = root
+        self._close_workers()  # process workers reload the new files on next search
+
+    @classmethod
+    def load(cls, root: str, executor: str = "thread", mmap: bool = False, omp_threads: int = 0) -> "ShardedStore":
+        with open(os.path.join(root, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        paths = [_shard_dir(root, i) for i in range(int(manifest["shards"]))]
+        shards = [FaissStore.load(p, mmap=mmap) for p in paths]
+        gids = [np.load(os.path.join(p, IDS_FILE)) for p in paths]
+        out = cls(int(manifest["dim"]), manifest.get("factory", "Flat"), shards, gids,
+                  next_gid=int(manifest["next_gid"]), executor=executor, omp_threads=omp_threads)
+        out.root = root
+        return out
+
+    # -------- read path --------
+    def _threads(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=len(self.shards), thread_name_prefix="shard")
+        return self._pool
+
+    def _processes(self) -> List[Executor]:
+        if self.root is None:
+            raise RuntimeError("process executor serves saved shards; call save() or load() first")
+        if not self._workers:
+            import multiprocessing as mp
+
+            ctx = mp.get_context("spawn")  # FAISS/OpenMP state does not survive fork reliably
+            self._workers = [
+                ProcessPoolExecutor(max_workers=1, mp_context=ctx, initializer=_init_worker,
+                                    initargs=(_shard_dir(self.root, i), self.omp_threads))
+                for i in range(len(self.shards))
+            ]
+        return self._workers
+
+    def _close_workers(self):
+        for w in self._workers:
+            w.shutdown(wait=False, cancel_futures=True)
+        self._workers = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def close(self):
+        self._close_workers()
+
+    def _search_shard(self, i: int, queries: np.ndarray, top_k: int, where: Optional[Filter]) -> List[List[Hit]]:
+        gids = self.gids[i]
+        return [[(s, t, m, int(gids[ix])) for s, t, m, ix in hits]
+                for hits in self.shards[i].search_batch(queries, top_k, where=where)]
+
+    def search_batch(self, query_matrix: np.ndarray, top_k: int = 5, where: Optional[Filter] = None) -> List[List[Hit]]:
+        q = np.ascontiguousarray(query_matrix, dtype=np.float32)
+        live = [i for i, s in enumerate(self.shards) if s.index.ntotal]
+        if not live:
+            return [[] for _ in range(q.shape[0])]
+        if self.executor == "process":
+            workers = self._processes()
+            futures = [workers[i].submit(_worker_search, q, top_k, where) for i in live]
+        elif len(live) == 1:
+            return self._search_shard(live[0], q, top_k, where)
+        else:
+            pool = self._threads()
+            futures = [pool.submit(self._search_shard, i, q, top_k, where) for i in live]
+        per_shard = [f.result() for f in futures]
+        return [_merge([hits[row] for hits in per_shard], top_k) for row in range(q.shape[0])]
+
+    def search(self, query_vec: np.ndarray, top_k: int = 5, where: Optional[Filter] = None) -> List[Hit]:
+        if query_vec.ndim == 1:
+            query_vec = query_vec.reshape(1, -1)
+        return self.search_batch(query_vec[:1], top_k=top_k, where=where)[0]
+
+
+# -----------------------------
+# Scaling benchmark
+# -----------------------------
+
+def _random_unit(rng: np.random.Generator, n: int, dim: int) -> np.ndarray:
+    v = rng.standard_normal((n, dim)).astype(np.float32)
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def bench(rows: int = 200_000, dim: int = 384, shard_counts: Sequence[int] = (1, 2, 4, 8),
+          executors: Sequence[str] = EXECUTORS, queries: int = 200, batch: int = 64, k: int = 10,
+          root: str = "storage/sharded_bench") -> List[dict]:
+    """Single-query latency and batched QPS per (executor, shard count); FAISS runs single-threaded per shard."""
+    rng = np.random.default_rng(0)
+    data = _random_unit(rng, rows, dim)
+    qs = _random_unit(rng, queries, dim)
+    texts = [""] * rows
+    metas = [{} for _ in range(rows)]
+    import faiss
+
+    faiss.omp_set_num_threads(1)  # scaling should come from shards, not FAISS's own OpenMP
+    print(f"[sharded] rows={rows} dim={dim} cores={os.cpu_count()}")
+
+    results = []
+    for n in shard_counts:
+        store = ShardedStore.create(dim, n, omp_threads=1)
+        store.add(data, texts, metas)
+        path = os.path.join(root, f"n{n}")
+        store.save(path)
+        store.close()
+        for ex in executors:
+            s = ShardedStore.load(path, executor=ex, mmap=True, omp_threads=1)
+            s.search(qs[0], top_k=k)  # warm up pools / worker processes
+            lat = []
+            for q in qs:
+                t0 = time.perf_counter()
+                s.search(q, top_k=k)
+                lat.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            for b in range(0, queries, batch):
+                s.search_batch(qs[b:b + batch], top_k=k)
+            qps = queries / (time.perf_counter() - t0)
+            s.close()
+            lat.sort()
+            row = {
+                "executor": ex,
+                "shards": n,
+                "p50_ms": round(lat[len(lat) // 2], 3),
+                "p99_ms": round(lat[min(len(lat) - 1, int(len(lat) * 0.99))], 3),
+                "batch_qps": round(qps, 1),
+            }
+            results.append(row)
+            print(f"{ex:<8} shards={n:<3} p50={row['p50_ms']:>8.3f}ms p99={row['p99_ms']:>8.3f}ms "
+                  f"batch qps={row['batch_qps']:>9.1f}")
+    shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Sharded FAISS store: scatter-gather scaling benchmark")
+    ap.add_argument("mode", choices=["bench"])
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    ap.add_argument("--executors", nargs="+", default=list(EXECUTORS), choices=EXECUTORS)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--batch", type=int, default=64)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--root", default="storage/sharded_bench")
+    args = ap.parse_args()
+    bench(args.rows, args.dim, args.shards, args.executors, queries=args.queries, batch=args.batch,
+          k=args.k, root=args.root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+# agent/long_memory/snapshot_store.py
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .faiss_store import INDEX_FILE, META_FILE, FaissStore
+from .filters import Filter
+
+# -----------------------------
+# Concurrent-read / single-writer store
+# -----------------------------
+# Readers always search an immutable FaissStore snapshot; they take no lock,
+# they just read the current reference. One writer at a time clones the
+# snapshot, mutates the clone, saves it into a fresh versioned directory and
+# publishes it by atomic rename of the CURRENT pointer, then swaps the
+# in-memory reference. In-flight queries finish on the snapshot they started
+# with; nothing on disk is ever overwritten in place.
+#
+# Layout:
+#   <root>/CURRENT              "v000003"
+#   <root>/versions/v000003/    index.faiss + meta.json
+#
+# Example:
+#   snap = SnapshotStore.open("storage/kb")
+#   hits = snap.search(qv, top_k=5)             # any thread
+#   with snap.writer() as draft:                # one writer; publishes on exit
+#       draft.add(vecs, texts, metas)
+#   python -m agent.long_memory.snapshot_store stress --readers 8 --writes 20
+#
+
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+KEEP_VERSIONS = 3
+
+_VERSION_RE = re.compile(r"^v(\d{6,})$")
+
+
+def _version_name(n: int) -> str:
+    return f"v{n:06d}"
+
+
+def _fsync_path(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_current(root: str) -> Optional[str]:
+    """Published version name under `root`, or None if nothing was published yet."""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def current_dir(root: str) -> str:
+    """Directory `FaissStore.load` should read: the published version, or `root` itself for legacy stores."""
+    name = read_current(root)
+    return os.path.join(root, VERSIONS_DIR, name) if name else root
+
+
+def clone_store(store: FaissStore) -> FaissStore:
+    """Deep copy that can be mutated without affecting readers of `store`."""
+    import faiss
+
+    out = FaissStore(dim=store.dim, factory=store.factory, model=store.model)
+    out.index = faiss.clone_index(store.index)
+    out.texts = list(store.texts)
+    out.metas = [dict(m) for m in store.metas]
+    return out
+
+
+class SnapshotStore:
+    """Lock-free searches against the current snapshot; serialized, atomically published writes."""
+
+    def __init__(self, root: str, store: FaissStore, version: Optional[str], mmap: bool = False,
+                 keep_versions: int = KEEP_VERSIONS):
+        self.root = root
+        self.mmap = mmap
+        self.keep_versions = max(1, keep_versions)
+        self._snapshot: Tuple[Optional[str], FaissStore] = (version, store)
+        self._write_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.swaps = 0
+
+    @classmethod
+    def open(cls, root: str, dim: Optional[int] = None, factory: str = "Flat", mmap: bool = False,
+             keep_versions: int = KEEP_VERSIONS) -> "SnapshotStore":
+        """
+        Open the published version under `root`. A plain FaissStore directory
+        (no CURRENT yet) is read as-is; the first publish migrates it. If
+        nothing exists and `dim` is given, start from an empty store.
+        """
+        version = read_current(root)
+        try:
+            store = FaissStore.load(current_dir(root), mmap=mmap)
+        except FileNotFoundError:
+            if dim is None:
+                raise
+            store = FaissStore(dim=dim, factory=factory)
+        return cls(root, store, version, mmap=mmap, keep_versions=keep_versions)
+
+    # -------- read path --------
+    @property
+    def version(self) -> Optional[str]:
+        return self._snapshot[0]
+
+    def snapshot(self) -> FaissStore:
+        """Current immutable store; hold on to it to run several calls against one version."""
+        return self._snapshot[1]
+
+    def search(self, query_vec: np.ndarray, top_k: int = 5, where: Optional[Filter] = None):
+        return self._snapshot[1].search(query_vec, top_k=top_k, where=where)
+
+    def search_batch(self, query_matrix: np.ndarray, top_k: int = 5, where: Optional[Filter] = None):
+        return self._snapshot[1].search_batch(query_matrix, top_k=top_k, where=where)
+
+    def refresh(self) -> bool:
+        """Pick up a version published by another process; True if the snapshot changed."""
+        name = read_current(self.root)
+        if name is None or name == self._snapshot[0]:
+            return False
+        with self._refresh_lock:
+            if name == self._snapshot[0]:
+                return False
+            store = FaissStore.load(os.path.join(self.root, VERSIONS_DIR, name), mmap=self.mmap)
+            self._snapshot = (name, store)
+            self.swaps += 1
+            return True
+
+    # -------- write path --------
+    @contextmanager
+    def writer(self) -> Iterator[FaissStore]:
+        """Yield a private clone of the current snapshot and publish it on clean exit."""
+        with self._write_lock:
+            draft = clone_store(self._snapshot[1])
+            yield draft
+            self._publish_locked(draft)
+
+    def add(self, vectors: np.ndarray, texts: List[str], metas: List[dict]) -> str:
+        with self.writer() as draft:
+            draft.add(vectors, texts, metas)
+        return self.version
+
+    def publish(self, store: FaissStore) -> str:
+        """Publish a fully built store (e.g. a rebuild) as the next version."""
+        with self._write_lock:
+            return self._publish_locked(store)
+
+    def swap(self, build: Callable[[FaissStore], FaissStore]) -> str:
+        """
+        Publish `build(current_snapshot)` with writes held off, so rows added
+        while a replacement was prepared elsewhere can be folded in first.
+        """
+        with self._write_lock:
+            return self._publish_locked(build(self._snapshot[1]))
+
+    def _next_version(self, versions_dir: str) -> int:
+        taken = [int(m.group(1)) for m in map(_VERSION_RE.match, os.listdir(versions_dir)) if m]
+        current = _VERSION_RE.match(self._snapshot[0] or "")
+        if current:
+            taken.append(int(current.group(1)))
+        return max(taken, default=0) + 1
+
+    def _publish_locked(self, store: FaissStore) -> str:
+        versions_dir = os.path.join(self.root, VERSIONS_DIR)
+        os.makedirs(versions_dir, exist_ok=True)
+        name = _version_name(self._next_version(versions_dir))
+
+        # 1) write the new version beside the live ones and make it durable
+        tmp_dir = os.path.join(versions_dir, f".tmp-{name}-{os.getpid()}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        store.save(tmp_dir)
+        for fname in (INDEX_FILE, META_FILE):
+            _fsync_path(os.path.join(tmp_dir, fname))
+        os.rename(tmp_dir, os.path.join(versions_dir, name))
+        _fsync_path(versions_dir)
+
+        # 2) flip the pointer: readers of CURRENT see the old or the new name, never half of one
+        pointer_tmp = os.path.join(self.root, f".{CURRENT_FILE}.tmp")
+        with open(pointer_tmp, "w", encoding="utf-8") as f:
+            f.write(name + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pointer_tmp, os.path.join(self.root, CURRENT_FILE))
+        _fsync_path(self.root)
+
+        # 3) swap the in-process snapshot (single reference assignment)
+        if self.mmap:
+            store = FaissStore.load(os.path.join(versions_dir, name), mmap=True)
+        self._snapshot = (name, store)
+        self.swaps += 1
+        self._prune(versions_dir, name)
+        return name
+
+    def _prune(self, versions_dir: str, live: str):
+        # Open snapshots keep working after their directory goes: the files stay
+        # readable (POSIX unlink semantics) until the last mapping is dropped.
+        names = sorted(n for n in os.listdir(versions_dir) if _VERSION_RE.match(n))
+        for old in names[:-self.keep_versions]:
+            if old != live:
+                shutil.rmtree(os.path.join(versions_dir, old), ignore_errors=True)
+
+
+# -----------------------------
+# Stress test: readers searching while a writer publishes
+# -----------------------------
+
+def stress(readers: int = 8, writes: int = 20, batch: int = 500, dim: int = 128, root: str = "storage/snapshot_stress") -> dict:
+    rng = np.random.default_rng(0)
+
+    def vecs(n: int) -> np.ndarray:
+        v = rng.standard_normal((n, dim)).astype(np.float32)
+        return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+    shutil.rmtree(root, ignore_errors=True)
+    snap = SnapshotStore.open(root, dim=dim)
+    snap.add(vecs(batch), [f"t{i}" for i in range(batch)], [{"row": i} for i in range(batch)])
+
+    queries = vecs(64)
+    stop = threading.Event()
+    lat: List[float] = []
+    errors: List[str] = []
+    lat_lock = threading.Lock()
+
+    def reader(i: int):
+        local: List[float] = []
+        j = i
+        while not stop.is_set():
+            store = snap.snapshot()
+            t0 = time.perf_counter()
+            try:
+                hits = store.search(queries[j % len(queries)], top_k=5)
+                # a torn snapshot would show up as rows without their text/meta
+                if any(meta["row"] != ix for _, _, meta, ix in hits):
+                    errors.append("meta/row mismatch")
+            except Exception as e:  # pragma: no cover - reported, not raised
+                errors.append(repr(e))
+            local.append((time.perf_counter() - t0) * 1000)
+            j += readers
+        with lat_lock:
+            lat.extend(local)
+
+    threads = [threading.Thread(target=reader, args=(i,), daemon=True) for i in range(readers)]
+    for t in threads:
+        t.start()
+    t0 = time.perf_counter()
+    publish_ms: List[float] = []
+    for w in range(writes):
+        n0 = snap.snapshot().index.ntotal
+        tp = time.perf_counter()
+        snap.add(vecs(batch), [f"t{n0 + i}" for i in range(batch)], [{"row": n0 + i} for i in range(batch)])
+        publish_ms.append((time.perf_counter() - tp) * 1000)
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    for t in threads:
+        t.join()
+
+    lat.sort()
+    pct = lambda p: round(lat[min(len(lat) - 1, int(len(lat) * p))], 3) if lat else 0.0  # noqa: E731
+    result = {
+        "version": snap.version,
+        "rows": snap.snapshot().index.ntotal,
+        "queries": len(lat),
+        "qps": round(len(lat) / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+        "publish_ms_avg": round(sum(publish_ms) / len(publish_ms), 2) if publish_ms else 0.0,
+        "errors": len(errors),
+    }
+    print(
+        f"[snapshot] {result['queries']} queries from {readers} readers during {writes} publishes "
+        f"(qps={result['qps']}, p50={result['p50_ms']}ms, p99={result['p99_ms']}ms, "
+        f"publish={result['publish_ms_avg']}ms, errors={result['errors']}) -> {result['version']}"
+    )
+    return result
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Snapshot store: concurrent readers vs. one publishing writer")
+    ap.add_argument("mode", choices=["stress"])
+    ap.add_argument("--readers", type=int, default=8)
+    ap.add_argument("--writes", type=int, default=20)
+    ap.add_argument("--batch", type=int, default=500)
+    ap.add_argument("--dim", type=int, default=128)
+    ap.add_argument("--root", default="storage/snapshot_stress")
+    args = ap.parse_args()
+    stress(args.readers, args.writes, batch=args.batch, dim=args.dim, root=args.root)
+
+
+if __name__ == "__main__":
+    main()
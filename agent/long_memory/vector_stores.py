@@ -0,0 +1,697 @@
+# agent/long_memory/vector_stores.py
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Protocol, Sequence, Tuple, runtime_checkable
+
+import numpy as np
+
+from .faiss_store import INDEX_FILE, FaissStore
+from .filters import Filter, build_metadata_index
+
+# -----------------------------
+# Pluggable vector stores
+# -----------------------------
+# One protocol, three backends:
+#   faiss   -> FaissStore (+ id map and tombstones for upsert/delete)
+#   chroma  -> embedded chromadb PersistentClient (pip install chromadb)
+#   sqlite  -> one SQLite file, vectors as float32 BLOBs, exact numpy search;
+#              meant for small deployments next to storage/chat_memory.db
+#
+# Every backend takes normalized float32 vectors, returns hits as
+# (score, text, meta, row) with score = cosine, and accepts the same `where`
+# filters as FaissStore (see filters.py). Ids are strings; by default
+# "<doc_id>#<chunk_id>" when the meta has both, else a random hex id.
+#
+# Example:
+#   vs = open_vector_store("sqlite", dim=384)        # or VECTOR_BACKEND=sqlite
+#   vs.add(vecs, texts, metas)
+#   vs.upsert(["doc_1#0"], new_vec, ["fixed text"], [{"doc_id": "doc_1", "chunk_id": 0}])
+#   hits = vs.search(qv, top_k=5, where={"doc_id": "doc_1"})
+#   python -m agent.long_memory.vector_stores bench --rows 20000 --backends faiss sqlite chroma
+#
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "faiss")
+BACKENDS = ("faiss", "chroma", "sqlite")
+DEFAULT_PATHS = {
+    "faiss": "storage/vectors_faiss",
+    "chroma": "storage/chroma",
+    "sqlite": "storage/vectors.db",
+}
+IDS_FILE = "ids.json"
+COMPACT_RATIO = 0.25  # FAISS backend rebuilds once this share of rows is tombstoned
+
+Hit = Tuple[float, str, dict, int]
+
+
+@runtime_checkable
+class VectorStore(Protocol):
+    dim: int
+
+    def build(self, vectors: np.ndarray, texts: List[str], metas: List[dict],
+              ids: Optional[List[str]] = None) -> List[str]: ...
+
+    def add(self, vectors: np.ndarray, texts: List[str], metas: List[dict],
+            ids: Optional[List[str]] = None) -> List[str]: ...
+
+    def upsert(self, ids: List[str], vectors: np.ndarray, texts: List[str], metas: List[dict]) -> None: ...
+
+    def delete(self, ids: Iterable[str]) -> int: ...
+
+    def search(self, query_vec: np.ndarray, top_k: int = 5, where: Optional[Filter] = None) -> List[Hit]: ...
+
+    def search_batch(self, query_matrix: np.ndarray, top_k: int = 5,
+                     where: Optional[Filter] = None) -> List[List[Hit]]: ...
+
+    def save(self, path: str) -> None: ...
+
+    @classmethod
+    def load(cls, path: str) -> "VectorStore": ...
+
+    def __len__(self) -> int: ...
+
+
+def default_ids(metas: List[dict]) -> List[str]:
+    return [
+        f"{m['doc_id']}#{m['chunk_id']}" if "doc_id" in m and "chunk_id" in m else uuid.uuid4().hex
+        for m in metas
+    ]
+
+
+def _check_batch(vectors: np.ndarray, texts: List[str], metas: List[dict], ids: Optional[List[str]]) -> np.ndarray:
+    assert vectors.ndim == 2 and vectors.shape[0] == len(texts) == len(metas)
+    if ids is not None:
+        if len(ids) != len(texts):
+            raise ValueError("ids, vectors, texts and metas must have the same length")
+        if len(set(ids)) != len(ids):
+            raise ValueError("duplicate ids in one batch")
+    return np.ascontiguousarray(vectors, dtype=np.float32)
+
+
+class _SingleQuery:
+    def search(self, query_vec: np.ndarray, top_k: int = 5, where: Optional[Filter] = None) -> List[Hit]:
+        if query_vec.ndim == 1:
+            query_vec = query_vec.reshape(1, -1)
+        return self.search_batch(query_vec[:1], top_k=top_k, where=where)[0]
+
+
+# -----------------------------
+# FAISS
+# -----------------------------
+
+class FaissVectorStore(_SingleQuery):
+    """FaissStore plus string ids; deletes are tombstones masked out inside FAISS until `compact`."""
+
+    def __init__(self, dim: int, factory: str = "Flat", store: Optional[FaissStore] = None):
+        self.dim = dim
+        self.store = store if store is not None else FaissStore(dim=dim, factory=factory)
+        self._ids: List[str] = []
+        self._pos: Dict[str, int] = {}
+        self._dead = np.zeros(self.store.index.ntotal, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self._pos)
+
+    def _append(self, ids: List[str], vectors: np.ndarray, texts: List[str], metas: List[dict]):
+        n0 = self.store.index.ntotal
+        if not self.store.index.is_trained:
+            self.store.build(vectors, list(texts), list(metas))
+        else:
+            self.store.add(vectors, list(texts), list(metas))
+        for i, id_ in enumerate(ids):
+            self._ids.append(id_)
+            self._pos[id_] = n0 + i
+        self._dead = np.concatenate([self._dead, np.zeros(len(ids), dtype=bool)])
+
+    def build(self, vectors, texts, metas, ids=None) -> List[str]:
+        self.store = FaissStore(dim=self.dim, factory=self.store.factory, model=self.store.model)
+        self._ids, self._pos, self._dead = [], {}, np.zeros(0, dtype=bool)
+        return self.add(vectors, texts, metas, ids)
+
+    def add(self, vectors, texts, metas, ids=None) -> List[str]:
+        vectors = _check_batch(vectors, texts, metas, ids)
+        ids = list(ids) if ids is not None else default_ids(metas)
+        taken = [i for i in ids if i in self._pos]
+        if taken:
+            raise ValueError(f"{len(taken)} ids already exist (e.g. {taken[0]!r}); use upsert")
+        self._append(ids, vectors, texts, metas)
+        return ids
+
+    def upsert(self, ids, vectors, texts, metas) -> None:
+        vectors = _check_batch(vectors, texts, metas, ids)
+        self._tombstone(ids)
+        self._append(list(ids), vectors, texts, metas)
+        self._maybe_compact()
+
+    def _tombstone(self, ids: Iterable[str]) -> int:
+        n = 0
+        for id_ in ids:
+            pos = self._pos.pop(id_, None)
+            if pos is not None:
+                self._dead[pos] = True
+                n += 1
+        return n
+
+    def delete(self, ids: Iterable[str]) -> int:
+        n = self._tombstone(ids)
+        self._maybe_compact()
+        return n
+
+    def _maybe_compact(self):
+        if self._dead.size and self._dead.mean() > COMPACT_RATIO:
+            self.compact()
+
+    def compact(self):
+        """Rebuild without tombstoned rows (row numbers change)."""
+        live = np.flatnonzero(~self._dead)
+        old = self.store
+        vecs = old.reconstruct()[live]
+        ids = [self._ids[i] for i in live]
+        self.store = FaissStore(dim=self.dim, factory=old.factory, model=old.model)
+        self._ids, self._pos, self._dead = [], {}, np.zeros(0, dtype=bool)
+        if len(live):
+            self._append(ids, vecs, [old.texts[i] for i in live], [old.metas[i] for i in live])
+
+    def search_batch(self, query_matrix, top_k=5, where=None) -> List[List[Hit]]:
+        mask = ~self._dead if self._dead.any() else None
+        return self.store.search_batch(query_matrix, top_k=top_k, where=where, mask=mask)
+
+    def save(self, path: str):
+        self.store.save(path)
+        with open(os.path.join(path, IDS_FILE), "w", encoding="utf-8") as f:
+            json.dump({"ids": self._ids, "deleted": np.flatnonzero(self._dead).tolist()}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = False) -> "FaissVectorStore":
+        store = FaissStore.load(path, mmap=mmap)
+        out = cls(store.dim, store=store)
+        try:
+            with open(os.path.join(path, IDS_FILE), "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            out._ids = list(saved["ids"])
+            out._dead[saved["deleted"]] = True
+        except FileNotFoundError:  # plain FaissStore directory
+            out._ids = [f"{m['doc_id']}#{m['chunk_id']}" if "doc_id" in m and "chunk_id" in m else str(i)
+                        for i, m in enumerate(store.metas)]
+        out._pos = {id_: i for i, id_ in enumerate(out._ids) if not out._dead[i]}
+        return out
+
+
+# -----------------------------
+# SQLite (single file, exact search)
+# -----------------------------
+
+class SQLiteVectorStore(_SingleQuery):
+    """Vectors as float32 BLOBs; searched by one matrix product over an in-memory copy kept in step with writes."""
+
+    def __init__(self, path: str = DEFAULT_PATHS["sqlite"], dim: Optional[int] = None):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS vectors (
+                    row INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id TEXT UNIQUE NOT NULL,
+                    text TEXT,
+                    meta TEXT,
+                    vec BLOB NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS vector_info (key TEXT PRIMARY KEY, value TEXT)")
+            found = self._conn.execute("SELECT value FROM vector_info WHERE key = 'dim'").fetchone()
+            if found is None and dim is not None:
+                self._conn.execute("INSERT INTO vector_info (key, value) VALUES ('dim', ?)", (str(dim),))
+        if found is not None and dim is not None and int(found[0]) != dim:
+            raise ValueError(f"{path} holds dim {found[0]} vectors, not {dim}")
+        self.dim = int(found[0]) if found is not None else dim
+        # In-memory copy for search, in row order. Our own writes are applied to it
+        # directly; a full reload happens only when PRAGMA data_version shows that
+        # another connection committed (it never moves for this connection's writes).
+        self._version = None  # data_version the copy matches; None = not loaded yet
+        self._n = 0
+        self._row_buf = np.zeros(0, dtype=np.int64)  # grown by doubling; rows [:_n] are live
+        self._vec_buf = np.zeros((0, self.dim or 0), dtype=np.float32)
+        self._ids: List[str] = []
+        self._pos: Dict[str, int] = {}
+        self._texts: List[str] = []
+        self._metas: List[dict] = []
+        self._meta_index = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def _rows(self, ids, vectors, texts, metas):
+        return [
+            (id_, text, json.dumps(meta, ensure_ascii=False), vec.tobytes())
+            for id_, vec, text, meta in zip(ids, vectors, texts, metas)
+        ]
+
+    def _write(self, sql: str, rows: list):
+        with self._lock:
+            with self._conn:
+                if self.dim is None and rows:
+                    self.dim = len(rows[0][3]) // 4
+                    self._conn.execute("INSERT OR IGNORE INTO vector_info (key, value) VALUES ('dim', ?)", (str(self.dim),))
+                self._conn.executemany(sql, rows)
+            self._apply_upsert(rows)
+
+    def build(self, vectors, texts, metas, ids=None) -> List[str]:
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM vectors")
+            if self._cached():
+                self._set_cache([], [], [], [], np.zeros((0, self.dim or 0), dtype=np.float32))
+        return self.add(vectors, texts, metas, ids)
+
+    def add(self, vectors, texts, metas, ids=None) -> List[str]:
+        vectors = _check_batch(vectors, texts, metas, ids)
+        ids = list(ids) if ids is not None else default_ids(metas)
+        try:
+            self._write("INSERT INTO vectors (id, text, meta, vec) VALUES (?, ?, ?, ?)",
+                        self._rows(ids, vectors, texts, metas))
+        except sqlite3.IntegrityError as e:
+            raise ValueError(f"ids already exist; use upsert ({e})") from e
+        return ids
+
+    def upsert(self, ids, vectors, texts, metas) -> None:
+        vectors = _check_batch(vectors, texts, metas, ids)
+        self._write(
+            "INSERT INTO vectors (id, text, meta, vec) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET text = excluded.text, meta = excluded.meta, vec = excluded.vec",
+            self._rows(ids, vectors, texts, metas),
+        )
+
+    def delete(self, ids: Iterable[str]) -> int:
+        ids = list(ids)
+        n = 0
+        with self._lock:
+            with self._conn:
+                for b in range(0, len(ids), 500):
+                    part = ids[b:b + 500]
+                    cur = self._conn.execute(f"DELETE FROM vectors WHERE id IN ({','.join('?' * len(part))})", part)
+                    n += cur.rowcount
+            if n and self._cached():
+                self._apply_delete(ids)
+        return n
+
+    # ----- in-memory copy (callers hold self._lock) -----
+
+    def _cached(self) -> bool:
+        """True when the copy is loaded and no other connection has written since."""
+        return self._version is not None and self._version == self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _set_cache(self, rows, ids, texts, metas, matrix: np.ndarray):
+        self._n = len(ids)
+        self._row_buf, self._vec_buf = np.asarray(rows, dtype=np.int64), matrix
+        self._ids, self._texts, self._metas = ids, texts, metas
+        self._pos = {id_: i for i, id_ in enumerate(ids)}
+        self._meta_index = None
+
+    def _reload(self):
+        rows, ids, texts, metas, blobs = [], [], [], [], []
+        for row, id_, text, meta, vec in self._conn.execute("SELECT row, id, text, meta, vec FROM vectors ORDER BY row"):
+            rows.append(row)
+            ids.append(id_)
+            texts.append(text)
+            metas.append(json.loads(meta))
+            blobs.append(vec)
+        matrix = np.frombuffer(bytearray(b"".join(blobs)), dtype=np.float32).reshape(len(rows), self.dim or 0)
+        self._set_cache(rows, ids, texts, metas, matrix)
+        self._version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _apply_upsert(self, rows: list):
+        if not self._cached():
+            return  # the next search reloads anyway
+        latest = {id_: (text, meta, vec) for id_, text, meta, vec in rows}
+        new = [id_ for id_ in latest if id_ not in self._pos]
+        for id_, (text, meta, vec) in latest.items():
+            i = self._pos.get(id_)
+            if i is not None:
+                self._vec_buf[i] = np.frombuffer(vec, dtype=np.float32)
+                self._texts[i] = text
+                self._metas[i] = json.loads(meta)
+                self._meta_index = None  # postings of an existing row changed
+        if not new:
+            return
+        row_of: Dict[str, int] = {}
+        for b in range(0, len(new), 500):
+            part = new[b:b + 500]
+            row_of.update(self._conn.execute(
+                f"SELECT id, row FROM vectors WHERE id IN ({','.join('?' * len(part))})", part).fetchall())
+        new.sort(key=row_of.__getitem__)  # AUTOINCREMENT rows come after every cached one
+        start, end = self._n, self._n + len(new)
+        if end > len(self._row_buf):
+            cap = max(end, 2 * len(self._row_buf), 1024)
+            row_buf = np.empty(cap, dtype=np.int64)
+            vec_buf = np.empty((cap, self.dim), dtype=np.float32)
+            row_buf[:start], vec_buf[:start] = self._row_buf[:start], self._vec_buf[:start]
+            self._row_buf, self._vec_buf = row_buf, vec_buf
+        added = [json.loads(latest[id_][1]) for id_ in new]
+        for i, id_ in enumerate(new, start):
+            self._row_buf[i] = row_of[id_]
+            self._vec_buf[i] = np.frombuffer(latest[id_][2], dtype=np.float32)
+            self._pos[id_] = i
+        self._ids.extend(new)
+        self._texts.extend(latest[id_][0] for id_ in new)
+        self._metas.extend(added)
+        self._n = end
+        if self._meta_index is not None:
+            self._meta_index.add(added)
+
+    def _apply_delete(self, ids: List[str]):
+        gone = [self._pos[id_] for id_ in set(ids) if id_ in self._pos]
+        if not gone:
+            return
+        keep = np.ones(self._n, dtype=bool)
+        keep[gone] = False
+        idx = np.flatnonzero(keep)
+        # Fresh arrays and lists, so a search still holding the previous snapshot is unaffected.
+        self._set_cache(self._row_buf[:self._n][keep], [self._ids[i] for i in idx], [self._texts[i] for i in idx],
+                        [self._metas[i] for i in idx], self._vec_buf[:self._n][keep])
+
+    def _snapshot(self, where: Optional[Filter] = None):
+        """(rows, matrix, texts, metas, mask) for one search; `mask` is None without `where`."""
+        with self._lock:
+            if not self._cached():
+                self._reload()
+            n = self._n
+            mask = None
+            if where:
+                if self._meta_index is None:
+                    self._meta_index = build_metadata_index(self._metas)
+                mask = self._meta_index.bitmap(where)
+            return self._row_buf[:n], self._vec_buf[:n], self._texts, self._metas, mask
+
+    def search_batch(self, query_matrix, top_k=5, where=None) -> List[List[Hit]]:
+        rows, matrix, texts, metas, mask = self._snapshot(where)
+        q = np.ascontiguousarray(query_matrix, dtype=np.float32)
+        if not len(rows):
+            return [[] for _ in range(q.shape[0])]
+        if q.shape[1] != matrix.shape[1]:
+            raise ValueError(f"query vectors have dim {q.shape[1]} but {self.path} holds dim {matrix.shape[1]}")
+        scores = q @ matrix.T
+        if mask is not None:
+            scores[:, ~mask] = -np.inf
+        k = min(top_k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        out: List[List[Hit]] = []
+        for qi, cand in enumerate(top):
+            order = cand[np.argsort(-scores[qi, cand])]
+            out.append([(float(scores[qi, i]), texts[i], metas[i], int(rows[i]))
+                        for i in order if np.isfinite(scores[qi, i])])
+        return out
+
+    def save(self, path: str):
+        """Data is already on disk; saving elsewhere writes a consistent copy."""
+        if os.path.abspath(path) == os.path.abspath(self.path):
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._lock, sqlite3.connect(path) as dest:
+            self._conn.backup(dest)
+
+    @classmethod
+    def load(cls, path: str) -> "SQLiteVectorStore":
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"SQLite vector store not found: {path}")
+        return cls(path)
+
+
+# -----------------------------
+# Chroma (embedded)
+# -----------------------------
+
+def _chroma_where(where: Optional[Filter]) -> Optional[dict]:
+    """Translate our filter syntax to Chroma's (which needs explicit $and and has no $not)."""
+    if not where:
+        return None
+    clauses = []
+    for key, cond in where.items():
+        if key in ("$and", "$or"):
+            subs = [_chroma_where(sub) for sub in cond]
+            clauses.append(subs[0] if len(subs) == 1 else {key: subs})
+        elif key == "$not":
+            raise ValueError("the chroma backend does not support $not filters")
+        elif isinstance(cond, dict):
+            clauses.extend({key: {op: list(arg) if op in ("$in", "$nin") else arg}} for op, arg in cond.items())
+        elif isinstance(cond, (list, tuple, set)):
+            clauses.append({key: {"$in": list(cond)}})
+        else:
+            clauses.append({key: {"$eq": cond}})
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class ChromaVectorStore(_SingleQuery):
+    """Embedded chromadb collection (HNSW, inner-product space); scalar meta fields are filterable."""
+
+    def __init__(self, path: str = DEFAULT_PATHS["chroma"], dim: Optional[int] = None, collection: str = "chunks"):
+        import chromadb
+        from chromadb.config import Settings
+
+        self.path = path
+        self.collection_name = collection
+        self.client = chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False))
+        self.col = self.client.get_or_create_collection(collection, metadata={"hnsw:space": "ip"})
+        self.dim = dim
+        if self.dim is None and self.col.count():
+            self.dim = len(self.col.peek(1)["embeddings"][0])
+        rows = [m.get("_row", -1) for m in (self.col.get(include=["metadatas"])["metadatas"] or [])]
+        self._next_row = max(rows, default=-1) + 1
+        try:
+            self._max_batch = int(self.client.get_max_batch_size())
+        except Exception:
+            self._max_batch = 5000
+
+    def __len__(self) -> int:
+        return self.col.count()
+
+    def _payload(self, metas: List[dict]) -> List[dict]:
+        out = []
+        for meta in metas:
+            flat = {k: v for k, v in meta.items() if isinstance(v, (str, int, float, bool))}
+            flat["_meta"] = json.dumps(meta, ensure_ascii=False)  # full meta, lists included
+            flat["_row"] = self._next_row
+            self._next_row += 1
+            out.append(flat)
+        return out
+
+    def _send(self, method, ids, vectors, texts, metas):
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        payload = self._payload(metas)
+        for b in range(0, len(ids), self._max_batch):
+            sl = slice(b, b + self._max_batch)
+            method(ids=list(ids[sl]), embeddings=vectors[sl].tolist(), documents=list(texts[sl]), metadatas=payload[sl])
+
+    def build(self, vectors, texts, metas, ids=None) -> List[str]:
+        self.client.delete_collection(self.collection_name)
+        self.col = self.client.get_or_create_collection(self.collection_name, metadata={"hnsw:space": "ip"})
+        self._next_row = 0
+        return self.add(vectors, texts, metas, ids)
+
+    def add(self, vectors, texts, metas, ids=None) -> List[str]:
+        vectors = _check_batch(vectors, texts, metas, ids)
+        ids = list(ids) if ids is not None else default_ids(metas)
+        taken = self.col.get(ids=ids, include=[])["ids"]
+        if taken:
+            raise ValueError(f"{len(taken)} ids already exist (e.g. {taken[0]!r}); use upsert")
+        self._send(self.col.add, ids, vectors, texts, metas)
+        return ids
+
+    def upsert(self, ids, vectors, texts, metas) -> None:
+        vectors = _check_batch(vectors, texts, metas, ids)
+        self._send(self.col.upsert, list(ids), vectors, texts, metas)
+
+    def delete(self, ids: Iterable[str]) -> int:
+        existing = self.col.get(ids=list(ids), include=[])["ids"]
+        if existing:
+            self.col.delete(ids=existing)
+        return len(existing)
+
+    def search_batch(self, query_matrix, top_k=5, where=None) -> List[List[Hit]]:
+        q = np.ascontiguousarray(query_matrix, dtype=np.float32)
+        n = self.col.count()
+        if not n:
+            return [[] for _ in range(q.shape[0])]
+        res = self.col.query(query_embeddings=q.tolist(), n_results=min(top_k, n), where=_chroma_where(where),
+                             include=["documents", "metadatas", "distances"])
+        out: List[List[Hit]] = []
+        for docs, metas, dists in zip(res["documents"], res["metadatas"], res["distances"]):
+            # "ip" space distance is 1 - dot, so cosine = 1 - distance for normalized vectors
+            out.append([(1.0 - float(d), doc, json.loads(m["_meta"]), int(m["_row"]))
+                        for doc, m, d in zip(docs, metas, dists)])
+        return out
+
+    def save(self, path: str):
+        """PersistentClient writes through; saving elsewhere copies the directory."""
+        if os.path.abspath(path) != os.path.abspath(self.path):
+            shutil.copytree(self.path, path, dirs_exist_ok=True)
+
+    @classmethod
+    def load(cls, path: str) -> "ChromaVectorStore":
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"Chroma store not found: {path}")
+        return cls(path)
+
+
+def open_vector_store(backend: Optional[str] = None, path: Optional[str] = None,
+                      dim: Optional[int] = None) -> VectorStore:
+    """Open (or create, given `dim`) a store; `backend` defaults to VECTOR_BACKEND."""
+    backend = (backend or VECTOR_BACKEND).strip().lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown vector backend {backend!r}; choose from {BACKENDS}")
+    path = path or DEFAULT_PATHS[backend]
+    if backend == "faiss":
+        if os.path.exists(os.path.join(path, INDEX_FILE)):
+            return FaissVectorStore.load(path)
+        if dim is None:
+            raise FileNotFoundError(f"FAISS store not found in {path} (pass dim to create one)")
+        return FaissVectorStore(dim)
+    if backend == "sqlite":
+        return SQLiteVectorStore(path, dim=dim)
+    return ChromaVectorStore(path, dim=dim)
+
+
+# -----------------------------
+# Backend comparison benchmark
+# -----------------------------
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _disk_mb(path: str) -> float:
+    if os.path.isfile(path):
+        paths = [path] + [path + s for s in ("-wal", "-shm") if os.path.exists(path + s)]
+        return sum(os.path.getsize(p) for p in paths) / (1024 * 1024)
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(path) for f in fs) / (1024 * 1024)
+
+
+def _corpus(rows: int, dim: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, rows // 100), dim)).astype(np.float32)
+    vecs = centers[rng.integers(0, len(centers), rows)] + 0.5 * rng.standard_normal((rows, dim)).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    texts = [f"chunk {i} of doc {i // 10}" for i in range(rows)]
+    metas = [{"doc_id": f"doc_{i // 10}", "chunk_id": i % 10} for i in range(rows)]
+    return vecs, texts, metas
+
+
+def bench_backend(backend: str, rows: int, dim: int, queries: int = 200, k: int = 10,
+                  batch: int = 1000, root: str = "storage/vector_bench") -> dict:
+    """Ingest rate, query latency, recall vs. exact search, RSS and disk size for one backend."""
+    vecs, texts, metas = _corpus(rows, dim)
+    qs = vecs[np.random.default_rng(1).integers(0, rows, queries)] + 0.05
+    qs /= np.linalg.norm(qs, axis=1, keepdims=True)
+    exact = np.argsort(-(qs @ vecs.T), axis=1)[:, :k]
+
+    path = os.path.join(root, backend + (".db" if backend == "sqlite" else ""))
+    shutil.rmtree(path, ignore_errors=True)
+    if os.path.isfile(path):
+        os.remove(path)
+    rss0 = _rss_mb()
+    t0 = time.perf_counter()
+    store = open_vector_store(backend, path, dim=dim)
+    ids = default_ids(metas)
+    for b in range(0, rows, batch):
+        store.add(vecs[b:b + batch], texts[b:b + batch], metas[b:b + batch], ids[b:b + batch])
+    store.save(path)
+    ingest_s = time.perf_counter() - t0
+
+    store.search(qs[0], top_k=k)  # warm caches / lazy structures
+    lat, flt, recall = [], [], 0.0
+    id_of = {m["doc_id"] + "#" + str(m["chunk_id"]): i for i, m in enumerate(metas)}
+    for qi, q in enumerate(qs):
+        t = time.perf_counter()
+        hits = store.search(q, top_k=k)
+        lat.append((time.perf_counter() - t) * 1000)
+        got = {id_of[f"{m['doc_id']}#{m['chunk_id']}"] for _, _, m, _ in hits}
+        recall += len(got & set(exact[qi].tolist())) / k
+        t = time.perf_counter()
+        store.search(q, top_k=k, where={"doc_id": metas[qi * 7 % rows]["doc_id"]})
+        flt.append((time.perf_counter() - t) * 1000)
+    t = time.perf_counter()
+    for b in range(0, queries, 64):
+        store.search_batch(qs[b:b + 64], top_k=k)
+    batch_qps = queries / (time.perf_counter() - t)
+
+    lat.sort()
+    flt.sort()
+    return {
+        "backend": backend,
+        "rows": rows,
+        "ingest_rows_per_s": round(rows / ingest_s, 1),
+        "query_p50_ms": round(lat[len(lat) // 2], 3),
+        "query_p99_ms": round(lat[min(len(lat) - 1, int(len(lat) * 0.99))], 3),
+        "filtered_p50_ms": round(flt[len(flt) // 2], 3),
+        "batch_qps": round(batch_qps, 1),
+        f"recall@{k}": round(recall / len(qs), 4),
+        "rss_mb": round(_rss_mb() - rss0, 1),
+        "disk_mb": round(_disk_mb(path), 1),
+    }
+
+
+def bench(backends: Sequence[str], rows: int = 20_000, dim: int = 384, queries: int = 200, k: int = 10,
+          root: str = "storage/vector_bench") -> List[dict]:
+    """Each backend in a fresh process so RSS numbers don't leak into each other."""
+    results = []
+    for backend in backends:
+        proc = subprocess.run(
+            [sys.executable, "-m", "agent.long_memory.vector_stores", "bench", "--child",
+             "--backends", backend, "--rows", str(rows), "--dim", str(dim), "--queries", str(queries),
+             "--k", str(k), "--root", root],
+            capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            print(f"[bench] {backend} failed:\n{proc.stderr[-800:]}")
+            continue
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        results.append(r)
+        print(
+            f"{backend:<7} ingest={r['ingest_rows_per_s']:>9.1f} rows/s  p50={r['query_p50_ms']:>7.3f}ms  "
+            f"p99={r['query_p99_ms']:>7.3f}ms  filtered p50={r['filtered_p50_ms']:>7.3f}ms  "
+            f"qps={r['batch_qps']:>8.1f}  recall@{k}={r[f'recall@{k}']:.3f}  "
+            f"rss=+{r['rss_mb']}MB  disk={r['disk_mb']}MB"
+        )
+    shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Vector store backends: ingest / latency / memory comparison")
+    ap.add_argument("mode", choices=["bench"])
+    ap.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    ap.add_argument("--rows", type=int, default=20_000)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--root", default="storage/vector_bench")
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(bench_backend(args.backends[0], args.rows, args.dim, args.queries, args.k, root=args.root)))
+        return
+    bench(args.backends, args.rows, args.dim, args.queries, args.k, root=args.root)
+
+
+if __name__ == "__main__":
+    main()
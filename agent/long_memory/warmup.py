@@ -0,0 +1,159 @@
+# agent/long_memory/warmup.py
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Callable, Dict, List, Optional, Tuple
+
+# -----------------------------
+# Start-up warm-up
+# -----------------------------
+# The embedding model (an lru_cache'd SentenceTransformer / ONNX session) and
+# the knowledge index are otherwise loaded by the first request that needs
+# them, which then takes seconds. `start_warmup()` does that work once on a
+# background thread when the API starts: load the configured model, run a
+# dummy encode so kernels are compiled/paged in, load the knowledge index
+# (and the model it was built with) and run one search against it.
+# Retrieval entry points call `wait_warm()` first, so a request arriving
+# mid warm-up waits for it instead of starting a second, duplicate load.
+#
+# WARMUP          0 disables the warm-up (everything loads on first use again)
+# WARMUP_WAIT_S   how long retrieval waits for an unfinished warm-up (120)
+#
+# Example:
+#   start_warmup()                  # API start-up; returns immediately
+#   readiness()                     # {"ready": False, "state": "warming", ...}
+#   python -m agent.long_memory.warmup      # run it in the foreground, print timings
+#
+
+WARMUP = os.getenv("WARMUP", "1").strip().lower() not in {"0", "false", "no"}
+WARMUP_WAIT_S = float(os.getenv("WARMUP_WAIT_S", "120"))
+
+_DUMMY_TEXT = "warm-up query"
+
+_lock = threading.Lock()
+_future: Optional[Future] = None
+_steps: Dict[str, dict] = {}
+_started_at: Optional[float] = None
+_finished_at: Optional[float] = None
+_local = threading.local()  # set on the warm-up thread so it never waits on itself
+
+
+# ----- Steps -----
+
+def _warm_model() -> str:
+    from .embeddings import _selected_alias, embed_texts, resolved_model_name, selected_backend
+
+    alias = _selected_alias()
+    dim = embed_texts([_DUMMY_TEXT], alias).shape[1]
+    return f"{resolved_model_name(alias)} ({selected_backend()}, dim {dim})"
+
+
+def _warm_knowledge_index() -> str:
+    from tools.knowledge_tool import warm
+
+    return warm(_DUMMY_TEXT)
+
+
+def _warm_session_memory() -> str:
+    from .session_memory import get_session_memory
+
+    get_session_memory()
+    return "ready"
+
+
+STEPS: List[Tuple[str, Callable[[], str]]] = [
+    ("embedding_model", _warm_model),
+    ("knowledge_index", _warm_knowledge_index),
+    ("session_memory", _warm_session_memory),
+]
+
+
+def _run() -> Dict[str, dict]:
+    global _finished_at
+    _local.active = True
+    for name, step in STEPS:
+        t0 = time.perf_counter()
+        _steps[name] = {"status": "running"}
+        try:
+            detail = step()
+            _steps[name] = {"status": "ok", "detail": detail}
+        except FileNotFoundError as e:
+            _steps[name] = {"status": "skipped", "detail": str(e)}
+        except Exception as e:  # reported in readiness; callers will load on demand
+            _steps[name] = {"status": "error", "detail": f"{type(e).__name__}: {e}"}
+        _steps[name]["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        print(f"[warmup] {name}: {_steps[name]['status']} in {_steps[name]['ms']} ms ({_steps[name]['detail']})")
+    _finished_at = time.time()
+    return dict(_steps)
+
+
+# ----- Public API -----
+
+def start_warmup() -> Optional[Future]:
+    """Kick off the warm-up once per process (no-op if disabled or already started)."""
+    global _future, _started_at
+    if not WARMUP:
+        return None
+    with _lock:
+        if _future is None:
+            _started_at = time.time()
+            pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="warmup")
+            _future = pool.submit(_run)
+            pool.shutdown(wait=False)  # the thread exits once the warm-up is done
+        return _future
+
+
+def wait_warm(timeout: Optional[float] = None) -> bool:
+    """
+    Block until an in-progress warm-up finishes (at most `timeout`, default
+    WARMUP_WAIT_S). True if nothing is pending; never raises.
+    """
+    fut = _future
+    if fut is None or fut.done() or getattr(_local, "active", False):
+        return True
+    t0 = time.perf_counter()
+    wait_s = WARMUP_WAIT_S if timeout is None else timeout
+    try:
+        fut.result(timeout=wait_s)
+    except FutureTimeout:
+        print(f"[warmup] still running after {wait_s}s wait")
+        return False
+    print(f"[warmup] request waited {round((time.perf_counter() - t0) * 1000)} ms for warm-up")
+    return True
+
+
+def readiness() -> dict:
+    fut = _future
+    if fut is None:
+        state = "disabled" if not WARMUP else "idle"
+    else:
+        state = "ready" if fut.done() else "warming"
+    steps = {name: dict(info) for name, info in _steps.items()}
+    return {
+        "ready": state in {"ready", "disabled"},
+        "state": state,
+        "degraded": any(info.get("status") == "error" for info in steps.values()),
+        "seconds": round((_finished_at or time.time()) - _started_at, 2) if _started_at else None,
+        "steps": steps,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run the API start-up warm-up in the foreground and report timings")
+    ap.parse_args()
+    fut = start_warmup()
+    if fut is None:
+        print("[warmup] disabled (WARMUP=0)")
+        return
+    fut.result()
+    print(json.dumps(readiness(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
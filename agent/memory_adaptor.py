@@ -1,6 +1,11 @@
 # agent/memory_adaptor.py
+import os
 from typing import List, Tuple
-from memory.short_memory import get_recent_messages, save_message
+from memory.short_memory import get_recent_messages, get_recent_messages_with_ids, save_message
+
+# SEMANTIC_MEMORY=0 falls back to the plain last-N window everywhere.
+SEMANTIC_MEMORY = os.getenv("SEMANTIC_MEMORY", "1").strip().lower() not in {"0", "false", "no"}
+
 
 def load_context(session_id: str, limit: int = 6) -> List[Tuple[str, str]]:
     """
@@ -8,9 +13,43 @@ def load_context(session_id: str, limit: int = 6) -> List[Tuple[str, str]]:
     """
     return get_recent_messages(session_id, limit=limit)
 
+
+def load_semantic_context(session_id: str, prompt: str, recent: int = 4, k: int = 4
+                          ) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """
+    Returns (relevant_older, recent_window): the last `recent` messages plus
+    the `k` older messages most similar to `prompt`, both chronological.
+    Without semantic memory, or if it fails (model missing, load error),
+    relevant_older is empty.
+    """
+    window = get_recent_messages_with_ids(session_id, limit=recent)
+    if not SEMANTIC_MEMORY:
+        return [], [(r, c) for _, r, c in window]
+    try:
+        from agent.long_memory.session_memory import get_session_memory
+
+        return get_session_memory().build_context(session_id, prompt, window, k=k)
+    except Exception as e:
+        print(f"⚠️ Semantic memory unavailable, using recent messages only: {type(e).__name__}: {e}")
+        return [], [(r, c) for _, r, c in window]
+
+
 def persist_turn(session_id: str, user_text: str, assistant_text: str) -> None:
     """
     Save both sides of the conversation turn.
     """
-    save_message(session_id, "user", user_text)
-    save_message(session_id, "assistant", assistant_text)
\ No newline at end of file
+    uid = save_message(session_id, "user", user_text)
+    aid = save_message(session_id, "assistant", assistant_text)
+    if SEMANTIC_MEMORY:
+        from agent.long_memory.session_memory import get_session_memory
+
+        # Embedding happens on a background thread; the reply isn't delayed.
+        get_session_memory().index_async(session_id, [(uid, "user", user_text), (aid, "assistant", assistant_text)])
+
+
+def forget_session(session_id: str) -> None:
+    """Drop the session's semantic index (SQLite rows are cleared by the caller)."""
+    if SEMANTIC_MEMORY:
+        from agent.long_memory.session_memory import get_session_memory
+
+        get_session_memory().drop(session_id)
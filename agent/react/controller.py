@@ -5,12 +5,13 @@ ReAct controller: builds the prompt, runs the loop, and applies heuristics.
 import json
 from typing import List, Tuple
 
-from agent.memory_adaptor import load_context, persist_turn
-from agent.system_prompt import SYSTEM_PROMPT
+from agent.memory_adaptor import load_context, load_semantic_context, persist_turn
+from agent.system_prompt import build_system_prompt
 from models.reason_llm import run_reasoning_model
 from tools.registry import resolve_tool, run_tool
 from .heuristics import maybe_finalize_greet, maybe_finalize_math, maybe_finalize_transform
 from .intents import classify_intent, wants_multi_step
+from .parallel import batch_key, batch_result, format_observation, is_batch, parse_calls, run_calls
 from .parsing import extract_first_json, quote_bare_placeholders, strip_noise
 from .prehandlers import (handle_preloops, is_first_calc_query, is_goodbye_query, is_identity_query, is_summary_query)
 from .utils import (fill_placeholders, find_name_in_history, format_memory)
@@ -27,10 +28,17 @@ def run_react(prompt: str, session_id: str, max_steps: int = 10) -> str:
         is_goodbye_query(prompt),
     ))
     history: List[Tuple[str, str]] = load_context(session_id, limit=(20 if need_more else base_limit))
-    memory_block = format_memory(history)
+    if need_more:
+        memory_block = format_memory(history)
+    else:
+        # Short recent window + older turns that are semantically relevant to this prompt.
+        relevant, recent = load_semantic_context(session_id, prompt, recent=4, k=4)
+        memory_block = format_memory(recent)
+        if relevant:
+            memory_block = f"(relevant earlier messages)\n{format_memory(relevant)}\n(recent messages)\n{memory_block}"
 
     controller = (
-        f"{SYSTEM_PROMPT}\n\n"
+        f"{build_system_prompt()}\n\n"
         f"Conversation so far:\n{memory_block}\n\n"
         f"USER: {prompt}\n"
         f"Thought:"
@@ -85,6 +93,8 @@ def run_react(prompt: str, session_id: str, max_steps: int = 10) -> str:
 
         try:
             data = json.loads(json_block)
+            if is_batch(data) and len(data["calls"]) == 1 and isinstance(data["calls"][0], dict):
+                data = data["calls"][0]  # a batch of one is just a call
             tool = data.get("tool")
             args = data.get("args", {})
         except Exception as e:
@@ -99,6 +109,32 @@ def run_react(prompt: str, session_id: str, max_steps: int = 10) -> str:
             persist_turn(session_id, prompt, "Invalid JSON from model.")
             return "Invalid JSON from model."
 
+        # Several calls in one step: independent ones run concurrently, all observations come back together
+        if is_batch(data):
+            calls = parse_calls(data)
+            for call in calls:
+                call.args = fill_placeholders(call.args, last_result)
+            run_calls(calls, run_tool)
+            for call in calls:
+                print(f"🧰 Tool call [{call.id}]: {call.tool}({call.args}) -> {call.result}")
+            last_result = batch_result(calls)
+
+            key = batch_key(calls)
+            repeat_count = repeat_count + 1 if key == last_action_key else 1
+            last_action_key = key
+            if repeat_count >= 2:
+                final = f"Final Answer: {last_result}"
+                persist_turn(session_id, prompt, final)
+                print("🛑 Auto-finalized: repeated same tool calls twice.")
+                return final
+
+            controller += (
+                f"\n{json_block}\nObservation:\n{format_observation(calls) or '[tool_error] empty calls list'}\n"
+                "Guidance: If the user's request is satisfied, output 'Final Answer: <text>' now. "
+                "Otherwise, output the next JSON tool call(s).\nThought:"
+            )
+            continue
+
         # Some models return a fake tool 'FINAL ANSWER'
         norm = resolve_tool(tool)
         if norm == "__final_answer__":
@@ -33,6 +33,10 @@ def maybe_finalize_math(intent: str, prompt: str, norm: str, result) -> str | No
     if intent != "math":
         return None
 
+    # calculate evaluates the whole expression in one call.
+    if norm == "calculate" and is_number(result):
+        return f"Final Answer: {result}"
+
     # Single-step math: finalize on first numeric result.
     if is_number(result) and not wants_multi_step(prompt):
         return f"Final Answer: {result}"
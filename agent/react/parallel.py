@@ -0,0 +1,135 @@
+"""
+Batched tool calls: several calls in one model step, run concurrently where independent.
+
+Protocol (one JSON object, like a single call):
+  {"calls": [
+     {"id": "c1", "tool": "to_uppercase", "args": {"text": "a"}},
+     {"id": "c2", "tool": "add_numbers", "args": {"a": 2, "b": 3}},
+     {"id": "c3", "tool": "multiply", "args": {"a": "<c2>", "b": 4}, "after": ["c2"]}
+  ]}
+A call depends on the ids in its "after" list and on any "<id>" placeholder in
+its args. Calls run in waves: every call whose dependencies have finished runs
+concurrently with the others in its wave; "<id>" is then replaced by that result.
+"""
+
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+MAX_CALLS = 8
+
+# Callers only wait here; the tools themselves run in tools.executor's pools.
+_POOL = ThreadPoolExecutor(max_workers=MAX_CALLS, thread_name_prefix="react-call")
+
+_REF = re.compile(r"<([A-Za-z][\w-]*)>")
+
+
+@dataclass
+class Call:
+    id: str
+    tool: str
+    args: Any
+    after: List[str] = field(default_factory=list)
+    result: Any = None
+
+
+def is_batch(data: Any) -> bool:
+    return isinstance(data, dict) and isinstance(data.get("calls"), list)
+
+
+def _refs(value: Any) -> List[str]:
+    """Ids referenced as "<id>" anywhere inside `value`."""
+    if isinstance(value, str):
+        return _REF.findall(value)
+    if isinstance(value, dict):
+        return [r for v in value.values() for r in _refs(v)]
+    if isinstance(value, list):
+        return [r for v in value for r in _refs(v)]
+    return []
+
+
+def parse_calls(data: dict) -> List[Call]:
+    """Normalize the "calls" list; ids default to c1, c2, ... and dependencies include "<id>" refs."""
+    raw = [c for c in data.get("calls", []) if isinstance(c, dict)][:MAX_CALLS]
+    calls: List[Call] = []
+    ids = set()
+    explicit = {str(c["id"]) for c in raw if c.get("id")}
+    n = 0
+    for c in raw:
+        cid = str(c.get("id") or "")
+        if not cid or cid in ids:  # missing or duplicate id: keep the call, give it an unused one
+            n += 1
+            while f"c{n}" in ids or f"c{n}" in explicit:
+                n += 1
+            cid = f"c{n}"
+        ids.add(cid)
+        calls.append(Call(cid, c.get("tool") or "", c.get("args", {}), [str(a) for a in (c.get("after") or []) if a]))
+    for c in calls:
+        for ref in _refs(c.args):
+            if ref in ids and ref not in c.after:
+                c.after.append(ref)
+    return calls
+
+
+def _substitute(value: Any, results: Dict[str, Any]) -> Any:
+    if isinstance(value, str):
+        whole = _REF.fullmatch(value)
+        if whole and whole.group(1) in results:
+            return results[whole.group(1)]  # keep the type: "<c2>" -> 5.0
+        return _REF.sub(lambda m: str(results[m.group(1)]) if m.group(1) in results else m.group(0), value)
+    if isinstance(value, dict):
+        return {k: _substitute(v, results) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_substitute(v, results) for v in value]
+    return value
+
+
+def _failed(result: Any) -> bool:
+    return isinstance(result, str) and result.startswith("[tool_error]")
+
+
+def run_calls(calls: List[Call], run: Callable[[str, Any], Any]) -> List[Call]:
+    """Execute `calls` with `run(tool, args)`, independent ones concurrently; fills `.result` in place."""
+    results: Dict[str, Any] = {}
+    pending = list(calls)
+    known = {c.id for c in calls}
+    while pending:
+        wave = [c for c in pending if all(d in results for d in c.after)]
+        if not wave:
+            # what is left waits on an unknown id or on a cycle; work out every
+            # call's missing ids before recording any of them as failed
+            missing = {c.id: [d for d in c.after if d not in results] for c in pending}
+            for c in pending:
+                why = "unknown id" if any(d not in known for d in missing[c.id]) else "circular dependency"
+                c.result = f"[tool_error] {c.id} waits on {', '.join(missing[c.id])} ({why})"
+                results[c.id] = c.result
+            break
+        futures = {}
+        for c in wave:
+            broken = [d for d in c.after if _failed(results[d])]
+            if broken:
+                c.result = f"[tool_error] {c.id} skipped: {', '.join(broken)} failed"
+                continue
+            c.args = _substitute(c.args, results)
+            futures[c.id] = _POOL.submit(run, c.tool, c.args)
+        for c in wave:
+            if c.id in futures:
+                c.result = futures[c.id].result()
+            results[c.id] = c.result
+        pending = [c for c in pending if c.id not in results]
+    return calls
+
+
+def format_observation(calls: List[Call]) -> str:
+    return "\n".join(f"[{c.id}] {c.tool} -> {c.result}" for c in calls)
+
+
+def batch_result(calls: List[Call]) -> Optional[Any]:
+    """Result `<last_result>` should refer to after a batch: the last call's."""
+    return calls[-1].result if calls else None
+
+
+def batch_key(calls: List[Call]) -> tuple:
+    return ("__batch__", json.dumps([[c.tool, c.args] for c in calls], sort_keys=True, ensure_ascii=False, default=str))
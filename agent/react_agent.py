@@ -5,7 +5,7 @@ import re
 from typing import List, Tuple, Any
 
 from agent.memory_adaptor import load_context, persist_turn
-from agent.system_prompt import SYSTEM_PROMPT
+from agent.system_prompt import build_system_prompt
 from models.reason_llm import run_reasoning_model
 from tools.registry import run_tool, resolve_tool
 
@@ -240,7 +240,7 @@ def run_react(prompt: str, session_id: str, max_steps: int = 10) -> str:
     memory_block = _format_memory(history)
 
     controller = (
-        f"{SYSTEM_PROMPT}\n\n"
+        f"{build_system_prompt()}\n\n"
         f"Conversation so far:\n{memory_block}\n\n"
         f"USER: {prompt}\n"
         f"Thought:"
@@ -1,13 +1,28 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 
+from agent.long_memory.warmup import readiness, start_warmup
+from agent.memory_adaptor import forget_session
 from agent.react.controller import run_react
 from memory.short_memory import save_message, get_recent_messages, clear_memory
 from models.llm import run_local_model, run_tool_request
 from models.stream_llm import stream_local_model
 from schemas.memory import MemorySaveRequest, MemoryQueryRequest
 from schemas.prompt import Prompt
+from tools.executor import tool_stats
+from tools.memo import cache_stats
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the embedding model and indexes in the background; the server starts accepting at once.
+    start_warmup()
+    yield
+
 
-api = FastAPI(title="Local AI Agent")
+api = FastAPI(title="Local AI Agent", lifespan=lifespan)
 
 
 @api.get("/")
@@ -15,6 +30,13 @@ def read_root():
     return "API Server is live"
 
 
+# 🔥 Readiness: 200 once the start-up warm-up has finished, 503 while it runs
+@api.get("/ready")
+def get_ready():
+    status = readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
 @api.post("/ask")
 def ask_agent(request: Prompt):
     reply = run_local_model(request.prompt)
@@ -33,6 +55,12 @@ def ask_agent_react(request: Prompt):
     return {"response": answer}
 
 
+# ⏱️ Per-tool latency histograms, timeout counts and cache hit rates
+@api.get("/tools/stats")
+def get_tool_stats():
+    return {"tools": tool_stats(), "cache": cache_stats()}
+
+
 # 🧠 Save message
 @api.post("/memory/save")
 def save_to_memory(req: MemorySaveRequest):
@@ -51,4 +79,5 @@ def get_recent(req: MemoryQueryRequest):
 @api.delete("/memory/clear/{session_id}")
 def clear_session(session_id: str):
     clear_memory(session_id)
+    forget_session(session_id)
     return {"status": f"memory cleared for session {session_id}"}
@@ -25,14 +25,15 @@ def init_memory_db():
         conn.commit()
 
 # Save message
-def save_message(session_id: str, role: str, content: str):
-    """Insert a message into short-term memory."""
+def save_message(session_id: str, role: str, content: str) -> int:
+    """Insert a message into short-term memory; returns its row id."""
     with sqlite3.connect(DB_PATH) as conn:
-        conn.execute(
+        cur = conn.execute(
             "INSERT INTO memory (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
             (session_id, role, content, datetime.now(UTC)),
         )
         conn.commit()
+        return cur.lastrowid
 
 def get_recent_messages(session_id: str, limit: int = 5) -> List[Tuple[str, str]]:
     """Fetch the most recent N messages for a session."""
@@ -49,6 +50,21 @@ def get_recent_messages(session_id: str, limit: int = 5) -> List[Tuple[str, str]
         messages = cursor.fetchall()[::-1]  # reverse to chronological
     return messages
 
+def get_recent_messages_with_ids(session_id: str, limit: int = 5) -> List[Tuple[int, str, str]]:
+    """Like get_recent_messages, but (id, role, content) so callers can de-duplicate."""
+    with sqlite3.connect(DB_PATH) as conn:
+        cursor = conn.execute(
+            """
+            SELECT id, role, content FROM memory
+            WHERE session_id = ?
+            ORDER BY id DESC
+            LIMIT ?
+            """,
+            (session_id, limit),
+        )
+        messages = cursor.fetchall()[::-1]  # reverse to chronological
+    return messages
+
 def clear_memory(session_id: str):
     """Remove all messages for a session."""
     with sqlite3.connect(DB_PATH) as conn:
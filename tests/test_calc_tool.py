@@ -0,0 +1,124 @@
+# tests/test_calc_tool.py
+import pytest
+
+from tools.calc_tool import (MAX_EXPR_LEN, MAX_LIST_LEN, MAX_NDIGITS, MAX_NODES, CalcError, calculate,
+                             evaluate)
+
+
+@pytest.mark.parametrize("expr, expected", [
+    ("(12 + 8) * 3 / 4", 15.0),
+    ("2^10", 1024),            # ^ is read as power, not xor
+    ("2 ^ 3 ^ 2", 512),        # right-associative like **
+    ("-3 ** 2", -9),
+    ("7 // 2 + 7 % 2", 4),
+    ("sqrt(16) + abs(-2)", 6.0),
+    ("round(3.14159, 2)", 3.14),
+    ("round(1234.5, -2)", 1200.0),
+    ("log(8, 2)", 3.0),
+    ("pi > 3", None),          # comparisons are not whitelisted
+])
+def test_arithmetic(expr, expected):
+    if expected is None:
+        with pytest.raises(CalcError):
+            evaluate(expr)
+    else:
+        assert evaluate(expr) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("expr, message", [
+    ("__import__('os').system('true')", "only plain calls"),
+    ("__import__('os')", "unsupported literal"),
+    ("open('x')", "unsupported literal"),
+    ("exit()", "unknown function 'exit'"),
+    ("(1).real", "'Attribute' is not allowed"),
+    ("().__class__", "'Attribute' is not allowed"),
+    ("(lambda: 1)()", "only plain calls"),
+    ("[x for x in [1]]", "'ListComp' is not allowed"),
+    ("sqrt(x=4)", "only plain calls"),
+    ("os", "unknown name 'os'"),
+    ("True + 1", "unsupported literal"),
+    ("'a' * 3", "unsupported literal"),
+    ("1 << 100", "'LShift' is not allowed"),
+])
+def test_rejects_anything_off_the_whitelist(expr, message):
+    with pytest.raises(CalcError, match=message):
+        evaluate(expr)
+
+
+def test_expression_length_limit():
+    evaluate("0" * MAX_EXPR_LEN)
+    with pytest.raises(CalcError, match="longer than"):
+        evaluate("0" * (MAX_EXPR_LEN + 1))
+
+
+def test_node_limit():
+    expr = "+".join(["1"] * 100)
+    assert len(expr) <= MAX_EXPR_LEN
+    with pytest.raises(CalcError, match=f"limit {MAX_NODES}"):
+        evaluate(expr)
+
+
+def test_exponent_and_pow_bit_limits():
+    assert evaluate("2 ** 100") == 2 ** 100
+    with pytest.raises(CalcError, match="exceeds the limit"):
+        evaluate("2 ** 101")
+    with pytest.raises(CalcError, match="too large"):
+        evaluate("(10 ** 40) ** 100")
+    with pytest.raises(CalcError, match="not a real number"):
+        evaluate("(-8) ** 0.5")
+
+
+def test_round_digits_limit():
+    assert evaluate(f"round(1.5, {MAX_NDIGITS})") == 1.5
+    for digits in (f"{MAX_NDIGITS + 1}", f"-{MAX_NDIGITS + 1}", "-10**7", "1.5"):
+        with pytest.raises(CalcError, match="digits must be an integer"):
+            evaluate(f"round(1, {digits})")
+
+
+def test_function_arity():
+    with pytest.raises(CalcError, match="takes 1 argument"):
+        evaluate("sqrt(4, 2)")
+    with pytest.raises(CalcError, match="takes 1 to 2 argument"):
+        evaluate("round(1, 2, 3)")
+    with pytest.raises(CalcError, match="only the first argument"):
+        evaluate("round(1, [2])")
+
+
+def test_list_size_limit():
+    assert len(evaluate("x * 2", {"x": list(range(MAX_LIST_LEN))})) == MAX_LIST_LEN
+    with pytest.raises(CalcError, match=f"more than {MAX_LIST_LEN}"):
+        evaluate("x * 2", {"x": list(range(MAX_LIST_LEN + 1))})
+
+
+def test_vectorized_lists():
+    assert evaluate("[1, 2, 3] * 2 + 1") == [3, 5, 7]
+    assert evaluate("[1, 2] + [10, 20]") == [11, 22]
+    assert evaluate("10 - [1, 2]") == [9, 8]
+    assert evaluate("-[1, 2]") == [-1, -2]
+    assert evaluate("sum(price * qty)", {"price": [2.5, 4], "qty": [2, 3]}) == 17.0
+    assert evaluate("round([1.234, 5.678], 1)") == [1.2, 5.7]
+    assert evaluate("mean(x)", {"x": [1, 2, 3, 4]}) == 2.5
+    assert evaluate("max(1, 5, 3)") == 5
+    with pytest.raises(CalcError, match=r"list lengths differ \(2 vs 3\)"):
+        evaluate("[1, 2] + [1, 2, 3]")
+    with pytest.raises(CalcError, match="nested lists"):
+        evaluate("[[1], [2]]")
+    with pytest.raises(CalcError, match="of nothing"):
+        evaluate("sum([])")
+
+
+def test_variables_are_checked():
+    assert evaluate("x + 1", {"x": "1,234"}) == 1235.0
+    with pytest.raises(CalcError, match="ambiguous comma"):
+        evaluate("x + 1", {"x": "1,5"})
+    with pytest.raises(CalcError, match="bad variable name"):
+        evaluate("1", {"not a name": 1})
+    with pytest.raises(CalcError, match="must be numeric"):
+        evaluate("x", {"x": True})
+
+
+def test_calculate_reports_tool_errors():
+    assert calculate("1 / 0") == "[tool_error] calculate: division by zero"
+    assert calculate("").startswith("[tool_error] calculate: empty expression")
+    assert calculate("1e300 * 1e300").startswith("[tool_error] calculate: result overflowed")
+    assert calculate("2 +").startswith("[tool_error] calculate: syntax error")
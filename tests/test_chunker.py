@@ -0,0 +1,40 @@
+# tests/test_chunker.py
+from agent.long_memory.chunker import approx_tokens, chunk_stream
+
+
+def test_no_chunk_exceeds_max_tokens():
+    for source in (b"a " * 1000, b"word " * 5000 + b".", b"!" * 300, b"x" * 10000 + b" end."):
+        chunks = list(chunk_stream(source, max_tokens=5, overlap_tokens=1))
+        assert chunks
+        assert max(approx_tokens(c.text) for c in chunks) <= 5
+
+
+def test_spans_point_back_into_the_source():
+    source = "First sentence here. Second one follows! A third? " * 20
+    raw = source.encode("utf-8")
+    for c in chunk_stream(raw, max_tokens=12, overlap_tokens=4):
+        assert " ".join(raw[c.start:c.end].decode("utf-8").split()) == c.text
+
+
+def test_resume_keeps_the_overlap():
+    raw = b" ".join(f"Sentence number {i} ends here.".encode() for i in range(60))
+    full = list(chunk_stream(raw, max_tokens=20, overlap_tokens=6))
+    cut = full[3]
+    assert cut.resume < cut.end  # the next chunk shares trailing sentences with this one
+    resumed = list(chunk_stream(raw[cut.resume:], max_tokens=20, overlap_tokens=6, base=cut.resume))
+    assert [c.text for c in resumed] == [c.text for c in full[4:]]
+
+
+def test_long_unbroken_run_is_cut_with_few_tokenizer_calls():
+    calls = []
+
+    def counting(text):
+        calls.append(len(text))
+        return approx_tokens(text)
+
+    raw = b"+/" * 10000  # base64-like: every character is a token
+    chunks = list(chunk_stream(raw, max_tokens=50, overlap_tokens=0, count_tokens=counting))
+    assert max(approx_tokens(c.text) for c in chunks) <= 50
+    assert "".join(c.text for c in chunks) == raw.decode()
+    assert all(raw[c.start:c.end].decode() == c.text for c in chunks)
+    assert sum(calls) < 50 * len(raw)  # one call per character would be ~len(raw)**2 / 2
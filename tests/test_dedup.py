@@ -0,0 +1,61 @@
+# tests/test_dedup.py
+import os
+
+from agent.long_memory.dedup import DEDUP_FILE, NearDuplicateFilter
+
+BASE = "the quick brown fox jumps over the lazy dog near the quiet river bank at dawn while birds sing"
+NEAR = BASE + " loudly"
+OTHER = "completely unrelated text about compilers register allocation and instruction scheduling passes"
+
+
+def _meta(i):
+    return {"doc_id": f"d{i}", "chunk_id": i}
+
+
+def test_offer_keeps_first_copy_and_folds_near_duplicates():
+    dd = NearDuplicateFilter(threshold=0.7)
+    first = _meta(0)
+    assert dd.offer(BASE, first) is None
+    assert dd.offer(OTHER, _meta(1)) is None
+    assert dd.offer(BASE.upper(), _meta(2)) is first  # exact after normalisation
+    assert dd.offer(NEAR, _meta(3)) is first
+    assert first["dups"] == [{"doc_id": "d2", "chunk_id": 2}, {"doc_id": "d3", "chunk_id": 3}]
+    assert dd.report()["exact_duplicates"] == 1
+
+
+def test_saved_table_restores_representatives(tmp_path):
+    dd = NearDuplicateFilter(threshold=0.7)
+    metas = [_meta(0), _meta(1)]
+    dd.offer(BASE, metas[0])
+    dd.offer(OTHER, metas[1])
+    dd.save(str(tmp_path))
+
+    resumed = NearDuplicateFilter(threshold=0.7)
+    assert resumed.load(str(tmp_path), metas) == 2
+    assert resumed.offer(NEAR, _meta(5)) is metas[0]
+    assert resumed.offer(OTHER, _meta(6)) is metas[1]
+    assert resumed.offer("a brand new chunk of text about gardening tomatoes", _meta(7)) is None
+    resumed.save(str(tmp_path))  # appends only the new representative
+
+    again = NearDuplicateFilter(threshold=0.7)
+    assert again.load(str(tmp_path), metas + [_meta(7)]) == 3
+
+
+def test_load_cuts_rows_past_the_committed_store(tmp_path):
+    dd = NearDuplicateFilter()
+    for i, text in enumerate((BASE, OTHER, "a third distinct chunk about sailing boats in the harbour")):
+        dd.offer(text, _meta(i))
+    dd.save(str(tmp_path))
+    size = os.path.getsize(tmp_path / DEDUP_FILE)
+
+    resumed = NearDuplicateFilter()
+    assert resumed.load(str(tmp_path), [_meta(0)]) == 1
+    assert os.path.getsize(tmp_path / DEDUP_FILE) < size
+    assert resumed.offer(OTHER, _meta(9)) is None  # row 1 was rolled back with the store
+
+
+def test_other_minhash_settings_start_over(tmp_path):
+    dd = NearDuplicateFilter()
+    dd.offer(BASE, _meta(0))
+    dd.save(str(tmp_path))
+    assert NearDuplicateFilter(num_perm=32, bands=4).load(str(tmp_path), [_meta(0)]) == 0
@@ -0,0 +1,76 @@
+# tests/test_ollama_embeddings.py
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from agent.long_memory import embeddings
+
+
+class _StubOllama(BaseHTTPRequestHandler):
+    """/api/embed stand-in: embeds "t<i>" as an unnormalized vector encoding i."""
+
+    protocol_version = "HTTP/1.1"
+    batches = []
+    reply = None  # override the response body: (status, dict)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        assert self.path == "/api/embed"
+        type(self).batches.append(list(body["input"]))
+        if type(self).reply is not None:
+            status, data = type(self).reply
+        else:
+            status = 200
+            data = {"embeddings": [[float(t[1:]) + 1.0, 3.0, 0.0, 4.0] for t in body["input"]]}
+        out = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _StubOllama.batches = []
+    _StubOllama.reply = None
+    monkeypatch.setattr(embeddings, "OLLAMA_HOST", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(embeddings, "OLLAMA_EMBED_BATCH", 10)
+    yield _StubOllama
+    server.shutdown()
+    server.server_close()
+
+
+def test_batches_preserve_order_and_normalize(ollama):
+    texts = [f"t{i}" for i in range(25)]
+    vecs = embeddings.embed_texts(texts, "nomic")
+    assert vecs.shape == (25, 4) and vecs.dtype == np.float32
+    assert sorted(len(b) for b in ollama.batches) == [5, 10, 10]
+    np.testing.assert_allclose(np.linalg.norm(vecs, axis=1), 1.0, rtol=1e-5)
+    # row i came from text i, whatever order the batches finished in
+    raw = np.array([[i + 1.0, 3.0, 0.0, 4.0] for i in range(25)], dtype=np.float32)
+    np.testing.assert_allclose(vecs, raw / np.linalg.norm(raw, axis=1, keepdims=True), rtol=1e-5)
+
+
+def test_empty_input_keeps_the_dimension(ollama):
+    assert embeddings.embed_texts([], "nomic").shape == (0, 768)
+    assert ollama.batches == []
+
+
+@pytest.mark.parametrize("reply, message", [
+    ((200, {"error": "model 'nomic-embed-text' not found"}), "Ollama error"),
+    ((500, {"error": "boom"}), "HTTP error"),
+    ((200, {"embeddings": [[1.0, 0.0]]}), "returned 1 embeddings for 3 inputs"),
+])
+def test_errors_surface_as_runtime_errors(ollama, reply, message):
+    ollama.reply = reply
+    with pytest.raises(RuntimeError, match=message):
+        embeddings.embed_texts(["t0", "t1", "t2"], "nomic")
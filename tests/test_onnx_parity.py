@@ -0,0 +1,16 @@
+# tests/test_onnx_parity.py
+import os
+
+import pytest
+
+from agent.long_memory.onnx_backend import _PROBES, MODEL_FILE, PARITY_TOLERANCE, model_dir, parity
+
+
+def test_int8_onnx_matches_torch_within_tolerance():
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("tokenizers")
+    pytest.importorskip("sentence_transformers")
+    if not os.path.exists(os.path.join(model_dir(), MODEL_FILE)):
+        pytest.skip(f"no exported model in {model_dir()}; run `python -m agent.long_memory.onnx_backend export`")
+    assert len(_PROBES) >= 5
+    assert parity() >= PARITY_TOLERANCE
@@ -0,0 +1,120 @@
+# tests/test_parallel.py
+import threading
+import time
+
+from agent.react.parallel import (MAX_CALLS, batch_key, batch_result, format_observation, is_batch, parse_calls,
+                                  run_calls)
+
+
+class StubTools:
+    """Stands in for tools.registry.run_tool: records calls and the waves they ran in."""
+
+    def __init__(self, delay: float = 0.0, fail=()):
+        self.delay = delay
+        self.fail = set(fail)
+        self.calls = []
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, tool, args):
+        with self._lock:
+            self.calls.append((tool, args))
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.delay)
+        with self._lock:
+            self.running -= 1
+        if tool in self.fail:
+            return f"[tool_error] {tool} failed"
+        if tool == "add":
+            return float(args["a"]) + float(args["b"])
+        if tool == "upper":
+            return str(args["text"]).upper()
+        return f"{tool}:{args}"
+
+
+def _run(data, tools):
+    return run_calls(parse_calls(data), tools)
+
+
+def test_is_batch():
+    assert is_batch({"calls": []})
+    assert not is_batch({"tool": "add", "args": {}})
+    assert not is_batch({"calls": "nope"})
+
+
+def test_independent_calls_share_one_wave():
+    tools = StubTools(delay=0.2)
+    t0 = time.perf_counter()
+    calls = _run({"calls": [{"tool": "upper", "args": {"text": "a"}},
+                            {"tool": "add", "args": {"a": 1, "b": 2}},
+                            {"tool": "upper", "args": {"text": "b"}}]}, tools)
+    assert time.perf_counter() - t0 < 0.45
+    assert tools.peak == 3
+    assert [c.id for c in calls] == ["c1", "c2", "c3"]
+    assert [c.result for c in calls] == ["A", 3.0, "B"]
+
+
+def test_after_and_refs_make_waves_and_substitute_results():
+    tools = StubTools(delay=0.05)
+    calls = _run({"calls": [
+        {"id": "sum", "tool": "add", "args": {"a": 2, "b": 3}},
+        {"id": "twice", "tool": "add", "args": {"a": "<sum>", "b": "<sum>"}},  # implicit dependency
+        {"id": "label", "tool": "upper", "args": {"text": "total <twice>"}},
+        {"id": "last", "tool": "echo", "args": {}, "after": ["label"]},
+    ]}, tools)
+    by_id = {c.id: c for c in calls}
+    assert by_id["twice"].after == ["sum"]
+    assert by_id["twice"].args == {"a": 5.0, "b": 5.0}  # a whole "<id>" keeps the result's type
+    assert by_id["label"].result == "TOTAL 10.0"        # inside a string it is formatted
+    assert [t for t, _ in tools.calls] == ["add", "add", "upper", "echo"]
+    assert tools.peak == 1
+    assert batch_result(calls) == "echo:{}"
+
+
+def test_unknown_id_and_cycle_errors():
+    calls = _run({"calls": [
+        {"id": "ok", "tool": "echo"},
+        {"id": "lost", "tool": "echo", "after": ["ghost"]},
+        {"id": "x", "tool": "echo", "after": ["y"]},
+        {"id": "y", "tool": "echo", "after": ["x"]},
+    ]}, StubTools())
+    by_id = {c.id: c.result for c in calls}
+    assert by_id["ok"] == "echo:{}"
+    assert by_id["lost"] == "[tool_error] lost waits on ghost (unknown id)"
+    assert by_id["x"] == "[tool_error] x waits on y (circular dependency)"
+    assert by_id["y"] == "[tool_error] y waits on x (circular dependency)"
+
+
+def test_failed_call_skips_its_dependents_only():
+    tools = StubTools(fail={"boom"})
+    calls = _run({"calls": [
+        {"id": "a", "tool": "boom"},
+        {"id": "b", "tool": "upper", "args": {"text": "fine"}},
+        {"id": "c", "tool": "upper", "args": {"text": "<a>"}},
+        {"id": "d", "tool": "echo", "after": ["c"]},
+    ]}, tools)
+    by_id = {c.id: c.result for c in calls}
+    assert by_id["a"] == "[tool_error] boom failed"
+    assert by_id["b"] == "FINE"
+    assert by_id["c"] == "[tool_error] c skipped: a failed"
+    assert by_id["d"] == "[tool_error] d skipped: c failed"
+    assert sorted(t for t, _ in tools.calls) == ["boom", "upper"]  # c and d never ran
+    assert "[c] upper -> [tool_error] c skipped: a failed" in format_observation(calls)
+
+
+def test_ids_are_unique_and_batches_are_capped():
+    calls = parse_calls({"calls": [{"id": "c2", "tool": "a"}, {"id": "c2", "tool": "b"}, {"tool": "c"}]})
+    assert [c.id for c in calls] == ["c2", "c1", "c3"]
+    calls = parse_calls({"calls": [{"tool": "a"}, {"id": "c1", "tool": "b"}]})
+    assert [c.id for c in calls] == ["c2", "c1"]
+    assert len(parse_calls({"calls": [{"tool": "t"}] * (MAX_CALLS + 3)})) == MAX_CALLS
+    assert parse_calls({"calls": ["junk", {"tool": "t"}]})[0].tool == "t"
+
+
+def test_batch_key_is_order_sensitive_and_stable():
+    a = parse_calls({"calls": [{"tool": "add", "args": {"a": 1, "b": 2}}, {"tool": "upper", "args": {"text": "x"}}]})
+    b = parse_calls({"calls": [{"tool": "add", "args": {"b": 2, "a": 1}}, {"tool": "upper", "args": {"text": "x"}}]})
+    assert batch_key(a) == batch_key(b)
+    assert batch_key(a) != batch_key(list(reversed(a)))
@@ -0,0 +1,138 @@
+# tests/test_registry.py
+from typing import Optional
+
+import pytest
+
+from tools.registry import ArgError, ToolSpec, _to_bool, _to_float, _to_int, _to_str, resolve_tool, run_tool
+
+
+def _add(a: float, b: float) -> float:
+    return a + b
+
+
+def _search(query: str, k: int = 5, exact: Optional[bool] = None) -> str:
+    return f"{query}:{k}:{exact}"
+
+
+ADD = ToolSpec.from_function("add", _add)
+SEARCH = ToolSpec.from_function("search", _search)
+
+
+@pytest.mark.parametrize("value, expected", [
+    (3, 3.0),
+    (2.5, 2.5),
+    ("10", 10.0),
+    ("  -4.5 ", -4.5),
+    ("1,234", 1234.0),
+    ("1,234.56", 1234.56),
+    ("-12,345,678", -12345678.0),
+    ("1_000", 1000.0),
+    ("1e3", 1000.0),
+    ("1,5", ArgError),        # a decimal comma is ambiguous, never 15
+    ("12,34", ArgError),
+    ("1,2345", ArgError),
+    (",123", ArgError),
+    ("1,234,", ArgError),
+    ("ten", ArgError),
+    ("", ArgError),
+    (True, ArgError),
+    (False, ArgError),
+    (None, ArgError),
+    ([1], ArgError),
+])
+def test_to_float(value, expected):
+    if expected is ArgError:
+        with pytest.raises(ArgError):
+            _to_float(value)
+    else:
+        assert _to_float(value) == expected
+
+
+@pytest.mark.parametrize("coerce, value, expected", [
+    (_to_int, "7", 7),
+    (_to_int, 7.0, 7),
+    (_to_int, "2,000", 2000),
+    (_to_int, 7.5, ArgError),
+    (_to_int, True, ArgError),
+    (_to_bool, True, True),
+    (_to_bool, "yes", True),
+    (_to_bool, "OFF", False),
+    (_to_bool, 0, False),
+    (_to_bool, "maybe", ArgError),
+    (_to_str, "hi", "hi"),
+    (_to_str, 5.0, "5"),
+    (_to_str, 5.5, "5.5"),
+    (_to_str, {"a": 1}, '{"a": 1}'),
+    (_to_str, ["x"], '["x"]'),
+])
+def test_coercers(coerce, value, expected):
+    if expected is ArgError:
+        with pytest.raises(ArgError):
+            coerce(value)
+    else:
+        assert coerce(value) == expected
+
+
+@pytest.mark.parametrize("spec, args, expected", [
+    # exact names, case variants and synonyms
+    (ADD, {"a": 1, "b": 2}, {"a": 1.0, "b": 2.0}),
+    (ADD, {"A": "1", "B": "2"}, {"a": 1.0, "b": 2.0}),
+    (ADD, {"x": 10, "y": 5}, {"a": 10.0, "b": 5.0}),
+    (ADD, {"num1": 1, "num2": 2}, {"a": 1.0, "b": 2.0}),
+    (ADD, {"dividend": 9, "divisor": 3}, {"a": 9.0, "b": 3.0}),
+    (SEARCH, {"q": "cars", "top_k": "3"}, {"query": "cars", "k": 3}),
+    (SEARCH, {"question": "cars", "exact": "true"}, {"query": "cars", "exact": True}),
+    # positional lists and a bare value for the single required param
+    (ADD, [1, "2"], {"a": 1.0, "b": 2.0}),
+    (ADD, (1,), None),  # still missing b
+    (SEARCH, ["cars", 2], {"query": "cars", "k": 2}),
+    (SEARCH, "cars", {"query": "cars"}),
+    # unknown keys fill exactly the missing params, in order
+    (ADD, {"foo": 1, "bar": 2}, {"a": 1.0, "b": 2.0}),
+    (ADD, {"a": 1, "foo": 2}, {"a": 1.0, "b": 2.0}),
+    # extra keys beyond the signature are dropped once everything is bound
+    (ADD, {"a": 1, "b": 2, "c": 3}, {"a": 1.0, "b": 2.0}),
+    # a synonym never overrides the real name: the second value is a leftover
+    (ADD, {"a": 1, "x": 2}, {"a": 1.0, "b": 2.0}),
+])
+def test_bind_repairs(spec, args, expected):
+    if expected is None:
+        with pytest.raises(ArgError, match="missing b"):
+            spec.bind(args)
+    else:
+        assert spec.bind(args) == expected
+
+
+@pytest.mark.parametrize("spec, args, message", [
+    (ADD, {"a": 1}, "missing b; expected add"),
+    (ADD, {}, "missing a, b"),
+    (ADD, None, "missing a, b"),
+    (ADD, {"a": 1, "foo": 2, "bar": 3}, "missing b"),  # leftovers do not match the missing count
+    (ADD, [1, 2, 3], "takes 2 args, got 3"),
+    (ADD, 5, "expected an object like add"),  # two required params: a bare value is ambiguous
+    (ADD, {"a": "1,5", "b": 1}, "a: ambiguous comma"),
+    (ADD, {"a": True, "b": 1}, "a: expected a number"),
+    (SEARCH, {"query": "x", "k": 2.5}, "k: expected an integer"),
+])
+def test_bind_errors(spec, args, message):
+    with pytest.raises(ArgError, match=message):
+        spec.bind(args)
+
+
+def test_synonym_never_shadows_a_real_parameter():
+    def tool(query: str, text: str) -> str:
+        return query + text
+
+    spec = ToolSpec.from_function("tool", tool)
+    # "text" is a synonym of "query" but also a real parameter here
+    assert spec.bind({"query": "a", "text": "b"}) == {"query": "a", "text": "b"}
+
+
+def test_run_tool_reports_precise_errors():
+    assert run_tool("add_numbers", {"x": "2", "y": 3}) == 5.0
+    assert run_tool("ADD_NUMBERS", [2, 3]) == 5.0
+    assert run_tool("add_numbers", {"a": "1,5", "b": 2}).startswith("[tool_error] Bad args for 'add_numbers': a:")
+    assert run_tool("add_numbers", {"a": 1}).startswith("[tool_error] Bad args for 'add_numbers': missing b")
+    assert run_tool("nope", {}).startswith("[tool_error] Unknown tool 'nope'")
+    assert run_tool("FINAL ANSWER", {}) == "[tool_error] 'FINAL ANSWER' is not a callable tool"
+    assert resolve_tool("divide_by") == "divide"
@@ -0,0 +1,251 @@
+# tools/calc_tool.py
+import ast
+import math
+import operator
+import re
+from typing import Any, Callable, Dict, List, Optional, Union
+
+# -----------------------------
+# Safe arithmetic evaluator
+# -----------------------------
+# Evaluates a whole arithmetic expression in one tool call by walking its AST
+# against a whitelist (numbers, + - * / // % **, unary +/-, parentheses, a
+# few math functions, named variables; ^ is read as **). There is no eval().
+# Length, node count, exponent, round() digits and list-size limits keep a
+# hostile expression from burning CPU; the registry also runs it in the
+# process pool, so a call that still overruns its deadline is killed.
+#
+# Lists evaluate element-wise (scalars broadcast), so one call can work over
+# a series; aggregate functions reduce a list to a number:
+#   calculate("(12 + 8) * 3 / 4")                          -> 15.0
+#   calculate("[1, 2, 3] * 2 + 1")                         -> [3, 5, 7]
+#   calculate("sum(price * qty)", {"price": [2.5, 4], "qty": [2, 3]})  -> 17.0
+#
+
+MAX_EXPR_LEN = 300
+MAX_NODES = 200
+MAX_EXPONENT = 100
+MAX_POW_BITS = 4096  # integer results of ** beyond this many bits are refused
+MAX_LIST_LEN = 1000
+_THOUSANDS = re.compile(r"^[+-]?\d{1,3}(,\d{3})+(\.\d+)?$")  # "1,234.5", not "1,5"
+MAX_NDIGITS = 15  # round(x, n): |n| beyond this only burns CPU (round(1, -10**7) takes seconds)
+
+Number = Union[int, float]
+Value = Union[Number, List[Number]]
+
+_BINOPS: Dict[type, Callable[[Number, Number], Number]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+
+_UNARY: Dict[type, Callable[[Number], Number]] = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+# Applied to each element of a list.
+_ELEMENTWISE: Dict[str, Callable[..., Number]] = {
+    "abs": abs,
+    "round": round,
+    "sqrt": math.sqrt,
+    "floor": math.floor,
+    "ceil": math.ceil,
+    "log": math.log,
+    "log10": math.log10,
+    "exp": math.exp,
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+}
+
+# (min, max) argument count; anything not listed takes exactly one.
+_ARITY: Dict[str, tuple] = {"round": (1, 2), "log": (1, 2)}
+
+# Reduce a list (or their arguments) to one number.
+_AGGREGATE: Dict[str, Callable[[List[Number]], Number]] = {
+    "sum": math.fsum,
+    "min": min,
+    "max": max,
+    "mean": lambda xs: math.fsum(xs) / len(xs),
+    "len": len,
+}
+
+_CONSTANTS = {"pi": math.pi, "e": math.e}
+
+
+class CalcError(ValueError):
+    pass
+
+
+def _pow(base: Number, exp: Number) -> Number:
+    if abs(exp) > MAX_EXPONENT:
+        raise CalcError(f"exponent {exp} exceeds the limit of {MAX_EXPONENT}")
+    if isinstance(base, int) and isinstance(exp, int) and exp > 0 and abs(base) > 1:
+        if exp * abs(base).bit_length() > MAX_POW_BITS:
+            raise CalcError(f"{base} ** {exp} is too large")
+    result = base ** exp
+    if isinstance(result, complex):
+        raise CalcError(f"{base} ** {exp} is not a real number")
+    return result
+
+
+def _broadcast(fn: Callable[[Number, Number], Number], left: Value, right: Value) -> Value:
+    if isinstance(left, list) and isinstance(right, list):
+        if len(left) != len(right):
+            raise CalcError(f"list lengths differ ({len(left)} vs {len(right)})")
+        return [fn(a, b) for a, b in zip(left, right)]
+    if isinstance(left, list):
+        return [fn(a, right) for a in left]
+    if isinstance(right, list):
+        return [fn(left, b) for b in right]
+    return fn(left, right)
+
+
+class _Evaluator:
+    def __init__(self, variables: Dict[str, Value]):
+        self.variables = variables
+
+    def eval(self, node: ast.AST) -> Value:
+        method = getattr(self, f"_{type(node).__name__}", None)
+        if method is None:
+            raise CalcError(f"'{type(node).__name__}' is not allowed")
+        return method(node)
+
+    def _Expression(self, node: ast.Expression) -> Value:
+        return self.eval(node.body)
+
+    def _Constant(self, node: ast.Constant) -> Value:
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise CalcError(f"unsupported literal {node.value!r}")
+        return node.value
+
+    def _Name(self, node: ast.Name) -> Value:
+        if node.id in self.variables:
+            return self.variables[node.id]
+        if node.id in _CONSTANTS:
+            return _CONSTANTS[node.id]
+        raise CalcError(f"unknown name '{node.id}'")
+
+    def _List(self, node: Union[ast.List, ast.Tuple]) -> Value:
+        items = [self.eval(elt) for elt in node.elts]
+        if any(isinstance(x, list) for x in items):
+            raise CalcError("nested lists are not supported")
+        return items
+
+    _Tuple = _List
+
+    def _UnaryOp(self, node: ast.UnaryOp) -> Value:
+        fn = _UNARY.get(type(node.op))
+        if fn is None:
+            raise CalcError(f"operator '{type(node.op).__name__}' is not allowed")
+        operand = self.eval(node.operand)
+        return [fn(x) for x in operand] if isinstance(operand, list) else fn(operand)
+
+    def _BinOp(self, node: ast.BinOp) -> Value:
+        op = type(node.op)
+        fn = _pow if op is ast.Pow else _BINOPS.get(op)
+        if fn is None:
+            raise CalcError(f"operator '{op.__name__}' is not allowed")
+        return _broadcast(fn, self.eval(node.left), self.eval(node.right))
+
+    def _Call(self, node: ast.Call) -> Value:
+        if not isinstance(node.func, ast.Name) or node.keywords:
+            raise CalcError("only plain calls like sqrt(x) are allowed")
+        name = node.func.id
+        args = [self.eval(a) for a in node.args]
+        if name in _AGGREGATE:
+            # sum([1, 2]) or sum(1, 2)
+            values = args[0] if len(args) == 1 and isinstance(args[0], list) else args
+            if any(isinstance(v, list) for v in values):
+                raise CalcError(f"{name}() takes one list or several numbers")
+            if not values:
+                raise CalcError(f"{name}() of nothing")
+            return _AGGREGATE[name](values)
+        if name in _ELEMENTWISE:
+            fn = _ELEMENTWISE[name]
+            rest = _check_args(name, args)
+            if isinstance(args[0], list):
+                return [fn(x, *rest) for x in args[0]]
+            return fn(args[0], *rest)
+        raise CalcError(f"unknown function '{name}'")
+
+
+def _check_args(name: str, args: List[Value]) -> List[Number]:
+    """Validate an element-wise call's arguments; returns those after the first."""
+    lo, hi = _ARITY.get(name, (1, 1))
+    if not lo <= len(args) <= hi:
+        expected = f"{lo}" if lo == hi else f"{lo} to {hi}"
+        raise CalcError(f"{name}() takes {expected} argument(s), got {len(args)}")
+    rest = args[1:]
+    if any(isinstance(a, list) for a in rest):
+        raise CalcError(f"only the first argument of {name}() may be a list")
+    if name == "round" and rest:
+        ndigits = rest[0]
+        if isinstance(ndigits, float) and ndigits.is_integer():
+            ndigits = int(ndigits)
+        if not isinstance(ndigits, int) or not -MAX_NDIGITS <= ndigits <= MAX_NDIGITS:
+            raise CalcError(f"round() digits must be an integer in [-{MAX_NDIGITS}, {MAX_NDIGITS}]")
+        rest = [ndigits]
+    return rest
+
+
+def _check_variables(variables: Optional[dict]) -> Dict[str, Value]:
+    out: Dict[str, Value] = {}
+    for name, value in (variables or {}).items():
+        if not str(name).isidentifier():
+            raise CalcError(f"bad variable name {name!r}")
+        if isinstance(value, (list, tuple)):
+            if len(value) > MAX_LIST_LEN:
+                raise CalcError(f"'{name}' has more than {MAX_LIST_LEN} values")
+            out[str(name)] = [_number(v, name) for v in value]
+        else:
+            out[str(name)] = _number(value, name)
+    return out
+
+
+def _number(value: Any, name: str) -> Number:
+    if isinstance(value, bool):
+        raise CalcError(f"'{name}' must be numeric")
+    if isinstance(value, (int, float)):
+        return value
+    s = str(value).strip()
+    if "," in s:
+        if not _THOUSANDS.match(s):
+            raise CalcError(f"'{name}' has an ambiguous comma ({value!r}); write 1234.5 or 1,234.5")
+        s = s.replace(",", "")
+    try:
+        return float(s)
+    except ValueError:
+        raise CalcError(f"'{name}' must be numeric, got {value!r}") from None
+
+
+def evaluate(expression: str, variables: Optional[dict] = None) -> Value:
+    """Evaluate `expression` under the whitelist; raises CalcError (a ValueError) on anything else."""
+    expr = (expression or "").strip().replace("^", "**").replace("×", "*").replace("÷", "/")
+    if not expr:
+        raise CalcError("empty expression")
+    if len(expr) > MAX_EXPR_LEN:
+        raise CalcError(f"expression longer than {MAX_EXPR_LEN} characters")
+    try:
+        tree = ast.parse(expr, mode="eval")
+    except SyntaxError as e:
+        raise CalcError(f"syntax error at column {e.offset}") from None
+    nodes = sum(1 for _ in ast.walk(tree))
+    if nodes > MAX_NODES:
+        raise CalcError(f"expression has {nodes} nodes (limit {MAX_NODES})")
+    result = _Evaluator(_check_variables(variables)).eval(tree)
+    if isinstance(result, list) and len(result) > MAX_LIST_LEN:
+        raise CalcError(f"result has more than {MAX_LIST_LEN} values")
+    if any(isinstance(x, float) and not math.isfinite(x) for x in (result if isinstance(result, list) else [result])):
+        raise CalcError("result overflowed (not a finite number)")
+    return result
+
+
+def calculate(expression: str, variables: Optional[dict] = None) -> Value | str:
+    try:
+        return evaluate(expression, variables)
+    except ZeroDivisionError:
+        return "[tool_error] calculate: division by zero"
+    except (CalcError, ArithmeticError, ValueError, TypeError) as e:
+        return f"[tool_error] calculate: {e}"
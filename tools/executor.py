@@ -0,0 +1,251 @@
+# tools/executor.py
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+# -----------------------------
+# Tool executor
+# -----------------------------
+# Every tool call runs off the request thread, in the pool its registration
+# asks for ("thread" for I/O and cheap calls, "process" for CPU-heavy code
+# that must be killable), under a per-call deadline and a per-tool cap on
+# concurrent executions. A call that misses its deadline is abandoned and the
+# ReAct loop gets a ToolTimeout observation instead of stalling. A thread
+# cannot be killed, so an abandoned thread call keeps its concurrency slot
+# until it really finishes; a timed-out process call recycles the process pool,
+# and so does a pool broken by a crashed worker (OOM, segfault, failed spawn).
+#
+# TOOL_TIMEOUT      default per-call deadline in seconds (5)
+# TOOL_THREADS      shared thread pool size (16)
+# TOOL_PROCESSES    shared process pool size (2, started on first use)
+#
+# Example:
+#   EXECUTOR.run("knowledge_search", knowledge_search, {"query": "wheels"}, timeout=10)
+#   EXECUTOR.stats()["knowledge_search"]["p50_ms"]
+#
+
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "5"))
+TOOL_THREADS = int(os.getenv("TOOL_THREADS", "16"))
+TOOL_PROCESSES = int(os.getenv("TOOL_PROCESSES", "2"))
+
+POOLS = ("thread", "process")
+
+# Histogram bucket upper bounds (ms); the last bucket is open-ended.
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class ToolTimeout(str):
+    """
+    A [tool_error] observation (so existing string checks still match) that
+    also carries its fields: `tool`, `reason` ("timeout" | "busy" | "crashed")
+    and `timeout_s`.
+    """
+
+    def __new__(cls, tool: str, reason: str, timeout_s: float):
+        if reason == "busy":
+            text = (f"[tool_error] {tool} is busy: no free slot within {timeout_s:g}s. "
+                    f"Retry later or answer without it.")
+        elif reason == "crashed":
+            text = (f"[tool_error] {tool} crashed its worker process. "
+                    f"Retry with simpler args or answer without it.")
+        else:
+            text = (f"[tool_error] {tool} timed out after {timeout_s:g}s. "
+                    f"Retry with simpler args or answer without it.")
+        obj = super().__new__(cls, text)
+        obj.tool, obj.reason, obj.timeout_s = tool, reason, timeout_s
+        return obj
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"error": self.reason, "tool": self.tool, "timeout_s": self.timeout_s}
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram plus outcome counters (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.busy = 0
+        self.total_ms = 0.0
+
+    def observe(self, ms: float, outcome: str = "ok"):
+        with self._lock:
+            self.calls += 1
+            if outcome == "busy":
+                self.busy += 1
+                return
+            self.counts[bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+            self.total_ms += ms
+            if outcome == "timeout":
+                self.timeouts += 1
+            elif outcome == "error":
+                self.errors += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound (ms) of the bucket holding quantile `q`; None when empty or open-ended."""
+        n = sum(self.counts)
+        if not n:
+            return None
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= q * n:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else None
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            timed = sum(self.counts)
+            labels = [f"<={b}ms" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "busy": self.busy,
+                "mean_ms": round(self.total_ms / timed, 3) if timed else None,
+                "p50_ms": self.quantile(0.50),
+                "p95_ms": self.quantile(0.95),
+                "p99_ms": self.quantile(0.99),
+                "buckets": {label: c for label, c in zip(labels, self.counts) if c},
+            }
+
+
+def _report_pid(queue):
+    # Process-pool initializer: tell the parent which pid to stop on a timeout.
+    queue.put(os.getpid())
+
+
+class ToolExecutor:
+    def __init__(self, threads: int = TOOL_THREADS, processes: int = TOOL_PROCESSES):
+        self._threads = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="tool")
+        self._process_workers = processes
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._worker_pids = None  # queue the current pool's workers report their pid on
+        self._lock = threading.Lock()
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._hist: Dict[str, LatencyHistogram] = {}
+
+    # -------- pools / bookkeeping --------
+    def _process_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._processes is None:
+                # spawn: workers must not inherit the API's threads and locks
+                ctx = mp.get_context("spawn")
+                self._worker_pids = ctx.SimpleQueue()
+                self._processes = ProcessPoolExecutor(max_workers=self._process_workers, mp_context=ctx,
+                                                      initializer=_report_pid, initargs=(self._worker_pids,))
+            return self._processes
+
+    def _recycle_process_pool(self, pool: ProcessPoolExecutor, kill: bool = True):
+        # The only way to stop a runaway call is to stop its process. Other calls
+        # in flight on this pool fail with BrokenProcessPool and surface as errors.
+        # A broken pool (kill=False) has already terminated its workers itself.
+        with self._lock:
+            if pool is None or self._processes is not pool:
+                return
+            self._processes, pids = None, self._worker_pids
+            self._worker_pids = None
+        while kill and pids is not None and not pids.empty():
+            try:
+                os.kill(pids.get(), signal.SIGTERM)
+            except (ProcessLookupError, PermissionError):
+                pass
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, pool: str, func: Callable[..., Any], kwargs: Dict[str, Any]):
+        if pool != "process":
+            return self._threads, self._threads.submit(func, **kwargs)
+        executor = self._process_pool()
+        try:
+            return executor, executor.submit(func, **kwargs)
+        except BrokenProcessPool:
+            # A worker died since the last call; the call never ran, so retry once on a fresh pool.
+            self._recycle_process_pool(executor, kill=False)
+            executor = self._process_pool()
+            return executor, executor.submit(func, **kwargs)
+
+    def configure(self, tool: str, max_concurrent: int):
+        with self._lock:
+            self._slots[tool] = threading.BoundedSemaphore(max(1, max_concurrent))
+            self._hist.setdefault(tool, LatencyHistogram())
+
+    def _slot(self, tool: str) -> threading.BoundedSemaphore:
+        if tool not in self._slots:
+            self.configure(tool, TOOL_THREADS)
+        return self._slots[tool]
+
+    def histogram(self, tool: str) -> LatencyHistogram:
+        with self._lock:
+            return self._hist.setdefault(tool, LatencyHistogram())
+
+    # -------- execution --------
+    def run(self, tool: str, func: Callable[..., Any], kwargs: Dict[str, Any],
+            timeout: Optional[float] = None, pool: str = "thread") -> Any:
+        """Run `func(**kwargs)` within `timeout` seconds; tool exceptions propagate to the caller."""
+        timeout = TOOL_TIMEOUT if timeout is None else timeout
+        hist = self.histogram(tool)
+        slot = self._slot(tool)
+        t0 = time.perf_counter()
+        if not slot.acquire(timeout=timeout):
+            hist.observe(0.0, "busy")
+            return ToolTimeout(tool, "busy", timeout)
+        try:
+            executor, fut = self._submit(pool, func, kwargs)
+        except BrokenProcessPool:
+            slot.release()
+            hist.observe((time.perf_counter() - t0) * 1000, "error")
+            self._recycle_process_pool(self._processes, kill=False)
+            print(f"💥 Tool process pool broken: {tool}")
+            return ToolTimeout(tool, "crashed", timeout)
+        except BaseException:
+            slot.release()
+            raise
+        fut.add_done_callback(lambda _: slot.release())
+        remaining = max(0.0, timeout - (time.perf_counter() - t0))
+        try:
+            result = fut.result(timeout=remaining)
+        except FutureTimeout:
+            hist.observe((time.perf_counter() - t0) * 1000, "timeout")
+            if not fut.cancel() and pool == "process":
+                self._recycle_process_pool(executor)
+            print(f"⏱️ Tool timeout: {tool} after {timeout:g}s")
+            return ToolTimeout(tool, "timeout", timeout)
+        except BrokenProcessPool:
+            # This call (or another on the same pool) killed a worker; start clean next time.
+            hist.observe((time.perf_counter() - t0) * 1000, "error")
+            self._recycle_process_pool(executor, kill=False)
+            print(f"💥 Tool worker crashed: {tool}")
+            return ToolTimeout(tool, "crashed", timeout)
+        except BaseException:
+            hist.observe((time.perf_counter() - t0) * 1000, "error")
+            raise
+        hist.observe((time.perf_counter() - t0) * 1000)
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            hists = dict(self._hist)
+        return {tool: h.snapshot() for tool, h in sorted(hists.items())}
+
+    def shutdown(self, wait: bool = False):
+        self._threads.shutdown(wait=wait, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=wait, cancel_futures=True)
+
+
+EXECUTOR = ToolExecutor()
+
+
+def tool_stats() -> List[Dict[str, Any]]:
+    """Per-tool latency histograms and outcome counts, one row per tool."""
+    return [{"tool": tool, **snap} for tool, snap in EXECUTOR.stats().items()]
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for API start-up.
+
+Imports each target module in a fresh interpreter under `python -X importtime`,
+reports the cumulative import cost per module (and per top-level package),
+and fails if the total goes over budget or a module that should load lazily
+(torch, sentence_transformers, faiss, num2words, ...) is imported eagerly.
+
+Usage:
+    python tools/import_budget.py                       # checks `main`
+    python tools/import_budget.py agent.react.controller --budget-ms 300 --top 20
+    IMPORT_BUDGET_MS=800 python tools/import_budget.py main
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1000"))
+
+# Heavy dependencies that must only load when a request needs them.
+LAZY_MODULES = (
+    "torch",
+    "sentence_transformers",
+    "transformers",
+    "onnxruntime",
+    "faiss",
+    "chromadb",
+    "num2words",
+    "tools.knowledge_tool",
+)
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)\s*$")
+
+
+def measure(module: str) -> Tuple[List[Tuple[str, int, int, int]], str]:
+    """[(name, self_us, cumulative_us, depth), ...] for `import module`, plus stderr on failure."""
+    root = Path(__file__).resolve().parents[1]
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=root, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": str(root)},
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return rows, (proc.stderr if proc.returncode else "")
+
+
+def check(module: str, budget_ms: float, top: int, runs: int) -> bool:
+    best: List[Tuple[str, int, int, int]] = []
+    for _ in range(max(1, runs)):  # first run may include .pyc compilation
+        rows, err = measure(module)
+        if err:
+            print(f"❌ import {module} failed:\n{err.strip().splitlines()[-1]}")
+            return False
+        if not best or sum(r[1] for r in rows) < sum(r[1] for r in best):
+            best = rows
+
+    total_ms = sum(r[1] for r in best) / 1000
+    print(f"\n📦 import {module}: {total_ms:.1f} ms total, {len(best)} modules (budget {budget_ms:.0f} ms)")
+
+    print(f"\nTop {top} by cumulative time:")
+    for name, _self, cum, depth in sorted(best, key=lambda r: -r[2])[:top]:
+        print(f"  {cum / 1000:8.1f} ms  {'  ' * min(depth, 6)}{name}")
+
+    per_package: Dict[str, int] = defaultdict(int)
+    for name, self_us, _cum, _depth in best:
+        per_package[name.split(".")[0]] += self_us
+    print(f"\nTop {top} packages by own import time:")
+    for pkg, us in sorted(per_package.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"  {us / 1000:8.1f} ms  {pkg}")
+
+    loaded = {r[0] for r in best}
+    eager = [m for m in LAZY_MODULES if m in loaded and m != module]
+    ok = True
+    if eager:
+        ok = False
+        print(f"\n❌ Imported eagerly (should load on first use): {', '.join(eager)}")
+    if total_ms > budget_ms:
+        ok = False
+        print(f"\n❌ Over budget: {total_ms:.1f} ms > {budget_ms:.0f} ms")
+    if ok:
+        print("\n✅ Within budget")
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Import-time budget check (python -X importtime)")
+    ap.add_argument("modules", nargs="*", default=["main"], help="modules to import (default: main)")
+    ap.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    ap.add_argument("--top", type=int, default=15)
+    ap.add_argument("--runs", type=int, default=3, help="take the fastest of N fresh interpreters")
+    args = ap.parse_args()
+    results = [check(m, args.budget_ms, args.top, args.runs) for m in args.modules]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
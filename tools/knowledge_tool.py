@@ -1,34 +1,136 @@
 # tools/knowledge_tool.py
 import os
-from typing import Dict, Any, List
-from agent.long_memory.embeddings import load_embedder, embed_texts
-from agent.long_memory.faiss_store import VectorStore, INDEX_DIR
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+# Same index `python -m agent.long_memory.faiss_play build` writes; override per deployment.
+INDEX_DIR = os.getenv("KNOWLEDGE_INDEX_DIR", "storage/faiss_demo")
+# How long a search waits for an unfinished start-up warm-up before answering
+# "warming"; keep it well under the tool's 10s deadline in tools/registry.py.
+WARM_WAIT_S = float(os.getenv("KNOWLEDGE_WARM_WAIT_S", "5"))
+# Cross-encoder re-ranking (agent/long_memory/rerank.py): over-fetch dense
+# candidates, then re-order them within a latency budget and keep `k`.
+RERANK = os.getenv("KNOWLEDGE_RERANK", "0").strip().lower() in {"1", "true", "yes"}
+RERANK_CANDIDATES = int(os.getenv("KNOWLEDGE_RERANK_CANDIDATES", "20"))
+RERANK_BUDGET_MS = float(os.getenv("KNOWLEDGE_RERANK_BUDGET_MS", "150"))
+
+# Process-wide store, reloaded when index files change on disk.
+# (stamp, store) is swapped as one tuple so readers never see a mismatched pair.
+_lock = threading.Lock()
+_state: Tuple[Tuple[Any, ...], Any] = ((), None)
+
+
+def _stamp() -> Tuple[Any, ...]:
+    from agent.long_memory.faiss_store import INDEX_FILE, META_FILE
+    from agent.long_memory.snapshot_store import current_dir
+
+    # Snapshot roots publish new versions by swapping CURRENT; plain dirs are rewritten in place.
+    path = current_dir(INDEX_DIR)
+    return (path,) + tuple(
+        os.stat(os.path.join(path, name)).st_mtime_ns for name in (INDEX_FILE, META_FILE)
+    )
 
-# Simple in-process cache
-_store = None
-_key = None
-_model = None
 
 def _ensure_loaded():
-    global _store, _key, _model
-    if _store is not None:
-        return
-    _key, _model = load_embedder()
-    _store = VectorStore(dim=384)  # will be overwritten by load()
-    _store.load(INDEX_DIR)
-
-def knowledge_search(args: Dict[str, Any]) -> Dict[str, Any]:
+    """Return (stamp, store), loading once per process and again after the files change."""
+    global _state
+    stamp = _stamp()
+    if _state[0] == stamp:
+        return _state
+    with _lock:
+        if _state[0] != stamp:  # another thread may have reloaded while we waited
+            from agent.long_memory.faiss_store import FaissStore
+
+            _state = (stamp, FaissStore.load(stamp[0]))
+            print(f"[knowledge] loaded index {INDEX_DIR} ({_state[1].index.ntotal} chunks)")
+        return _state
+
+
+@lru_cache(maxsize=1024)
+def _embed_cached(alias: Optional[str], query: str):
+    from agent.long_memory.embeddings import embed_query
+
+    vec = embed_query(query, alias)
+    vec.setflags(write=False)  # shared between callers
+    return vec
+
+
+class _StaleIndex(Exception):
+    """The index was swapped between resolving a stamp and searching under it."""
+
+
+def _search(store, query: str, k: int):
+    from agent.long_memory.embeddings import stamp_alias
+
+    # Embed with the model the index was built with, so a re-embedded index can be swapped in live.
+    hits = store.search(_embed_cached(stamp_alias(store.model), query), top_k=k)
+    return tuple(
+        {"text": text, "score": round(score, 4), "doc_id": meta.get("doc_id"), "chunk_id": meta.get("chunk_id")}
+        for score, text, meta, _ in hits
+    )
+
+
+@lru_cache(maxsize=512)
+def _search_cached(stamp: Tuple[Any, ...], query: str, k: int):
+    # `stamp` is part of the key so results from a replaced index are never served.
+    loaded, store = _state  # one read: the pair is always consistent
+    if loaded != stamp:
+        raise _StaleIndex  # lru_cache never stores a raised call, so nothing is cached under `stamp`
+    return _search(store, query, k)
+
+
+def _search_loaded(stamp: Tuple[Any, ...], store, query: str, k: int):
+    """Search the (stamp, store) pair from _ensure_loaded(); cache only while it is still current."""
+    try:
+        return _search_cached(stamp, query, k)
+    except _StaleIndex:
+        return _search(store, query, k)
+
+
+def knowledge_search(query: str, k: int = 5) -> Dict[str, Any]:
     """
     Args:
-      { "query": str, "k": int=5 }
+      query: str, k: int=5
     Returns:
-      { "matches": [ { "text": str, "score": float }, ... ] }
+      { "matches": [ { "text": str, "score": float, "doc_id": str, "chunk_id": int }, ... ] }
+      or, while the start-up warm-up is still loading the index,
+      { "error": "...", "warming": true }
     """
-    _ensure_loaded()
-    q = str(args.get("query", "")).strip()
-    k = int(args.get("k", 5))
+    q = str(query or "").strip()
     if not q:
         return {"error": "query is required"}
-    qvec = embed_texts(_model, [q], _key, mode="query")
-    hits = _store.search(qvec, k=k)
-    return {"matches": [{"text": h.text, "score": h.score} for h in hits]}
\ No newline at end of file
+    from agent.long_memory.warmup import wait_warm
+
+    # Share the start-up load instead of racing it, but never past the tool deadline.
+    if not wait_warm(timeout=WARM_WAIT_S):
+        return {"error": "knowledge index is still loading (start-up warm-up); try again shortly", "warming": True}
+    try:
+        stamp, store = _ensure_loaded()
+    except FileNotFoundError:
+        return {"error": f"knowledge index not found in {INDEX_DIR}; build it first"}
+    k = int(k)
+    if not RERANK:
+        return {"matches": [dict(m) for m in _search_loaded(stamp, store, q, k)]}
+    from agent.long_memory.rerank import get_reranker
+
+    # Dense candidates stay cached; re-ranking has its own per-(query, chunk) score cache.
+    candidates = _search_loaded(stamp, store, q, max(k, RERANK_CANDIDATES))
+    hits = [(m["score"], m["text"], m, i) for i, m in enumerate(candidates)]
+    top, _ = get_reranker().rerank(q, hits, keep=k, budget_ms=RERANK_BUDGET_MS)
+    return {"matches": [dict(m) for _, _, m, _ in top]}  # "score" stays the dense score
+
+
+def warm(text: str = "warm-up query") -> str:
+    """Load the index and its embedding model, then run one search (API start-up warm-up)."""
+    from agent.long_memory.embeddings import resolved_model_name, stamp_alias
+
+    _, store = _ensure_loaded()
+    alias = stamp_alias(store.model)
+    store.search(_embed_cached(alias, text), top_k=1)
+    if RERANK:
+        from agent.long_memory.rerank import RERANK_MODEL, get_reranker
+
+        get_reranker().load()
+        return f"{INDEX_DIR}: {store.index.ntotal} chunks, {resolved_model_name(alias)}, rerank {RERANK_MODEL}"
+    return f"{INDEX_DIR}: {store.index.ntotal} chunks, {resolved_model_name(alias)}"
@@ -1,18 +1,18 @@
-def add_numbers(a, b):
+def add_numbers(a: float, b: float) -> float | str:
     try:
         return float(a) + float(b)
     except Exception as e:
         return f"[tool_error] Bad args for 'add_numbers': {e}"
 
 
-def multiply(a, b):
+def multiply(a: float, b: float) -> float | str:
     try:
         return float(a) * float(b)
     except Exception as e:
         return f"[tool_error] Bad args for 'multiply': {e}"
 
 
-def divide(a, b):
+def divide(a: float, b: float) -> float | str:
     try:
         bf = float(b)
         if bf == 0:
@@ -0,0 +1,117 @@
+# tools/memo.py
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# -----------------------------
+# Tool result memoization
+# -----------------------------
+# Tools registered as pure (same args -> same result, no side effects) get a
+# bounded LRU of results keyed by their normalized args, i.e. after the
+# registry has repaired and coerced them, so {"x": "10", "y": 5} and
+# {"a": 10, "b": 5.0} share one entry. Tools whose results go stale (I/O)
+# can opt into the same cache with a TTL instead. Errors and timeouts are
+# never cached.
+#
+# TOOL_CACHE_SIZE   entries kept per tool (1024)
+#
+# Example:
+#   register("add_numbers", math_tool.add_numbers, pure=True)
+#   register("weather", weather, ttl=300)       # cache for 5 minutes
+#   cache_stats()["add_numbers"]["hit_rate"]
+#
+
+TOOL_CACHE_SIZE = int(os.getenv("TOOL_CACHE_SIZE", "1024"))
+
+MISS = object()
+
+
+def args_key(kwargs: Dict[str, Any]) -> str:
+    return json.dumps(kwargs, sort_keys=True, ensure_ascii=False, default=repr)
+
+
+class ToolCache:
+    """Thread-safe LRU with an optional per-entry TTL and hit/miss counters."""
+
+    def __init__(self, maxsize: int = TOOL_CACHE_SIZE, ttl: Optional[float] = None):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def get(self, key: str) -> Any:
+        """Cached value or `MISS`."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._data[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return MISS
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+_CACHES: Dict[str, ToolCache] = {}
+
+
+def configure_cache(tool: str, pure: bool = False, ttl: Optional[float] = None,
+                    maxsize: int = TOOL_CACHE_SIZE) -> Optional[ToolCache]:
+    """Give `tool` a cache (pure: no expiry; ttl: expire after `ttl` seconds), or drop it."""
+    if not pure and ttl is None:
+        _CACHES.pop(tool, None)
+        return None
+    cache = _CACHES[tool] = ToolCache(maxsize, None if pure else ttl)
+    return cache
+
+
+def cache_for(tool: str) -> Optional[ToolCache]:
+    return _CACHES.get(tool)
+
+
+def is_error(result: Any) -> bool:
+    if isinstance(result, str):
+        return result.startswith("[tool_error]")
+    return isinstance(result, dict) and "error" in result
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {tool: cache.stats() for tool, cache in sorted(_CACHES.items())}
+
+
+def clear_caches():
+    for cache in list(_CACHES.values()):
+        cache.clear()
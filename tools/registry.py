@@ -1,18 +1,301 @@
 # tools/registry.py
-from tools import math_tool, text_tool
-from tools.knowledge_tool import knowledge_search
-
-TOOLS = {
-    "add_numbers": math_tool.add_numbers,
-    "multiply": math_tool.multiply,
-    "divide": math_tool.divide,
-    "to_uppercase": text_tool.to_uppercase,
-    "greeting": text_tool.greeting,
-    # optional:
-    "number_to_words_upper": text_tool.number_to_words_upper,
-    "knowledge_search": knowledge_search,
+import ast
+import importlib
+import importlib.util
+import inspect
+import json
+import re
+import threading
+import typing
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from tools.executor import EXECUTOR, POOLS
+from tools.memo import MISS, args_key, cache_for, configure_cache, is_error
+
+# -----------------------------
+# Tool registry
+# -----------------------------
+# Tools register with their Python signature. At registration each parameter
+# gets a precompiled coercer (from its type hint) and the tool gets a key map
+# (exact names, case variants and common synonyms), so the usual model slips
+# are repaired locally instead of costing another LLM round-trip:
+#   {"a": "10", "b": "5"}       -> a=10.0, b=5.0
+#   {"x": 10, "y": 5}           -> a=10.0, b=5.0
+#   {"Text": "hi"} / ["hi"]     -> text="hi"
+# Only args that cannot be repaired come back as a precise [tool_error].
+# Calls then run through tools.executor with the pool, deadline and
+# concurrency cap given at registration. Tools registered `pure=True` (or
+# with a `ttl`) are memoized on their repaired args (see tools.memo).
+# The system-prompt tool list is generated from the same specs
+# (see `tool_prompt_section`), so it cannot drift from TOOLS.
+#
+# Tools can be registered by "module:function" path: the signature is read
+# from the module's source (nothing is imported) and the module is imported
+# on the first call, so API start-up does not pay for tools a request never
+# uses (num2words, the embedding stack behind knowledge_search, ...).
+#
+# Example:
+#   register("add_numbers", "tools.math_tool:add_numbers", timeout=2.0, pure=True)
+#   run_tool("add_numbers", {"x": "2", "y": 3})     # 5.0
+#   print(tool_prompt_section())
+#
+
+_PROMPT_TYPES = {str: "string", float: "float", int: "int", bool: "bool", dict: "object", list: "list"}
+
+# Keys models use in place of a parameter name (matched case-insensitively).
+SYNONYMS: Dict[str, Tuple[str, ...]] = {
+    "a": ("x", "first", "num1", "number1", "n1", "left", "lhs", "dividend"),
+    "b": ("y", "second", "num2", "number2", "n2", "right", "rhs", "divisor"),
+    "n": ("number", "num", "value", "x"),
+    "text": ("string", "str", "input", "value", "s", "message"),
+    "name": ("user", "username", "person"),
+    "query": ("q", "question", "search", "text"),
+    "k": ("top_k", "topk", "limit"),
+    "expression": ("expr", "formula", "equation", "input", "text", "query"),
+    "variables": ("vars", "values", "params", "with"),
 }
 
+
+class ArgError(ValueError):
+    """Arguments that could not be repaired into a valid call."""
+
+
+# ----- Coercers (built once per parameter) -----
+
+# Commas are only read as thousands separators ("1,234.5"); "1,5" is ambiguous.
+_THOUSANDS = re.compile(r"^[+-]?\d{1,3}(,\d{3})+(\.\d+)?$")
+
+
+def _to_float(value: Any) -> float:
+    if isinstance(value, bool):
+        raise ArgError(f"expected a number, got {value!r}")
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        s = value.strip().replace("_", "")
+        if "," in s:
+            if not _THOUSANDS.match(s):
+                raise ArgError(f"ambiguous comma in {value!r}; write 1234.5 or 1,234.5")
+            s = s.replace(",", "")
+        try:
+            return float(s)
+        except ValueError:
+            pass
+    raise ArgError(f"expected a number, got {value!r}")
+
+
+def _to_int(value: Any) -> int:
+    f = _to_float(value)
+    if not f.is_integer():
+        raise ArgError(f"expected an integer, got {value!r}")
+    return int(f)
+
+
+def _to_str(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    s = str(value).strip().lower()
+    if s in {"true", "yes", "1", "on"}:
+        return True
+    if s in {"false", "no", "0", "off", ""}:
+        return False
+    raise ArgError(f"expected true/false, got {value!r}")
+
+
+_COERCERS: Dict[Any, Callable[[Any], Any]] = {float: _to_float, int: _to_int, str: _to_str, bool: _to_bool}
+
+
+def _unwrap(hint: Any) -> Any:
+    # Optional[X] / X | None -> X
+    args = [a for a in typing.get_args(hint) if a is not type(None)]
+    return args[0] if len(args) == 1 else hint
+
+
+_SOURCE_TYPES = {"str": str, "float": float, "int": int, "bool": bool, "dict": dict, "list": list}
+
+
+def _hint_from_ast(node: Optional[ast.expr]) -> Any:
+    """Builtin type an annotation names (after unwrapping Optional / `| None`), else None."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):  # "str" / postponed annotations
+        node = ast.parse(node.value, mode="eval").body
+    if isinstance(node, ast.Name):
+        return _SOURCE_TYPES.get(node.id)
+    if isinstance(node, ast.Subscript) and getattr(node.value, "id", getattr(node.value, "attr", "")) == "Optional":
+        return _hint_from_ast(node.slice)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitOr):
+        sides = [n for n in (node.left, node.right) if not (isinstance(n, ast.Constant) and n.value is None)]
+        return _hint_from_ast(sides[0]) if len(sides) == 1 else None
+    return None
+
+
+@lru_cache(maxsize=None)
+def _module_source(module: str) -> ast.Module:
+    found = importlib.util.find_spec(module)
+    if found is None or not found.origin:
+        raise ValueError(f"cannot find module {module!r}")
+    with open(found.origin, "r", encoding="utf-8") as f:
+        return ast.parse(f.read(), filename=found.origin)
+
+
+def _params_from_source(target: str) -> List["Param"]:
+    """Parameters of a "module:function" target, read from source without importing the module."""
+    module, _, attr = target.partition(":")
+    tree = _module_source(module)
+    fn = next((n for n in tree.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)) and n.name == attr), None)
+    if fn is None:
+        raise ValueError(f"{module} has no top-level function {attr!r}")
+    a = fn.args
+    positional = a.posonlyargs + a.args
+    empty = inspect.Parameter.empty
+    defaults = [empty] * (len(positional) - len(a.defaults)) + [ast.literal_eval(d) for d in a.defaults]
+    kw_defaults = [empty if d is None else ast.literal_eval(d) for d in a.kw_defaults]
+    params = []
+    for arg, default in list(zip(positional, defaults)) + list(zip(a.kwonlyargs, kw_defaults)):
+        hint = _hint_from_ast(arg.annotation)
+        params.append(Param(arg.arg, hint, default, _COERCERS.get(hint)))
+    return params
+
+
+@dataclass
+class Param:
+    name: str
+    type: Any = None
+    default: Any = inspect.Parameter.empty
+    coerce: Optional[Callable[[Any], Any]] = None
+
+    @property
+    def required(self) -> bool:
+        return self.default is inspect.Parameter.empty
+
+    def signature(self) -> str:
+        out = self.name
+        if self.type in _PROMPT_TYPES:
+            out += f": {_PROMPT_TYPES[self.type]}"
+        if not self.required:
+            out += f" = {self.default!r}"
+        return out
+
+
+@dataclass
+class ToolSpec:
+    name: str
+    func: Optional[Callable[..., Any]]  # None until a lazy `target` is first called
+    params: List[Param]
+    target: str = ""  # "module:function" for lazy entries
+    pool: str = "thread"
+    timeout: Optional[float] = None  # seconds; None -> TOOL_TIMEOUT
+    max_concurrent: int = 4
+    pure: bool = False
+    ttl: Optional[float] = None  # seconds to memoize a non-pure tool's results
+    _keys: Dict[str, str] = field(default_factory=dict, repr=False)
+
+    @staticmethod
+    def _introspect(func: Callable[..., Any]) -> List[Param]:
+        try:
+            hints = typing.get_type_hints(func)
+        except Exception:
+            hints = {}
+        params = []
+        for p in inspect.signature(func).parameters.values():
+            if p.kind in (p.VAR_POSITIONAL, p.VAR_KEYWORD):
+                continue
+            hint = _unwrap(hints.get(p.name))
+            params.append(Param(p.name, hint, p.default, _COERCERS.get(hint)))
+        return params
+
+    @classmethod
+    def from_function(cls, name: str, func: Callable[..., Any], **options: Any) -> "ToolSpec":
+        spec = cls(name, func, cls._introspect(func), **options)
+        spec._compile_keys()
+        return spec
+
+    @classmethod
+    def from_target(cls, name: str, target: str, **options: Any) -> "ToolSpec":
+        spec = cls(name, None, _params_from_source(target), target=target, **options)
+        spec._compile_keys()
+        return spec
+
+    def resolve(self) -> Callable[..., Any]:
+        """The implementation, importing a lazy entry's module on first use."""
+        if self.func is None:
+            with _RESOLVE_LOCK:
+                if self.func is None:
+                    module, _, attr = self.target.partition(":")
+                    func = getattr(importlib.import_module(module), attr)
+                    # the live signature is authoritative once we have it
+                    self.params = self._introspect(func)
+                    self._compile_keys()
+                    self.func = func
+        return self.func
+
+    def _compile_keys(self):
+        names = {p.name for p in self.params}
+        keys = {p.name.lower(): p.name for p in self.params}
+        for p in self.params:
+            for alt in SYNONYMS.get(p.name, ()):
+                # a synonym never shadows a real parameter name
+                if alt not in names:
+                    keys.setdefault(alt, p.name)
+        self._keys = keys
+
+    def signature(self) -> str:
+        return f"{self.name}({', '.join(p.signature() for p in self.params)})"
+
+    def bind(self, args: Any) -> Dict[str, Any]:
+        """Map model-supplied args onto this signature and coerce them; raises ArgError."""
+        if args is None:
+            args = {}
+        if isinstance(args, (list, tuple)):
+            if len(args) > len(self.params):
+                raise ArgError(f"takes {len(self.params)} args, got {len(args)}")
+            args = {p.name: v for p, v in zip(self.params, args)}
+        elif not isinstance(args, dict):
+            required = [p for p in self.params if p.required]
+            if len(required) != 1:
+                raise ArgError(f"expected an object like {self.signature()}")
+            args = {required[0].name: args}
+
+        bound: Dict[str, Any] = {}
+        leftovers: List[Any] = []
+        for key, value in args.items():
+            name = self._keys.get(str(key).strip().lower())
+            if name is not None and name not in bound:
+                bound[name] = value
+            else:
+                leftovers.append(value)
+        missing = [p.name for p in self.params if p.required and p.name not in bound]
+        if missing and len(leftovers) == len(missing):
+            # unknown keys standing in for exactly the missing params, in order
+            bound.update(zip(missing, leftovers))
+            missing = []
+        if missing:
+            raise ArgError(f"missing {', '.join(missing)}; expected {self.signature()}")
+
+        for p in self.params:
+            if p.name in bound and p.coerce is not None:
+                try:
+                    bound[p.name] = p.coerce(bound[p.name])
+                except ArgError as e:
+                    raise ArgError(f"{p.name}: {e}") from None
+        return bound
+
+
+TOOLS: Dict[str, ToolSpec] = {}
+
+_RESOLVE_LOCK = threading.Lock()
+
 ALIASES = {
     # case/format variants the model sometimes tries
     "Greeting": "greeting",
@@ -27,6 +310,44 @@ ALIASES = {
 }
 
 
+def register(name: str, func: Union[str, Callable[..., Any]], pool: str = "thread",
+             timeout: Optional[float] = None, max_concurrent: int = 4, pure: bool = False,
+             ttl: Optional[float] = None) -> ToolSpec:
+    """Register a callable, or a "module:function" path that is imported on first call."""
+    if pool not in POOLS:
+        raise ValueError(f"pool must be one of {POOLS}, got {pool!r}")
+    options = dict(pool=pool, timeout=timeout, max_concurrent=max_concurrent, pure=pure, ttl=ttl)
+    if isinstance(func, str):
+        spec = ToolSpec.from_target(name, func, **options)
+    else:
+        spec = ToolSpec.from_function(name, func, **options)
+    TOOLS[name] = spec
+    EXECUTOR.configure(name, max_concurrent)
+    configure_cache(name, pure=pure, ttl=ttl)
+    tool_prompt_section.cache_clear()
+    return spec
+
+
+@lru_cache(maxsize=1)
+def tool_prompt_section() -> str:
+    """One signature line per registered tool, for the system prompt."""
+    return "\n".join(f"  {spec.signature()}" for spec in TOOLS.values())
+
+
+register("add_numbers", "tools.math_tool:add_numbers", timeout=2.0, max_concurrent=8, pure=True)
+register("multiply", "tools.math_tool:multiply", timeout=2.0, max_concurrent=8, pure=True)
+register("divide", "tools.math_tool:divide", timeout=2.0, max_concurrent=8, pure=True)
+# CPU-bound on hostile input: a process can be killed at the deadline, a thread cannot
+register("calculate", "tools.calc_tool:calculate", pool="process", timeout=2.0, max_concurrent=8, pure=True)
+register("to_uppercase", "tools.text_tool:to_uppercase", timeout=2.0, max_concurrent=8, pure=True)
+register("greeting", "tools.text_tool:greeting", timeout=2.0, max_concurrent=8, pure=True)
+# optional:
+register("number_to_words_upper", "tools.text_tool:number_to_words_upper", timeout=2.0, max_concurrent=8, pure=True)
+# model load + FAISS on a cold start; later calls hit warm caches. Not memoized
+# here: knowledge_tool caches per index version, so a swapped index is never stale.
+register("knowledge_search", "tools.knowledge_tool:knowledge_search", timeout=10.0, max_concurrent=4)
+
+
 def resolve_tool(name: str) -> str:
     if not name: return ""
     if name in ALIASES: return ALIASES[name]
@@ -39,12 +360,29 @@ def run_tool(name: str, args: dict):
     norm = resolve_tool(name)
     if norm == "__final_answer__":
         return "[tool_error] 'FINAL ANSWER' is not a callable tool"
-    func = TOOLS.get(norm)
-    if not func:
+    spec = TOOLS.get(norm)
+    if not spec:
         return f"[tool_error] Unknown tool '{name}'. Available: {', '.join(sorted(TOOLS.keys()))}"
     try:
-        return func(**args)
+        func = spec.resolve()
+    except Exception as e:
+        return f"[tool_error] {norm} is unavailable: {e}"
+    try:
+        kwargs = spec.bind(args)
+    except ArgError as e:
+        return f"[tool_error] Bad args for '{norm}': {e}"
+    cache = cache_for(norm)
+    if cache is not None:
+        key = args_key(kwargs)
+        hit = cache.get(key)
+        if hit is not MISS:
+            return hit
+    try:
+        result = EXECUTOR.run(norm, func, kwargs, timeout=spec.timeout, pool=spec.pool)
     except TypeError as e:
         return f"[tool_error] Bad args for '{name}': {e}"
     except Exception as e:
         return f"[tool_error] {name} failed: {e}"
+    if cache is not None and not is_error(result):
+        cache.put(key, result)
+    return result
@@ -6,10 +6,9 @@ def greeting(name: str) -> str:
     return f"Hello {name}"
 
 
-from num2words import num2words  # add to requirements if you choose this
+def number_to_words_upper(n: float) -> str:
+    from num2words import num2words  # add to requirements if you choose this
 
-
-def number_to_words_upper(n):
     try:
         w = num2words(float(n)).replace("-", " ")
         return w.upper()